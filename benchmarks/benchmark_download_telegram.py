@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do download do Telegram
+---------------------------------
+
+Executa os fluxos de download do TelegramService contra o cliente falso
+(ClienteTelegramFalso), sem conta nem rede, e mostra arquivos/s, MB/s e o
+tempo até o primeiro byte de cada cenário:
+
+- canal: download completo de um canal novo;
+- sincronizacao: nova passagem pelo canal já baixado (nada a baixar);
+- reconciliacao: passagem completa pelo histórico, com tudo já baixado;
+- intervalo: download de um intervalo de mensagens de outro canal, lido em lotes;
+- transmissao: abertura de uma aula virtual pelo servidor de mídia local.
+
+Exemplo:
+    python benchmarks/benchmark_download_telegram.py --videos 40 --tamanho-mb 12 --banda-mbps 40
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Adicionar a raiz do projeto ao path do Python
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from src.application.services import TelegramService
+from src.infrastructure.telegram import ClienteTelegramFalso
+
+MB = 1024 * 1024
+ID_CANAL = -1001
+ID_CANAL_TRANSMISSAO = -1002
+ID_CANAL_INTERVALO = -1003
+
+def criar_servico(args, pasta: str):
+    """Cria o serviço com um cliente falso e um canal gerado conforme os argumentos"""
+    cliente = ClienteTelegramFalso(
+        latencia=args.latencia_ms / 1000,
+        banda=args.banda_mbps * MB if args.banda_mbps else None,
+        flood_wait_a_cada=args.flood_wait_a_cada,
+        espera_flood_wait=args.espera_flood_wait
+    )
+    cliente.gerar_canal(
+        ID_CANAL, "Canal de Benchmark", args.videos, int(args.tamanho_mb * MB),
+        tamanho_album=args.tamanho_album, textos_a_cada=args.textos_a_cada
+    )
+    cliente.gerar_canal(
+        ID_CANAL_INTERVALO, "Canal de Intervalo", args.videos, int(args.tamanho_mb * MB),
+        tamanho_album=args.tamanho_album, textos_a_cada=args.textos_a_cada
+    )
+    cliente.gerar_canal(ID_CANAL_TRANSMISSAO, "Canal de Transmissão", 1, int(args.tamanho_mb * MB))
+
+    servico = TelegramService(
+        cliente=cliente,
+        db_path=os.path.join(pasta, "benchmark.db"),
+        pasta_downloads=os.path.join(pasta, "downloads")
+    )
+    servico.max_downloads_simultaneos = args.simultaneos
+    servico.download_segmentado = args.segmentado
+    return servico, cliente
+
+def medir(nome: str, cliente: ClienteTelegramFalso, executar):
+    """Executa um cenário e calcula as métricas a partir das estatísticas do cliente
+
+    executar retorna o número de arquivos ou (arquivos, instante do primeiro
+    byte), quando o primeiro byte é medido no próprio cenário.
+    """
+    cliente.zerar_estatisticas()
+    inicio = time.monotonic()
+    arquivos = executar()
+    segundos = max(time.monotonic() - inicio, 1e-9)
+
+    estatisticas = cliente.estatisticas
+    primeiro_byte = estatisticas["primeiro_byte"]
+    if isinstance(arquivos, tuple):
+        arquivos, primeiro_byte = arquivos
+    return {
+        "cenario": nome,
+        "arquivos": arquivos,
+        "mb": estatisticas["bytes_entregues"] / MB,
+        "segundos": segundos,
+        "arquivos_por_s": arquivos / segundos,
+        "mb_por_s": estatisticas["bytes_entregues"] / MB / segundos,
+        "primeiro_byte_s": primeiro_byte - inicio if primeiro_byte else None,
+        "requisicoes": sum(estatisticas["requisicoes"].values()),
+        "flood_waits": estatisticas["flood_waits"],
+    }
+
+def cenarios_download(servico: TelegramService, cliente: ClienteTelegramFalso):
+    """Mede o download completo do canal e as passagens seguintes, com tudo já baixado"""
+    aguardar = servico.loop_telegram.executar_e_aguardar
+
+    def baixar(reconciliar=False):
+        status = aguardar(servico.download_channel_videos(ID_CANAL, reconciliar=reconciliar))
+        if status["erros"]:
+            raise RuntimeError(f"{status['erros']} downloads com erro")
+        return status["baixados"] + status["ignorados"]
+
+    return [
+        medir("canal", cliente, baixar),
+        medir("sincronizacao", cliente, baixar),
+        medir("reconciliacao", cliente, lambda: baixar(reconciliar=True)),
+    ]
+
+def cenario_intervalo(servico: TelegramService, cliente: ClienteTelegramFalso):
+    """Mede o download de todas as mensagens de um canal novo, pedidas por intervalo de IDs"""
+    aguardar = servico.loop_telegram.executar_e_aguardar
+    ultimo_id = max(cliente.mensagens[ID_CANAL_INTERVALO])
+
+    def baixar():
+        status = aguardar(servico.download_messages_range(ID_CANAL_INTERVALO, 1, ultimo_id))
+        if status["erros"]:
+            raise RuntimeError(f"{status['erros']} downloads com erro")
+        return status["baixados"]
+
+    return medir("intervalo", cliente, baixar)
+
+def cenario_transmissao(servico: TelegramService, cliente: ClienteTelegramFalso):
+    """Mede a abertura de uma aula virtual ainda não baixada, com o primeiro byte recebido pelo player"""
+    aguardar = servico.loop_telegram.executar_e_aguardar
+    servico.aulas_pre_carregadas = 0
+
+    def transmitir():
+        url = aguardar(servico.obter_aula_virtual(servico.uri_aula(ID_CANAL_TRANSMISSAO, 1)))
+        with urllib.request.urlopen(url) as resposta:
+            resposta.read(1)
+            primeiro_byte = time.monotonic()
+            while resposta.read(MB):
+                pass
+        return 1, primeiro_byte
+
+    return medir("transmissao", cliente, transmitir)
+
+def executar(args) -> list:
+    """Executa os cenários, cada repetição em uma pasta temporária nova"""
+    random.seed(args.semente)
+    resultados = []
+
+    for _ in range(args.repeticoes):
+        with tempfile.TemporaryDirectory(prefix="benchmark_telegram_") as pasta:
+            servico, cliente = criar_servico(args, pasta)
+            try:
+                saida = contextlib.nullcontext() if args.verboso else contextlib.redirect_stdout(io.StringIO())
+                with saida:
+                    resultados.extend(cenarios_download(servico, cliente))
+                    resultados.append(cenario_intervalo(servico, cliente))
+                    resultados.append(cenario_transmissao(servico, cliente))
+            finally:
+                servico.fechar()
+
+    return resultados
+
+def imprimir(resultados: list):
+    """Mostra a tabela com as métricas de cada cenário"""
+    print(f"{'cenário':<15}{'arquivos':>9}{'MB':>9}{'s':>9}{'arq/s':>9}{'MB/s':>9}{'1º byte':>9}{'req':>7}{'flood':>7}")
+    for r in resultados:
+        primeiro_byte = f"{r['primeiro_byte_s']:.3f}" if r["primeiro_byte_s"] is not None else "-"
+        print(
+            f"{r['cenario']:<15}{r['arquivos']:>9}{r['mb']:>9.1f}{r['segundos']:>9.3f}"
+            f"{r['arquivos_por_s']:>9.1f}{r['mb_por_s']:>9.1f}{primeiro_byte:>9}"
+            f"{r['requisicoes']:>7}{r['flood_waits']:>7}"
+        )
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark do download do Telegram com um cliente falso")
+    parser.add_argument("--videos", type=int, default=30, help="vídeos no canal gerado")
+    parser.add_argument("--tamanho-mb", type=float, default=4, help="tamanho de cada vídeo, em MB")
+    parser.add_argument("--tamanho-album", type=int, default=0, help="vídeos por álbum (0: sem álbuns)")
+    parser.add_argument("--textos-a-cada", type=int, default=0, help="uma mensagem de texto a cada N vídeos")
+    parser.add_argument("--latencia-ms", type=float, default=20, help="latência de cada requisição")
+    parser.add_argument("--banda-mbps", type=float, default=0, help="banda do enlace em MB/s (0: ilimitada)")
+    parser.add_argument("--flood-wait-a-cada", type=int, default=0, help="um FloodWait a cada N requisições")
+    parser.add_argument("--espera-flood-wait", type=int, default=1, help="segundos pedidos em cada FloodWait")
+    parser.add_argument("--simultaneos", type=int, default=TelegramService.MAX_DOWNLOADS_SIMULTANEOS,
+                        help="downloads simultâneos")
+    parser.add_argument("--segmentado", action="store_true", help="ativa o download segmentado")
+    parser.add_argument("--repeticoes", type=int, default=1, help="repetições de todos os cenários")
+    parser.add_argument("--semente", type=int, default=0, help="semente das variações aleatórias")
+    parser.add_argument("--json", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--verboso", action="store_true", help="mostra as mensagens do serviço")
+    args = parser.parse_args()
+
+    resultados = executar(args)
+    imprimir(resultados)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "resultados": resultados}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
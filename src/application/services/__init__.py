@@ -1,4 +1,6 @@
 from .app_service import AppService
 from .telegram_service import TelegramService
+from .carregamento_service import CarregamentoCurso
+from .fila_downloads import FilaDownloads
 
-__all__ = ['AppService', 'TelegramService'] 
\ No newline at end of file
+__all__ = ['AppService', 'TelegramService', 'CarregamentoCurso', 'FilaDownloads'] 
\ No newline at end of file
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+class AgendadorDownloads:
+    """Executa downloads concorrentes com paralelismo limitado
+
+    Um produtor percorre as mensagens e alimenta uma fila assíncrona limitada,
+    mantendo-se sempre à frente dos workers sem carregar o histórico inteiro
+    em memória. Os workers consomem a fila e cada download ocupa uma vaga do
+    semáforo, que pode ser compartilhado entre vários agendadores.
+    """
+
+    def __init__(self, max_simultaneos: int = 3, semaforo: Optional[asyncio.Semaphore] = None):
+        """Inicializa o agendador"""
+        self.max_simultaneos = max(1, int(max_simultaneos))
+        self.semaforo = semaforo or asyncio.Semaphore(self.max_simultaneos)
+
+    async def executar(
+        self,
+        itens: AsyncIterator[Any],
+        baixar: Callable[[Any], Awaitable[Any]],
+        on_resultado: Callable[[Any, Any], None] = None
+    ):
+        """Baixa todos os itens produzidos pelo iterador
+
+        Args:
+            itens: Iterador assíncrono com os itens a baixar
+            baixar: Corrotina que baixa um item e retorna o resultado
+            on_resultado: Função chamada com (item, resultado) ao fim de cada download
+        """
+        # A fila limitada aplica contrapressão ao produtor
+        fila = asyncio.Queue(maxsize=self.max_simultaneos * 2)
+        fim = object()
+
+        async def produzir():
+            try:
+                async for item in itens:
+                    await fila.put(item)
+            finally:
+                for _ in range(self.max_simultaneos):
+                    await fila.put(fim)
+
+        async def trabalhar():
+            while True:
+                item = await fila.get()
+                if item is fim:
+                    return
+
+                try:
+                    async with self.semaforo:
+                        resultado = await baixar(item)
+                except Exception as e:
+                    resultado = e
+
+                if on_resultado:
+                    on_resultado(item, resultado)
+
+        workers = [asyncio.ensure_future(trabalhar()) for _ in range(self.max_simultaneos)]
+
+        try:
+            await produzir()
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
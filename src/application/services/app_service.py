@@ -1,5 +1,6 @@
 from typing import List, Optional, Dict, Any, Callable, Tuple
 import os
+import shutil
 import subprocess
 import platform
 from datetime import timedelta, datetime
@@ -7,16 +8,21 @@ from datetime import timedelta, datetime
 from src.domain.entities import Curso, Aula, Modulo
 from src.domain.services import CursoService
 from src.infrastructure.repositories import CursoRepository
+from .carregamento_service import CarregamentoCurso
 
 class AppService:
     """Serviço de aplicação que coordena as operações do sistema"""
     
+    # Players procurados para abrir vídeos transmitidos pelo servidor de mídia local
+    PLAYERS_TRANSMISSAO = ("mpv", "vlc", "celluloid", "totem", "mplayer")
+    
     def __init__(self):
         """Inicializa o serviço de aplicação"""
         self.curso_service = CursoService()
         self.repository = CursoRepository()
         self.curso_atual = None
         self.aula_selecionada = None
+        self.carregamento_atual = None
     
     def carregar_curso(self, caminho: str) -> Optional[Curso]:
         """Carrega um curso a partir de um caminho"""
@@ -32,6 +38,33 @@ class AppService:
             self.curso_atual = curso
         return curso
     
+    def iniciar_carregamento_curso(self, caminho: str = None, id_curso: int = None) -> CarregamentoCurso:
+        """Inicia o carregamento de um curso em segundo plano
+        
+        Um carregamento anterior ainda em andamento é cancelado.
+        """
+        self.cancelar_carregamento()
+        
+        self.carregamento_atual = CarregamentoCurso(caminho=caminho, id_curso=id_curso)
+        self.carregamento_atual.iniciar()
+        return self.carregamento_atual
+    
+    def cancelar_carregamento(self) -> None:
+        """Cancela o carregamento em andamento, se houver"""
+        if self.carregamento_atual:
+            self.carregamento_atual.cancelar()
+            self.carregamento_atual = None
+    
+    def concluir_carregamento(self, carregamento: CarregamentoCurso, curso: Curso) -> bool:
+        """Substitui o curso atual pelo curso carregado, se o carregamento ainda for o vigente"""
+        if carregamento is not self.carregamento_atual:
+            return False
+        
+        self.carregamento_atual = None
+        self.curso_atual = curso
+        self.aula_selecionada = None
+        return True
+    
     def obter_cursos_salvos(self) -> List[Tuple[int, str, str]]:
         """Retorna a lista de cursos salvos"""
         return self.repository.listar_cursos()
@@ -71,16 +104,29 @@ class AppService:
     
     def abrir_video(self, aula: Aula) -> bool:
         """Abre o vídeo de uma aula no player padrão do sistema"""
+        return self.abrir_arquivo(aula.caminho_video)
+    
+    def abrir_arquivo(self, caminho: str) -> bool:
+        """Abre um arquivo de vídeo, ou a URL de uma transmissão local, no player padrão do sistema"""
         try:
+            transmissao = caminho.startswith(("http://", "https://"))
+            
             # Verificar se o arquivo existe
-            if not os.path.exists(aula.caminho_video):
+            if not transmissao and not os.path.exists(caminho):
                 return False
             
+            # Transmissões vão direto para um player de vídeo, pois o
+            # programa padrão para URLs costuma ser o navegador
+            player = self._obter_player_transmissao() if transmissao else None
+            if player:
+                subprocess.Popen([player, caminho])
+                return True
+            
             # Abrir o vídeo com o player padrão do sistema
             if os.name == 'nt':  # Windows
-                os.startfile(aula.caminho_video)
+                os.startfile(caminho)
             elif os.name == 'posix':  # Linux/Mac
-                subprocess.Popen(['xdg-open', aula.caminho_video])
+                subprocess.Popen(['xdg-open', caminho])
             else:
                 return False
             
@@ -88,6 +134,14 @@ class AppService:
         except Exception:
             return False
     
+    def _obter_player_transmissao(self) -> Optional[str]:
+        """Retorna o primeiro player instalado capaz de reproduzir vídeos por HTTP"""
+        for player in self.PLAYERS_TRANSMISSAO:
+            caminho = shutil.which(player)
+            if caminho:
+                return caminho
+        return None
+    
     def obter_progresso_curso(self) -> float:
         """Retorna o progresso do curso atual em porcentagem"""
         if not self.curso_atual:
@@ -276,6 +330,7 @@ class AppService:
     
     def fechar(self):
         """Fecha as conexões e recursos do serviço"""
+        self.cancelar_carregamento()
         if hasattr(self.curso_service, 'repository') and self.curso_service.repository:
             self.curso_service.repository.fechar()
         if self.repository:
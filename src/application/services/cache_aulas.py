@@ -0,0 +1,111 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+class CacheAulas:
+    """Cache em disco, de tamanho limitado, das aulas de cursos virtuais do Telegram
+
+    Cada aula é gravada na pasta do cache com um nome derivado da sua URI
+    (tg://<channel_id>/<message_id>). Um índice guarda o último acesso e se
+    a aula já foi aberta (assistida). Quando o total passa do limite, saem
+    primeiro as aulas já assistidas, das menos para as mais recentemente
+    usadas, e só depois as aulas pré-carregadas que ainda não foram vistas.
+    A última aula aberta nunca é removida, pois pode estar em reprodução.
+    """
+
+    ARQUIVO_INDICE = "indice.json"
+
+    def __init__(self, pasta: str, tamanho_maximo: int):
+        """Inicializa o cache na pasta informada, com o tamanho máximo em bytes"""
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo
+        os.makedirs(pasta, exist_ok=True)
+
+        self.indice: Dict[str, Dict] = self._carregar_indice()
+        self.em_reproducao: Optional[str] = None
+
+    def caminho(self, uri: str, extensao: str = ".mp4") -> str:
+        """Caminho do arquivo de uma aula no cache"""
+        nome = uri.split("://", 1)[-1].replace("/", "_")
+        return os.path.join(self.pasta, f"{nome}{extensao}")
+
+    def obter(self, uri: str) -> Optional[str]:
+        """Retorna o arquivo da aula, se estiver no cache, registrando o acesso"""
+        entrada = self.indice.get(uri)
+        if not entrada:
+            return None
+
+        if not os.path.exists(entrada["caminho"]):
+            del self.indice[uri]
+            self._gravar_indice()
+            return None
+
+        entrada["acesso"] = time.time()
+        self._gravar_indice()
+        return entrada["caminho"]
+
+    def registrar(self, uri: str, caminho: str, assistida: bool = False):
+        """Registra no cache o arquivo baixado de uma aula e libera espaço, se preciso"""
+        self.indice[uri] = {
+            "caminho": caminho,
+            "tamanho": os.path.getsize(caminho),
+            "acesso": time.time(),
+            "assistida": assistida,
+        }
+        self.liberar_espaco(manter=(uri,))
+
+    def marcar_assistida(self, uri: str):
+        """Marca a aula como assistida, tornando-a candidata à remoção depois que outra for aberta"""
+        self.em_reproducao = uri
+        entrada = self.indice.get(uri)
+        if entrada and not entrada["assistida"]:
+            entrada["assistida"] = True
+            self._gravar_indice()
+
+    def tamanho_total(self) -> int:
+        """Total de bytes ocupados pelas aulas no cache"""
+        return sum(entrada["tamanho"] for entrada in self.indice.values())
+
+    def liberar_espaco(self, manter: Iterable[str] = ()):
+        """Remove aulas até que o cache caiba no tamanho máximo"""
+        manter = set(manter) | {self.em_reproducao}
+        total = self.tamanho_total()
+
+        candidatas = sorted(
+            (uri for uri in self.indice if uri not in manter),
+            key=lambda uri: (not self.indice[uri]["assistida"], self.indice[uri]["acesso"])
+        )
+
+        for uri in candidatas:
+            if total <= self.tamanho_maximo:
+                break
+
+            entrada = self.indice.pop(uri)
+            try:
+                os.remove(entrada["caminho"])
+            except OSError as e:
+                print(f"Erro ao remover aula do cache: {e}")
+            total -= entrada["tamanho"]
+
+        self._gravar_indice()
+
+    def _carregar_indice(self) -> Dict[str, Dict]:
+        """Lê o índice gravado, descartando entradas cujos arquivos não existem mais"""
+        try:
+            with open(os.path.join(self.pasta, self.ARQUIVO_INDICE), "r", encoding="utf-8") as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        return {uri: entrada for uri, entrada in indice.items() if os.path.exists(entrada["caminho"])}
+
+    def _gravar_indice(self):
+        """Grava o índice de forma atômica"""
+        caminho = os.path.join(self.pasta, self.ARQUIVO_INDICE)
+        try:
+            with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self.indice, f)
+            os.replace(caminho + ".tmp", caminho)
+        except OSError as e:
+            print(f"Erro ao gravar índice do cache de aulas: {e}")
@@ -0,0 +1,137 @@
+from typing import Optional, Any
+import os
+import queue
+import threading
+
+from src.domain.entities import Curso
+from src.infrastructure.repositories import CursoRepository
+
+class CarregamentoCancelado(Exception):
+    """Indica que o carregamento foi cancelado"""
+
+class CarregamentoCurso:
+    """Carrega um curso em uma thread de trabalho, em etapas
+
+    As etapas são: varredura do diretório, ingestão no banco, carregamento
+    do curso e renderização (feita pela interface na thread do Tk). O
+    progresso é publicado em uma fila segura entre threads na forma de
+    tuplas (tipo, dados), que a interface consome com after():
+
+    - ("progresso", (etapa, texto, fracao))
+    - ("concluido", curso)
+    - ("erro", mensagem)
+    - ("cancelado", None)
+    """
+
+    ETAPAS = ("varredura", "ingestao", "carregamento", "renderizacao")
+
+    def __init__(self, caminho: str = None, id_curso: int = None, db_path: str = None):
+        """Inicializa o carregamento de um curso por caminho ou por ID"""
+        self.caminho = os.path.normpath(caminho) if caminho else None
+        self.id_curso = id_curso
+        self.db_path = db_path
+
+        self.eventos = queue.Queue()
+        self._cancelado = threading.Event()
+        self._thread = None
+
+    @property
+    def cancelado(self) -> bool:
+        """Indica se o cancelamento foi solicitado"""
+        return self._cancelado.is_set()
+
+    def iniciar(self):
+        """Inicia o carregamento em uma thread separada"""
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+
+    def cancelar(self):
+        """Solicita o cancelamento do carregamento"""
+        self._cancelado.set()
+
+    def obter_eventos(self):
+        """Retorna os eventos publicados desde a última chamada"""
+        eventos = []
+        while True:
+            try:
+                eventos.append(self.eventos.get_nowait())
+            except queue.Empty:
+                return eventos
+
+    def _publicar(self, tipo: str, dados: Any = None):
+        """Publica um evento para a interface"""
+        self.eventos.put((tipo, dados))
+
+    def _progresso(self, etapa: str, texto: str, fracao: Optional[float] = None):
+        """Publica o progresso de uma etapa, interrompendo se houve cancelamento"""
+        if self.cancelado:
+            raise CarregamentoCancelado()
+
+        self._publicar("progresso", (etapa, texto, fracao))
+
+    def _executar(self):
+        """Executa as etapas do carregamento"""
+        # A conexão SQLite pertence à thread que a criou
+        repository = CursoRepository(self.db_path)
+
+        try:
+            curso = self._carregar(repository)
+
+            if self.cancelado:
+                raise CarregamentoCancelado()
+
+            if curso:
+                self._progresso("renderizacao", f"Exibindo {curso.total_aulas} aulas...")
+                self._publicar("concluido", curso)
+            else:
+                self._publicar("erro", "Não foi possível carregar o curso selecionado.")
+
+        except CarregamentoCancelado:
+            self._publicar("cancelado")
+        except Exception as e:
+            print(f"Erro ao carregar curso: {e}")
+            self._publicar("erro", str(e))
+        finally:
+            repository.fechar()
+
+    def _carregar(self, repository: CursoRepository) -> Optional[Curso]:
+        """Executa as etapas de varredura, ingestão e carregamento"""
+        id_curso = self.id_curso
+
+        if id_curso is None:
+            if not os.path.isdir(self.caminho):
+                return None
+
+            id_curso = repository.existe_curso(self.caminho)
+
+        # Cursos já cadastrados não são varridos novamente
+        if id_curso is None:
+            self._progresso("varredura", f"Procurando vídeos em {self.caminho}...")
+            videos = repository.escanear_curso(
+                self.caminho,
+                cancelado=lambda: self.cancelado,
+                progresso=lambda total: self._progresso(
+                    "varredura", f"Procurando vídeos... {total} encontrados"
+                )
+            )
+
+            if videos is None:
+                raise CarregamentoCancelado()
+
+            self._progresso("ingestao", f"Registrando {len(videos)} aulas...", 0.0)
+            id_curso = repository.ingerir_curso(
+                self.caminho,
+                videos,
+                cancelado=lambda: self.cancelado,
+                progresso=lambda feitos, total: self._progresso(
+                    "ingestao", f"Registrando aulas... {feitos}/{total}", feitos / total
+                )
+            )
+
+            if id_curso is None:
+                if self.cancelado:
+                    raise CarregamentoCancelado()
+                return None
+
+        self._progresso("carregamento", "Carregando aulas do banco de dados...")
+        return repository.obter_curso_por_id(id_curso)
@@ -0,0 +1,225 @@
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, Dict, List
+
+class FilaDownloads:
+    """Fila persistente de downloads do Telegram, com prioridades
+
+    Os itens (canais inteiros, mensagens avulsas ou intervalos de mensagens) ficam gravados no banco,
+    de modo que a fila sobrevive ao fechamento do aplicativo: itens que
+    estavam em andamento voltam a aguardar e são retomados na próxima
+    execução. Um agendador no loop do Telegram processa os itens por ordem
+    de prioridade, vários ao mesmo tempo, e todos compartilham o semáforo de
+    downloads e o limitador de requisições do serviço.
+    """
+
+    TIPO_CANAL = "canal"
+    TIPO_MENSAGEM = "mensagem"
+    TIPO_INTERVALO = "intervalo"
+
+    ESTADO_NA_FILA = "na_fila"
+    ESTADO_ATIVO = "ativo"
+    ESTADO_CONCLUIDO = "concluido"
+    ESTADO_ERRO = "erro"
+
+    def __init__(self, telegram_service, max_itens_simultaneos: int = 2):
+        """Inicializa a fila a partir dos itens gravados no banco"""
+        self.service = telegram_service
+        self.repository = telegram_service.repository
+        self.max_itens_simultaneos = max(1, int(max_itens_simultaneos))
+
+        # Os itens são lidos pela interface e alterados no loop do Telegram
+        self._trava = threading.Lock()
+        self.itens: Dict[int, Dict[str, Any]] = {}
+
+        self._ativos: Dict[int, asyncio.Future] = {}
+        self._despertar = None
+        self._agendador = None
+
+    def iniciar(self):
+        """Retoma a fila: itens interrompidos voltam a aguardar e o agendador é iniciado"""
+        self.repository.reiniciar_itens_ativos()
+
+        with self._trava:
+            self.itens = {item["id"]: item for item in self.repository.listar_fila()}
+            pendentes = any(item["estado"] == self.ESTADO_NA_FILA for item in self.itens.values())
+
+        if pendentes:
+            self._acordar()
+
+    def adicionar(self, tipo: str, channel_id: int, titulo: str = None, prioridade: int = 0,
+                  message_id: int = None, reconciliar: bool = False, message_id_final: int = None) -> int:
+        """Adiciona um canal, uma mensagem ou um intervalo de mensagens à fila e retorna o ID do item"""
+        id_item = self.repository.adicionar_item_fila(
+            tipo, channel_id, titulo, prioridade, message_id, reconciliar, message_id_final
+        )
+        if id_item is None:
+            return None
+
+        with self._trava:
+            self.itens[id_item] = {
+                "id": id_item,
+                "tipo": tipo,
+                "channel_id": channel_id,
+                "message_id": message_id,
+                "message_id_final": message_id_final,
+                "titulo": titulo,
+                "prioridade": prioridade,
+                "reconciliar": int(reconciliar),
+                "estado": self.ESTADO_NA_FILA,
+                "total": 0,
+                "baixados": 0,
+                "ignorados": 0,
+                "erros": 0,
+                "bytes": 0,
+                "mensagem_erro": None,
+            }
+
+        self._acordar()
+        return id_item
+
+    def remover(self, id_item: int) -> bool:
+        """Remove um item que não está em andamento"""
+        with self._trava:
+            item = self.itens.get(id_item)
+            if not item or item["estado"] == self.ESTADO_ATIVO:
+                return False
+            del self.itens[id_item]
+
+        return self.repository.remover_item_fila(id_item)
+
+    def limpar_concluidos(self):
+        """Remove da fila os itens concluídos"""
+        with self._trava:
+            self.itens = {
+                id_item: item for id_item, item in self.itens.items()
+                if item["estado"] != self.ESTADO_CONCLUIDO
+            }
+
+        self.repository.remover_concluidos_fila()
+
+    def obter_itens(self) -> List[Dict[str, Any]]:
+        """Retorna uma cópia dos itens: em andamento, aguardando (por prioridade) e finalizados"""
+        ordem_estado = {self.ESTADO_ATIVO: 0, self.ESTADO_NA_FILA: 1}
+
+        with self._trava:
+            itens = [dict(item) for item in self.itens.values()]
+
+        itens.sort(key=lambda item: (ordem_estado.get(item["estado"], 2), -item["prioridade"], item["id"]))
+        return itens
+
+    def _acordar(self):
+        """Inicia o agendador ou o avisa de que há itens novos"""
+        if self._agendador is None or self._agendador.done():
+            self._agendador = self.service.executar(self._executar())
+        elif self._despertar is not None:
+            self.service.loop_telegram.loop.call_soon_threadsafe(self._despertar.set)
+
+    def _proximos(self) -> List[Dict[str, Any]]:
+        """Itens aguardando, do mais para o menos prioritário"""
+        with self._trava:
+            pendentes = [
+                item for item in self.itens.values()
+                if item["estado"] == self.ESTADO_NA_FILA and item["id"] not in self._ativos
+            ]
+
+        pendentes.sort(key=lambda item: (-item["prioridade"], item["id"]))
+        return pendentes
+
+    async def _executar(self):
+        """Agendador: mantém até max_itens_simultaneos itens em andamento"""
+        self._despertar = asyncio.Event()
+
+        try:
+            while True:
+                vagas = self.max_itens_simultaneos - len(self._ativos)
+                for item in self._proximos()[:max(0, vagas)]:
+                    self._ativos[item["id"]] = asyncio.ensure_future(self._processar(item["id"]))
+
+                # Aguardar um item novo ou o fim de um item em andamento
+                self._despertar.clear()
+                await self._despertar.wait()
+        finally:
+            for tarefa in self._ativos.values():
+                tarefa.cancel()
+            await asyncio.gather(*self._ativos.values(), return_exceptions=True)
+
+    def _atualizar(self, id_item: int, persistir: bool = False, **campos):
+        """Atualiza um item em memória e, opcionalmente, no banco"""
+        with self._trava:
+            item = self.itens.get(id_item)
+            if item is not None:
+                item.update(campos)
+
+        if persistir:
+            self.repository.atualizar_item_fila(id_item, **campos)
+
+    async def _processar(self, id_item: int):
+        """Baixa um item da fila, registrando o progresso e a vazão"""
+        with self._trava:
+            item = dict(self.itens[id_item])
+
+        self._atualizar(
+            id_item, persistir=True, estado=self.ESTADO_ATIVO, mensagem_erro=None,
+            iniciado_em=datetime.now().isoformat(timespec="seconds")
+        )
+
+        def progresso(status):
+            # Bytes, vazão (média móvel) e tempo restante vêm da telemetria do download
+            self._atualizar(
+                id_item,
+                total=status["total"],
+                baixados=status["baixados"],
+                ignorados=status["ignorados"],
+                erros=status["erros"],
+                bytes=status.get("bytes_baixados", 0),
+                velocidade=status.get("velocidade", 0),
+                eta=status.get("eta"),
+                arquivos_em_andamento=status.get("arquivos_em_andamento", []),
+                espera=status.get("espera", 0)
+            )
+
+        try:
+            if item["tipo"] == self.TIPO_MENSAGEM:
+                status = await self.service.download_message(
+                    item["channel_id"], item["message_id"], progresso
+                )
+            elif item["tipo"] == self.TIPO_INTERVALO:
+                status = await self.service.download_messages_range(
+                    item["channel_id"], item["message_id"], item["message_id_final"], progresso
+                )
+            else:
+                status = await self.service.download_channel_videos(
+                    item["channel_id"], progresso, reconciliar=bool(item["reconciliar"])
+                )
+
+            progresso(status)
+            estado = self.ESTADO_ERRO if status["erros"] else self.ESTADO_CONCLUIDO
+            mensagem_erro = f"{status['erros']} arquivos com erro" if status["erros"] else None
+
+        except asyncio.CancelledError:
+            # Encerramento do aplicativo: o item continua ativo no banco e é retomado
+            raise
+        except Exception as e:
+            print(f"Erro ao processar item {id_item} da fila: {e}")
+            estado = self.ESTADO_ERRO
+            mensagem_erro = str(e)
+
+        with self._trava:
+            item = dict(self.itens.get(id_item, item))
+
+        self._atualizar(
+            id_item, persistir=True,
+            estado=estado,
+            mensagem_erro=mensagem_erro,
+            total=item.get("total", 0),
+            baixados=item.get("baixados", 0),
+            ignorados=item.get("ignorados", 0),
+            erros=item.get("erros", 0),
+            bytes=item.get("bytes", 0),
+            concluido_em=datetime.now().isoformat(timespec="seconds")
+        )
+
+        self._ativos.pop(id_item, None)
+        self._despertar.set()
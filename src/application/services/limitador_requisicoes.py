@@ -0,0 +1,204 @@
+import asyncio
+import contextlib
+import contextvars
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+try:
+    from pyrogram.errors import FloodWait
+except ImportError:
+    class FloodWait(Exception):
+        """Substituto usado quando o Pyrogram não está instalado"""
+
+        def __init__(self, value: int = 0):
+            super().__init__(f"A wait of {value} seconds is required")
+            self.value = value
+
+# Observador das esperas causadas pelas chamadas da tarefa atual e das tarefas criadas por ela
+_observador_da_tarefa: contextvars.ContextVar = contextvars.ContextVar("observador_da_tarefa", default=None)
+
+class LimitadorRequisicoes:
+    """Limitador de requisições ao Telegram por balde de fichas (token bucket)
+
+    Toda chamada ao Telegram consome uma ficha do balde, reposto à taxa
+    atual. Quando o Telegram responde com FloodWait, a taxa é reduzida à
+    metade e todas as chamadas aguardam o tempo pedido, acrescido de uma
+    variação aleatória para que as tarefas não voltem ao mesmo tempo. A cada
+    chamada bem-sucedida a taxa volta a subir aos poucos, até a taxa máxima.
+
+    As partes de arquivos (stream_media) não consomem fichas: limitá-las
+    pela taxa das demais chamadas restringiria a vazão dos downloads a
+    taxa × 1 MB/s. Elas só respeitam a espera de um FloodWait e, enquanto a
+    taxa ainda se recupera de um, passam pelo balde como as demais.
+
+    O limitador é compartilhado por todas as sessões de download; o
+    observador de observar_chamadas é notificado só dos FloodWait causados
+    pelas chamadas da própria sessão.
+    """
+
+    def __init__(self, taxa: float = 20.0, capacidade: int = 20, taxa_minima: float = 0.5,
+                 incremento: float = 0.05, variacao: float = 0.25, max_tentativas: int = 5):
+        """Inicializa o limitador com a taxa máxima em requisições por segundo"""
+        self.taxa_maxima = taxa
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.taxa_minima = taxa_minima
+        self.incremento = incremento
+        self.variacao = variacao
+        self.max_tentativas = max_tentativas
+
+        self.total_flood_waits = 0
+        self.ultimo_flood_wait = 0.0
+
+        self._fichas = float(capacidade)
+        self._ultima_reposicao = time.monotonic()
+        self._bloqueado_ate = 0.0
+
+    @property
+    def espera(self) -> float:
+        """Segundos que ainda faltam para o fim da espera pedida pelo Telegram"""
+        return max(0.0, self._bloqueado_ate - time.monotonic())
+
+    def estado(self) -> Dict[str, float]:
+        """Retorna a taxa atual (requisições por segundo) e a espera restante"""
+        return {"taxa": self.taxa, "espera": self.espera}
+
+    def sob_pressao(self, janela: float) -> bool:
+        """Indica se houve FloodWait nos últimos `janela` segundos"""
+        return self.total_flood_waits > 0 and time.monotonic() - self.ultimo_flood_wait < janela
+
+    @contextlib.contextmanager
+    def observar_chamadas(self, observador: Callable[[Dict[str, float]], None]):
+        """Notifica o observador dos FloodWait das chamadas feitas na tarefa atual
+
+        Vale também para as tarefas criadas dentro do bloco, que herdam o
+        contexto da tarefa atual, e não para as das demais sessões.
+        """
+        token = _observador_da_tarefa.set(observador)
+        try:
+            yield
+        finally:
+            _observador_da_tarefa.reset(token)
+
+    def _repor_fichas(self):
+        """Repõe as fichas proporcionalmente ao tempo decorrido"""
+        agora = time.monotonic()
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._ultima_reposicao) * self.taxa)
+        self._ultima_reposicao = agora
+
+    async def adquirir(self):
+        """Aguarda até que uma requisição possa ser feita"""
+        while True:
+            espera = self.espera
+            if espera > 0:
+                await asyncio.sleep(espera)
+                continue
+
+            self._repor_fichas()
+            if self._fichas >= 1:
+                self._fichas -= 1
+                return
+
+            await asyncio.sleep((1 - self._fichas) / self.taxa)
+
+    async def aguardar_parte(self):
+        """Aguarda até que a próxima parte de um arquivo possa ser pedida"""
+        if self.taxa < self.taxa_maxima:
+            await self.adquirir()
+            return
+
+        espera = self.espera
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    def registrar_sucesso(self):
+        """Aumenta gradualmente a taxa após uma requisição bem-sucedida"""
+        if self.taxa < self.taxa_maxima:
+            self.taxa = min(self.taxa_maxima, self.taxa + self.incremento)
+
+    def registrar_flood_wait(self, segundos: float, tentativa: int = 0) -> float:
+        """Reduz a taxa e bloqueia as requisições pelo tempo pedido pelo Telegram
+
+        Returns:
+            float: Tempo de espera aplicado, em segundos
+        """
+        self.total_flood_waits += 1
+        self.ultimo_flood_wait = time.monotonic()
+        self.taxa = max(self.taxa_minima, self.taxa / 2)
+        self._fichas = 0.0
+
+        # Variação aleatória, maior a cada nova tentativa da mesma chamada
+        espera = segundos + random.uniform(0, self.variacao * max(1.0, segundos) * (2 ** tentativa))
+        self._bloqueado_ate = max(self._bloqueado_ate, time.monotonic() + espera)
+
+        print(f"Aguardando {espera:.1f} segundos (limite de requisições)...")
+
+        observador = _observador_da_tarefa.get()
+        if observador is not None:
+            try:
+                observador(self.estado())
+            except Exception as e:
+                print(f"Erro ao notificar espera do limitador: {e}")
+
+        return espera
+
+    async def executar(self, funcao: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Executa uma chamada ao Telegram respeitando o limite e repetindo após FloodWait"""
+        for tentativa in range(self.max_tentativas):
+            await self.adquirir()
+            try:
+                resultado = await funcao(*args, **kwargs)
+            except FloodWait as e:
+                if tentativa == self.max_tentativas - 1:
+                    raise
+                self.registrar_flood_wait(e.value, tentativa)
+                continue
+
+            self.registrar_sucesso()
+            return resultado
+
+    async def iterar(
+        self,
+        fabrica: Callable[[Optional[Any]], AsyncIterator[Any]],
+        itens_por_requisicao: int = 100,
+        partes_de_arquivo: bool = False
+    ) -> AsyncIterator[Any]:
+        """Percorre um iterador paginado do Telegram respeitando o limite
+
+        A fábrica recebe o último item entregue (ou None) e deve devolver um
+        iterador que continue logo depois dele, para que a leitura seja
+        retomada após um FloodWait sem repetir itens.
+
+        Args:
+            fabrica: Função que cria o iterador a partir do último item entregue
+            itens_por_requisicao: Itens trazidos por cada requisição (página)
+            partes_de_arquivo: Se True, os itens são partes de um arquivo (ver aguardar_parte)
+        """
+        ultimo = None
+        tentativa = 0
+        aguardar = self.aguardar_parte if partes_de_arquivo else self.adquirir
+
+        while True:
+            await aguardar()
+            contador = 0
+
+            try:
+                async for item in fabrica(ultimo):
+                    ultimo = item
+                    tentativa = 0
+                    contador += 1
+
+                    # Cada nova página é uma nova requisição
+                    if contador % itens_por_requisicao == 0:
+                        self.registrar_sucesso()
+                        await aguardar()
+
+                    yield item
+                return
+
+            except FloodWait as e:
+                if tentativa >= self.max_tentativas - 1:
+                    raise
+                self.registrar_flood_wait(e.value, tentativa)
+                tentativa += 1
@@ -0,0 +1,96 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Coroutine
+
+class LoopTelegram:
+    """Thread dedicada com um único loop asyncio para as operações do Telegram
+
+    O cliente do Pyrogram pertence ao loop em que foi conectado, por isso
+    todas as corrotinas do Telegram são enviadas para esta thread com
+    run_coroutine_threadsafe. A thread é iniciada na primeira chamada e vive
+    até o encerramento da aplicação.
+    """
+
+    def __init__(self):
+        """Inicializa o loop, sem iniciar a thread"""
+        self.loop = None
+        self._thread = None
+        self._trava = threading.Lock()
+        self._tarefas = set()
+
+    @property
+    def ativo(self) -> bool:
+        """Indica se a thread do loop está em execução"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self):
+        """Inicia a thread do loop, se ainda não estiver em execução"""
+        with self._trava:
+            if self.ativo:
+                return
+
+            self.loop = asyncio.new_event_loop()
+            pronto = threading.Event()
+
+            def executar_loop():
+                asyncio.set_event_loop(self.loop)
+                self.loop.call_soon(pronto.set)
+                self.loop.run_forever()
+
+            self._thread = threading.Thread(target=executar_loop, name="LoopTelegram", daemon=True)
+            self._thread.start()
+            pronto.wait()
+
+    def executar(self, corrotina: Coroutine) -> concurrent.futures.Future:
+        """Agenda uma corrotina no loop e retorna um Future seguro entre threads"""
+        self.iniciar()
+        return asyncio.run_coroutine_threadsafe(self._rastrear(corrotina), self.loop)
+
+    async def _rastrear(self, corrotina: Coroutine) -> Any:
+        """Executa a corrotina registrando sua tarefa para o cancelamento no encerramento"""
+        tarefa = asyncio.current_task()
+        self._tarefas.add(tarefa)
+        try:
+            return await corrotina
+        finally:
+            self._tarefas.discard(tarefa)
+
+    def executar_e_aguardar(self, corrotina: Coroutine, timeout: float = None) -> Any:
+        """Executa uma corrotina no loop e aguarda o resultado na thread atual"""
+        return self.executar(corrotina).result(timeout)
+
+    def encerrar(self, timeout: float = 5.0, ao_encerrar: Callable[[], Awaitable[Any]] = None):
+        """Cancela as tarefas enviadas e encerra a thread do loop
+
+        Args:
+            timeout: Tempo máximo de espera de cada etapa, em segundos
+            ao_encerrar: Corrotina executada no loop depois do cancelamento das tarefas
+        """
+        with self._trava:
+            if not self.ativo:
+                return
+
+            async def cancelar_tarefas():
+                # Apenas as tarefas enviadas por executar são canceladas; as
+                # tarefas internas do cliente são encerradas por ao_encerrar
+                tarefas = list(self._tarefas)
+                for tarefa in tarefas:
+                    tarefa.cancel()
+                await asyncio.gather(*tarefas, return_exceptions=True)
+
+                if ao_encerrar:
+                    await ao_encerrar()
+
+            try:
+                asyncio.run_coroutine_threadsafe(cancelar_tarefas(), self.loop).result(timeout * 2)
+            except Exception as e:
+                print(f"Erro ao cancelar tarefas do Telegram: {e}")
+
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+
+            if not self._thread.is_alive():
+                self.loop.close()
+
+            self._thread = None
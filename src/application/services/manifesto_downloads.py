@@ -0,0 +1,85 @@
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.infrastructure.repositories import TelegramRepository
+
+class ManifestoDownloads:
+    """Manifesto dos downloads do Telegram com gravação em lotes
+
+    O estado de cada mídia é buscado no banco pelo file_unique_id do
+    Telegram na primeira vez em que a sessão precisa dele e fica em memória
+    daí em diante, de modo que o arquivo é reconhecido mesmo que tenha sido
+    renomeado ou movido, sem carregar o manifesto inteiro. As mudanças de
+    estado são acumuladas e gravadas no banco em lotes.
+    """
+
+    ESTADO_PARCIAL = "parcial"
+    ESTADO_CONCLUIDO = "concluido"
+    ESTADO_ERRO = "erro"
+
+    def __init__(self, repository: TelegramRepository, tamanho_lote: int = 50, intervalo: float = 5.0):
+        """Inicializa o manifesto vazio; as mídias são consultadas no banco quando necessárias"""
+        self.repository = repository
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+
+        self._concluidos: Dict[str, str] = {}
+        self._parciais: Dict[str, Tuple[str, int]] = {}
+        self._consultados: Set[str] = set()
+        self._pendentes: List[Tuple] = []
+        self._ultima_gravacao = time.monotonic()
+
+    def caminho(self, file_unique_id: str) -> Optional[str]:
+        """Retorna o caminho em que a mídia foi baixada"""
+        self._consultar(file_unique_id)
+        return self._concluidos.get(file_unique_id)
+
+    def parcial(self, file_unique_id: str) -> bool:
+        """Indica se a mídia tem um download interrompido a retomar"""
+        self._consultar(file_unique_id)
+        return file_unique_id in self._parciais
+
+    def bytes_parciais(self, file_unique_id: str) -> int:
+        """Retorna quantos bytes de um download interrompido já foram gravados"""
+        self._consultar(file_unique_id)
+        parcial = self._parciais.get(file_unique_id)
+        return parcial[1] if parcial else 0
+
+    def registrar(self, channel_id: int, message_id: int, file_unique_id: str, estado: str,
+                  tamanho: int = None, caminho: str = None, checksum: str = None,
+                  bytes_baixados: int = None, vista: str = None):
+        """Registra a mudança de estado de uma mídia; vista é o arquivo da mídia na pasta do canal"""
+        self._consultar(file_unique_id)
+        if estado == self.ESTADO_CONCLUIDO:
+            self._concluidos[file_unique_id] = caminho
+            self._parciais.pop(file_unique_id, None)
+        elif estado == self.ESTADO_PARCIAL:
+            self._parciais[file_unique_id] = (caminho, bytes_baixados or 0)
+
+        self._pendentes.append(
+            (channel_id, message_id, file_unique_id, estado, tamanho, caminho, checksum, bytes_baixados, vista)
+        )
+
+        if (len(self._pendentes) >= self.tamanho_lote
+                or time.monotonic() - self._ultima_gravacao >= self.intervalo):
+            self.gravar()
+
+    def gravar(self):
+        """Grava no banco as mudanças acumuladas"""
+        if self._pendentes:
+            entradas, self._pendentes = self._pendentes, []
+            self.repository.salvar_manifesto_em_lote(entradas)
+
+        self._ultima_gravacao = time.monotonic()
+
+    def _consultar(self, file_unique_id: str):
+        """Carrega do banco o estado da mídia, na primeira vez em que ela é consultada"""
+        if file_unique_id in self._consultados:
+            return
+
+        self._consultados.add(file_unique_id)
+        caminho, parcial = self.repository.obter_estado_arquivo(file_unique_id)
+        if caminho:
+            self._concluidos[file_unique_id] = caminho
+        if parcial:
+            self._parciais[file_unique_id] = parcial
@@ -0,0 +1,256 @@
+import asyncio
+import concurrent.futures
+import os
+import queue
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from src.infrastructure.repositories import CursoRepository
+
+class MontagemCurso:
+    """Monta um curso a partir dos vídeos de um canal do Telegram, durante o download
+
+    As aulas seguem a ordem das mensagens (message_id), os títulos vêm das
+    legendas e os módulos são definidos por legendas de cabeçalho ("Módulo
+    3 - ..."), pelos álbuns (grupos de mídia) e por intervalos longos entre
+    as postagens. As aulas são cadastradas em lotes assim que os arquivos
+    ficam prontos, e cada lote é publicado na fila de eventos na forma de
+    tuplas (tipo, dados):
+
+    - ("curso", (id_curso, nome))
+    - ("aulas", (id_curso, [(modulo, aula), ...]))
+    - ("reorganizado", id_curso)
+
+    Ao final, os módulos são recalculados com todas as mensagens vistas e
+    as aulas que mudaram de módulo são atualizadas no banco.
+
+    O banco é acessado apenas por uma thread própria da montagem, para que
+    as gravações não parem o loop do Telegram: adicionar() só agenda os
+    lotes, e abrir() e finalizar() são corrotinas.
+    """
+
+    # Intervalo entre postagens a partir do qual começa um novo módulo
+    LACUNA_MODULO = timedelta(days=3)
+
+    # Legendas que iniciam um módulo
+    PADRAO_MODULO = re.compile(
+        r'^\W*((?:m[oó]dulo|se[cç][aã]o|cap[ií]tulo|parte|unidade|semana)\s*[\dIVXLC]+\b.*)$',
+        re.IGNORECASE | re.MULTILINE
+    )
+
+    def __init__(self, caminho: str, nome: str, eventos: queue.Queue = None, db_path: str = None,
+                 tamanho_lote: int = 20, intervalo: float = 5.0):
+        """Inicializa a montagem do curso com a pasta do canal (ou URI do canal) e o nome do curso"""
+        self.caminho = caminho if "://" in caminho else os.path.normpath(caminho)
+        self.nome = nome
+        self.eventos = eventos
+        self.db_path = db_path
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+
+        self.id_curso = None
+        self.licoes: Dict[int, Dict[str, Any]] = {}  # message_id -> dados da mensagem
+        self.cadastradas: Dict[str, Tuple[Optional[str], Optional[int]]] = {}  # caminho -> (modulo, ordem)
+
+        self._repository = None
+        self._pendentes: Dict[int, str] = {}  # message_id -> caminho do arquivo pronto
+        self._ultima_gravacao = time.monotonic()
+
+        # Uma única thread, dona da conexão com o banco; os lotes são gravados na ordem
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def planejar(self, message):
+        """Registra os dados de uma mensagem de vídeo usados na montagem"""
+        legenda = (message.caption or "").strip()
+        cabecalho = self.PADRAO_MODULO.search(legenda)
+
+        self.licoes[message.id] = {
+            "data": message.date,
+            "grupo": message.media_group_id,
+            "titulo": self._titulo_da_legenda(legenda),
+            "duracao": self._formatar_duracao(getattr(message.video, "duration", None)),
+            "cabecalho": " ".join(cabecalho.group(1).split())[:100] if cabecalho else None,
+        }
+
+    def adicionar(self, message_id: int, caminho: str):
+        """Registra o arquivo pronto de uma aula, cadastrando-o no próximo lote"""
+        if caminho in self.cadastradas:
+            return
+
+        self._pendentes[message_id] = caminho
+
+        if (len(self._pendentes) >= self.tamanho_lote
+                or time.monotonic() - self._ultima_gravacao >= self.intervalo):
+            self.gravar()
+
+    def gravar(self) -> concurrent.futures.Future:
+        """Agenda o cadastro das aulas prontas desde a última gravação, sem aguardá-lo"""
+        self._ultima_gravacao = time.monotonic()
+        pendentes, self._pendentes = self._pendentes, {}
+
+        # As mensagens continuam sendo planejadas enquanto o lote é gravado
+        return self._executor.submit(self._gravar, pendentes, dict(self.licoes))
+
+    def _gravar(self, pendentes: Dict[int, str], licoes: Dict[int, Dict[str, Any]]):
+        """Cadastra um lote de aulas (na thread da montagem)"""
+        try:
+            if not pendentes or self._abrir() is None:
+                return
+            modulos = self._modulos(licoes)
+        except Exception as e:
+            print(f"Erro ao cadastrar aulas do curso {self.nome}: {e}")
+            return
+
+        videos = []
+        for message_id, caminho in sorted(pendentes.items()):
+            if caminho in self.cadastradas:
+                continue
+
+            licao = licoes.get(message_id, {})
+            modulo = modulos.get(message_id)
+            videos.append({
+                "numero": "",
+                "titulo": licao.get("titulo") or self._titulo_do_arquivo(caminho),
+                "caminho_video": caminho,
+                "duracao": licao.get("duracao") or "00:00:00",
+                "modulo": modulo,
+                "ordem": message_id,
+                "grupo": licao.get("grupo"),
+                "postada_em": licao["data"].isoformat() if licao.get("data") else None
+            })
+            self.cadastradas[caminho] = (modulo, message_id)
+
+        if videos and self._repository.inserir_aulas_em_lote(self.id_curso, videos):
+            aulas = self._repository.obter_aulas_por_caminhos(
+                self.id_curso, [video["caminho_video"] for video in videos]
+            )
+            self._publicar("aulas", (self.id_curso, aulas))
+
+    async def finalizar(self):
+        """Grava as aulas pendentes e corrige os módulos com todas as mensagens vistas"""
+        try:
+            await asyncio.wrap_future(self.gravar())
+            await asyncio.wrap_future(self._executor.submit(self._finalizar, dict(self.licoes)))
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def _finalizar(self, licoes: Dict[int, Dict[str, Any]]):
+        """Corrige os módulos das aulas cadastradas e fecha o repositório (na thread da montagem)"""
+        try:
+            if self.id_curso is None:
+                return
+
+            modulos = self._modulos(licoes)
+            alteracoes = []
+            for caminho, (modulo, ordem) in self.cadastradas.items():
+                if ordem in modulos and modulos[ordem] != modulo:
+                    alteracoes.append((modulos[ordem], ordem, caminho))
+                    self.cadastradas[caminho] = (modulos[ordem], ordem)
+
+            if alteracoes and self._repository.atualizar_modulos_aulas(self.id_curso, alteracoes):
+                self._publicar("reorganizado", self.id_curso)
+
+        finally:
+            if self._repository:
+                self._repository.fechar()
+                self._repository = None
+
+    async def abrir(self) -> Optional[int]:
+        """Cadastra o curso se necessário e retorna seu ID"""
+        return await asyncio.wrap_future(self._executor.submit(self._abrir))
+
+    def _abrir(self) -> Optional[int]:
+        """Abre o repositório, cadastra o curso se necessário e retorna seu ID (na thread da montagem)"""
+        if self._repository is None:
+            self._repository = CursoRepository(self.db_path)
+
+        if self.id_curso is None:
+            novo = self._repository.existe_curso(self.caminho) is None
+            self.id_curso = self._repository.obter_ou_criar_curso(self.caminho, self.nome)
+            if self.id_curso is None:
+                return None
+
+            self.cadastradas = self._repository.obter_modulos_aulas(self.id_curso)
+            if novo:
+                self._publicar("curso", (self.id_curso, self.nome))
+
+        return self.id_curso
+
+    def _modulos(self, licoes: Dict[int, Dict[str, Any]]) -> Dict[int, str]:
+        """Calcula o módulo de cada mensagem vista, na ordem dos message_id"""
+        ids = sorted(licoes)
+        if not ids:
+            return {}
+
+        # Aulas já cadastradas antes das mensagens vistas continuam a numeração
+        anteriores = {
+            modulo for modulo, ordem in self.cadastradas.values()
+            if modulo and ordem is not None and ordem < ids[0]
+        }
+        numero = len(anteriores)
+
+        # O cabeçalho de um álbum pode estar na legenda de qualquer uma das suas mensagens
+        cabecalhos_grupo = {}
+        for message_id in ids:
+            licao = licoes[message_id]
+            if licao["grupo"] is not None and licao["cabecalho"]:
+                cabecalhos_grupo.setdefault(licao["grupo"], licao["cabecalho"])
+
+        modulos = {}
+        nome = None
+        anterior = None
+
+        # Numa sincronização, as novas aulas podem continuar o último módulo cadastrado
+        ultima = self._repository.obter_aula_anterior(self.id_curso, ids[0]) if self.id_curso else None
+        if ultima and ultima["modulo"]:
+            nome = ultima["modulo"]
+            anterior = {
+                "grupo": ultima["grupo"],
+                "data": datetime.fromisoformat(ultima["postada_em"]) if ultima["postada_em"] else None,
+            }
+
+        for message_id in ids:
+            licao = licoes[message_id]
+            grupo = licao["grupo"]
+            grupo_anterior = anterior["grupo"] if anterior else None
+
+            # Mensagens do mesmo álbum ficam sempre no mesmo módulo
+            if grupo is None or grupo != grupo_anterior:
+                cabecalho = licao["cabecalho"] or cabecalhos_grupo.get(grupo)
+                lacuna = (anterior is not None and anterior["data"] is not None and licao["data"] is not None
+                          and licao["data"] - anterior["data"] > self.LACUNA_MODULO)
+                if anterior is None or cabecalho or grupo is not None or grupo_anterior is not None or lacuna:
+                    numero += 1
+                    nome = cabecalho or f"Módulo {numero:02d}"
+
+            modulos[message_id] = nome
+            anterior = licao
+
+        return modulos
+
+    def _titulo_da_legenda(self, legenda: str) -> Optional[str]:
+        """Usa a primeira linha da legenda que não seja cabeçalho de módulo nem hashtags"""
+        for linha in legenda.splitlines():
+            linha = " ".join(palavra for palavra in linha.split() if not palavra.startswith("#"))
+            if linha and not self.PADRAO_MODULO.match(linha):
+                return linha[:150]
+        return None
+
+    def _formatar_duracao(self, segundos: Optional[int]) -> Optional[str]:
+        """Formata a duração informada pelo Telegram como HH:MM:SS"""
+        if not segundos:
+            return None
+        segundos = int(segundos)
+        return f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+
+    def _titulo_do_arquivo(self, caminho: str) -> str:
+        """Título a partir do nome do arquivo, sem o prefixo de data do download"""
+        nome = os.path.splitext(os.path.basename(caminho))[0]
+        return re.sub(r'^\d{8}_', '', nome)
+
+    def _publicar(self, tipo: str, dados: Any = None):
+        """Publica um evento para a interface"""
+        if self.eventos is not None:
+            self.eventos.put((tipo, dados))
@@ -0,0 +1,262 @@
+import asyncio
+import collections
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.infrastructure.repositories import CursoRepository, TelegramRepository
+
+# Prioridade (nice) dos processos de pós-processamento, abaixo da do aplicativo
+PRIORIDADE_PROCESSOS = 10
+
+TAMANHO_BLOCO_CHECKSUM = 1024 * 1024
+TEMPO_LIMITE_FFMPEG = 120
+
+def _iniciar_processo():
+    """Reduz a prioridade do processo, para que o download e a interface tenham a CPU primeiro"""
+    if hasattr(os, "nice"):
+        try:
+            os.nice(PRIORIDADE_PROCESSOS)
+        except OSError:
+            pass
+
+def _executar_ffmpeg(comando: List[str]) -> Optional[subprocess.CompletedProcess]:
+    """Executa ffprobe/ffmpeg sem abrir janela de console; retorna None se não foi possível"""
+    try:
+        return subprocess.run(
+            comando, capture_output=True, timeout=TEMPO_LIMITE_FFMPEG,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def processar_arquivo(caminho: str, miniatura: Optional[str] = None) -> Dict[str, Any]:
+    """Calcula o checksum, lê duração e resolução e, se pedido, gera a miniatura de um vídeo
+
+    Executada nos processos do pool, por isso é uma função do módulo.
+    ffprobe e ffmpeg são opcionais: sem eles, apenas o checksum é calculado.
+    """
+    resultado = {"checksum": None, "tamanho": None, "duracao": None, "largura": None,
+                 "altura": None, "miniatura": None}
+
+    sha256 = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_CHECKSUM), b""):
+            sha256.update(bloco)
+    resultado["checksum"] = sha256.hexdigest()
+    resultado["tamanho"] = os.path.getsize(caminho)
+
+    if shutil.which("ffprobe"):
+        sonda = _executar_ffmpeg([
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "format=duration:stream=width,height", "-of", "json", caminho
+        ])
+        if sonda is not None and sonda.returncode == 0:
+            try:
+                dados = json.loads(sonda.stdout or b"{}")
+                fluxo = (dados.get("streams") or [{}])[0]
+                duracao = dados.get("format", {}).get("duration")
+                resultado["duracao"] = float(duracao) if duracao else None
+                resultado["largura"] = fluxo.get("width")
+                resultado["altura"] = fluxo.get("height")
+            except ValueError:
+                pass
+
+    if miniatura and shutil.which("ffmpeg"):
+        # Quadro a 10% do vídeo (no máximo aos 10 segundos), evitando telas pretas de abertura
+        posicao = min((resultado["duracao"] or 0) * 0.1, 10)
+        os.makedirs(os.path.dirname(miniatura), exist_ok=True)
+        quadro = _executar_ffmpeg([
+            "ffmpeg", "-v", "error", "-y", "-ss", f"{posicao:.2f}", "-i", caminho,
+            "-frames:v", "1", "-vf", "scale=320:-2", miniatura
+        ])
+        if quadro is not None and quadro.returncode == 0 and os.path.exists(miniatura):
+            resultado["miniatura"] = miniatura
+
+    return resultado
+
+
+class PosProcessamento:
+    """Pós-processamento dos vídeos baixados em um pool de processos
+
+    Cada download concluído é enfileirado com adicionar() e processado
+    (checksum, duração, resolução e, opcionalmente, miniatura) por
+    processar_arquivo em um ProcessPoolExecutor, em paralelo aos downloads.
+    Os resultados são gravados em lotes no manifesto e na duração das aulas.
+
+    Para não disputar a CPU com o download:
+    - o pool tem poucos processos, com prioridade reduzida;
+    - só max_processos arquivos são entregues ao pool por vez, e os demais
+      aguardam na fila;
+    - a fila tem tamanho limitado; o que passar do limite continua marcado
+      como não processado no manifesto e é retomado por retomar().
+
+    Deve ser usado no loop do Telegram.
+    """
+
+    def __init__(self, repository: TelegramRepository, db_path: str = None, pasta_miniaturas: str = None,
+                 max_processos: int = None, max_pendentes: int = 500, tamanho_lote: int = 20,
+                 intervalo: float = 5.0):
+        """Inicializa o pós-processamento, sem criar o pool
+
+        Args:
+            repository: Repositório do manifesto de downloads
+            db_path: Banco das aulas (padrão: o do aplicativo)
+            pasta_miniaturas: Pasta das miniaturas; se None, não são geradas
+            max_processos: Processos do pool (padrão: metade dos núcleos, no máximo 2)
+            max_pendentes: Tamanho máximo da fila em memória
+            tamanho_lote: Resultados acumulados antes de gravar no banco
+            intervalo: Tempo máximo, em segundos, entre as gravações
+        """
+        self.repository = repository
+        self.db_path = db_path
+        self.pasta_miniaturas = pasta_miniaturas
+        self.max_processos = max_processos or max(1, min(2, (os.cpu_count() or 2) // 2))
+        self.max_pendentes = max_pendentes
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+
+        self.processados = 0
+        self.descartados = 0
+
+        self._pool = None
+        self._fila: Deque[Tuple[str, str, Tuple[str, ...]]] = collections.deque()
+        self._na_fila = set()
+        self._resultados: List[Tuple[str, Tuple[str, ...], Dict[str, Any]]] = []
+        self._ultima_gravacao = time.monotonic()
+        self._despertar = None
+        self._tarefa = None
+        self._curso_repository = None
+
+    def adicionar(self, file_unique_id: str, caminho: str, caminhos_aulas: Tuple[str, ...] = ()):
+        """Enfileira um arquivo baixado; caminhos_aulas são as aulas que apontam para ele"""
+        if file_unique_id in self._na_fila:
+            return
+
+        if len(self._fila) >= self.max_pendentes:
+            # Fica para a próxima retomada, pelo manifesto
+            self.descartados += 1
+            return
+
+        self._fila.append((file_unique_id, caminho, tuple(caminhos_aulas)))
+        self._na_fila.add(file_unique_id)
+        self._acordar()
+
+    def retomar(self):
+        """Enfileira os arquivos baixados que ainda não foram processados, com as vistas do manifesto"""
+        pendentes = self.repository.obter_arquivos_sem_pos_processamento(self.max_pendentes)
+        for file_unique_id, caminho, vistas in pendentes:
+            if caminho and os.path.exists(caminho):
+                self.adicionar(file_unique_id, caminho, vistas)
+
+    async def encerrar(self):
+        """Interrompe o processamento, grava os resultados obtidos e encerra o pool"""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+        self._gravar()
+        if self._curso_repository is not None:
+            self._curso_repository.fechar()
+            self._curso_repository = None
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _acordar(self):
+        """Inicia o processamento ou o avisa de que há itens novos"""
+        if self._tarefa is None or self._tarefa.done():
+            self._despertar = asyncio.Event()
+            self._tarefa = asyncio.ensure_future(self._executar())
+        self._despertar.set()
+
+    async def _executar(self):
+        """Mantém até max_processos arquivos no pool e grava os resultados em lotes"""
+        em_andamento = set()
+        loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                while self._fila and len(em_andamento) < self.max_processos:
+                    item = self._fila.popleft()
+                    em_andamento.add(asyncio.ensure_future(self._processar(loop, item)))
+
+                if not em_andamento:
+                    # Fila vazia: gravar o que ficou e aguardar novos arquivos
+                    self._gravar()
+                    self._despertar.clear()
+                    await self._despertar.wait()
+                    continue
+
+                _, em_andamento = await asyncio.wait(
+                    em_andamento, timeout=self.intervalo, return_when=asyncio.FIRST_COMPLETED
+                )
+                if (len(self._resultados) >= self.tamanho_lote
+                        or time.monotonic() - self._ultima_gravacao >= self.intervalo):
+                    self._gravar()
+        finally:
+            for tarefa in em_andamento:
+                tarefa.cancel()
+
+    async def _processar(self, loop, item: Tuple[str, str, Tuple[str, ...]]):
+        """Processa um arquivo no pool e guarda o resultado para a próxima gravação"""
+        file_unique_id, caminho, caminhos_aulas = item
+        miniatura = (os.path.join(self.pasta_miniaturas, f"{file_unique_id}.jpg")
+                     if self.pasta_miniaturas else None)
+
+        try:
+            resultado = await loop.run_in_executor(self._obter_pool(), processar_arquivo, caminho, miniatura)
+            self._resultados.append((file_unique_id, caminhos_aulas, resultado))
+            self.processados += 1
+        except Exception as e:
+            print(f"Erro ao pós-processar {os.path.basename(caminho)}: {e}")
+        finally:
+            self._na_fila.discard(file_unique_id)
+
+    def _obter_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        """Retorna o pool de processos, criando-o na primeira chamada
+
+        Os processos são iniciados com spawn: um fork copiaria o loop do
+        Telegram, o Tk e as conexões SQLite do processo principal.
+        """
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_processos, initializer=_iniciar_processo,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _gravar(self):
+        """Grava no manifesto e nas aulas os resultados acumulados"""
+        self._ultima_gravacao = time.monotonic()
+        if not self._resultados:
+            return
+
+        resultados, self._resultados = self._resultados, []
+        self.repository.salvar_pos_processamento_em_lote([
+            (r["checksum"], r["duracao"], r["largura"], r["altura"], r["miniatura"], file_unique_id)
+            for file_unique_id, _, r in resultados
+        ])
+
+        duracoes = [
+            (self._formatar_duracao(r["duracao"]), caminho)
+            for _, caminhos_aulas, r in resultados if r["duracao"]
+            for caminho in caminhos_aulas
+        ]
+        if duracoes:
+            if self._curso_repository is None:
+                self._curso_repository = CursoRepository(self.db_path)
+            self._curso_repository.atualizar_duracoes_aulas(duracoes)
+
+    def _formatar_duracao(self, segundos: float) -> str:
+        """Formata a duração como HH:MM:SS"""
+        segundos = int(round(segundos))
+        return f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
@@ -0,0 +1,106 @@
+import os
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+class ReservaNomes:
+    """Reserva de nomes de arquivo livres por pasta, sem consultar o disco a cada tentativa
+
+    Os nomes existentes em cada pasta são lidos uma única vez (os.scandir)
+    e mantidos em memória. Para cada nome base há um contador com o próximo
+    sufixo a tentar, de modo que muitos arquivos com o mesmo nome (como
+    "Aula.mp4") recebem "Aula_1.mp4", "Aula_2.mp4"... sem repetir as
+    tentativas anteriores. As reservas são atômicas entre workers.
+    Arquivos criados na pasta por outros programas depois da leitura não
+    são vistos.
+
+    Também indica se uma mídia já tem uma vista (hardlink ou link
+    simbólico) na pasta, com qualquer nome, pelo inode do arquivo de origem.
+    """
+
+    def __init__(self):
+        """Inicializa a reserva sem nenhuma pasta carregada"""
+        self._trava = threading.Lock()
+        self._nomes: Dict[str, Set[str]] = {}
+        self._contadores: Dict[Tuple[str, str], int] = {}
+        self._vistas: Dict[str, Dict[Tuple[int, int], str]] = {}
+
+    def _nomes_da_pasta(self, pasta: str) -> Set[str]:
+        """Retorna os nomes ocupados de uma pasta, lendo-a na primeira vez"""
+        nomes = self._nomes.get(pasta)
+        if nomes is None:
+            try:
+                with os.scandir(pasta) as entradas:
+                    nomes = {entrada.name for entrada in entradas}
+            except OSError:
+                nomes = set()
+            self._nomes[pasta] = nomes
+        return nomes
+
+    def _vistas_da_pasta(self, pasta: str) -> Dict[Tuple[int, int], str]:
+        """Retorna os arquivos de uma pasta indexados pelo inode de destino, lendo-a na primeira vez"""
+        vistas = self._vistas.get(pasta)
+        if vistas is None:
+            vistas = {}
+            try:
+                with os.scandir(pasta) as entradas:
+                    for entrada in entradas:
+                        try:
+                            # Segue links simbólicos, para chegar ao arquivo armazenado
+                            info = entrada.stat()
+                        except OSError:
+                            continue
+                        vistas.setdefault((info.st_dev, info.st_ino), entrada.path)
+            except OSError:
+                pass
+            self._vistas[pasta] = vistas
+        return vistas
+
+    def vista(self, pasta: str, origem: str) -> Optional[str]:
+        """Retorna o arquivo da pasta que aponta para a origem, se houver"""
+        try:
+            info = os.stat(origem)
+        except OSError:
+            return None
+
+        with self._trava:
+            caminho = self._vistas_da_pasta(pasta).get((info.st_dev, info.st_ino))
+        return caminho if caminho and os.path.exists(caminho) else None
+
+    def registrar_vista(self, caminho: str, origem: str):
+        """Registra a vista criada para a origem"""
+        try:
+            info = os.stat(origem)
+        except OSError:
+            return
+
+        with self._trava:
+            self._vistas_da_pasta(os.path.dirname(caminho)).setdefault((info.st_dev, info.st_ino), caminho)
+
+    def reservar(self, caminho: str) -> str:
+        """Reserva o caminho, ou o primeiro caminho livre com sufixo numérico, e o retorna"""
+        pasta, nome = os.path.split(caminho)
+
+        with self._trava:
+            nomes = self._nomes_da_pasta(pasta)
+            if nome not in nomes:
+                nomes.add(nome)
+                return caminho
+
+            base, extensao = os.path.splitext(nome)
+            contador = self._contadores.get((pasta, nome), 1)
+            while f"{base}_{contador}{extensao}" in nomes:
+                contador += 1
+
+            livre = f"{base}_{contador}{extensao}"
+            nomes.add(livre)
+            self._contadores[(pasta, nome)] = contador + 1
+            return os.path.join(pasta, livre)
+
+    def liberar(self, caminho: str):
+        """Libera um caminho reservado cujo arquivo não chegou a ser criado"""
+        pasta, nome = os.path.split(caminho)
+
+        with self._trava:
+            nomes = self._nomes.get(pasta)
+            if nomes is not None:
+                nomes.discard(nome)
@@ -0,0 +1,314 @@
+import asyncio
+import mimetypes
+import os
+import secrets
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+from urllib.parse import quote, unquote
+
+class CachePartes:
+    """Cache em memória, de tamanho limitado, das partes de mídia já transmitidas
+
+    Guarda as partes mais recentemente usadas de cada mídia, de modo que
+    avançar e voltar no vídeo (ou as várias conexões que alguns players
+    abrem ao mesmo tempo) não repitam as mesmas requisições ao Telegram.
+    """
+
+    def __init__(self, max_partes: int = 64):
+        """Inicializa o cache com o número máximo de partes guardadas"""
+        self.max_partes = max_partes
+        self._partes: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+
+    def contem(self, chave: str, parte: int) -> bool:
+        """Indica se a parte está no cache, sem registrar o acesso"""
+        return (chave, parte) in self._partes
+
+    def obter(self, chave: str, parte: int) -> Optional[bytes]:
+        """Retorna os dados da parte, se estiver no cache, registrando o acesso"""
+        dados = self._partes.get((chave, parte))
+        if dados is not None:
+            self._partes.move_to_end((chave, parte))
+        return dados
+
+    def guardar(self, chave: str, parte: int, dados: bytes):
+        """Guarda uma parte, descartando as menos recentemente usadas se o cache estiver cheio"""
+        self._partes[(chave, parte)] = dados
+        self._partes.move_to_end((chave, parte))
+        while len(self._partes) > self.max_partes:
+            self._partes.popitem(last=False)
+
+
+class FonteArquivo:
+    """Mídia servida a partir de um arquivo local"""
+
+    TAMANHO_BLOCO = 256 * 1024
+
+    def __init__(self, caminho: str, tipo: str = None):
+        """Inicializa a fonte com o caminho do arquivo"""
+        self.caminho = caminho
+        self.tamanho = os.path.getsize(caminho)
+        self.tipo = tipo or mimetypes.guess_type(caminho)[0] or "application/octet-stream"
+
+    async def ler(self, inicio: int, fim: int) -> AsyncIterator[bytes]:
+        """Entrega os bytes de inicio a fim (inclusive) em blocos"""
+        with open(self.caminho, "rb") as arquivo:
+            arquivo.seek(inicio)
+            restantes = fim - inicio + 1
+            while restantes > 0:
+                bloco = arquivo.read(min(self.TAMANHO_BLOCO, restantes))
+                if not bloco:
+                    raise IOError(f"Fim inesperado de {os.path.basename(self.caminho)}")
+                restantes -= len(bloco)
+                yield bloco
+
+
+class FontePartes:
+    """Mídia lida sob demanda em partes de tamanho fixo, como em stream_media do Pyrogram
+
+    ler_partes(parte_inicial, quantidade) deve devolver um iterador
+    assíncrono com as partes a partir de parte_inicial. Apenas as partes
+    necessárias para o intervalo pedido são lidas, e as que já estão no
+    cache não são buscadas de novo.
+    """
+
+    def __init__(self, chave: str, tamanho: int, ler_partes: Callable[[int, int], AsyncIterator[bytes]],
+                 cache: CachePartes, tamanho_parte: int = 1024 * 1024, tipo: str = "video/mp4"):
+        """Inicializa a fonte com a chave da mídia no cache, o tamanho total e a função de leitura"""
+        self.chave = chave
+        self.tamanho = tamanho
+        self.ler_partes = ler_partes
+        self.cache = cache
+        self.tamanho_parte = tamanho_parte
+        self.tipo = tipo
+
+    async def ler(self, inicio: int, fim: int) -> AsyncIterator[bytes]:
+        """Entrega os bytes de inicio a fim (inclusive), parte por parte"""
+        parte = inicio // self.tamanho_parte
+        ultima = fim // self.tamanho_parte
+
+        while parte <= ultima:
+            dados = self.cache.obter(self.chave, parte)
+            if dados is not None:
+                yield self._recortar(parte, dados, inicio, fim)
+                parte += 1
+                continue
+
+            # Buscar de uma vez a sequência de partes que faltam no cache
+            fim_sequencia = parte
+            while fim_sequencia < ultima and not self.cache.contem(self.chave, fim_sequencia + 1):
+                fim_sequencia += 1
+
+            partes = self.ler_partes(parte, fim_sequencia - parte + 1)
+            try:
+                async for dados in partes:
+                    self.cache.guardar(self.chave, parte, dados)
+                    yield self._recortar(parte, dados, inicio, fim)
+                    parte += 1
+                    if parte > fim_sequencia:
+                        break
+            finally:
+                if hasattr(partes, "aclose"):
+                    await partes.aclose()
+
+            if parte <= fim_sequencia:
+                raise IOError(f"Transmissão interrompida na parte {parte} de {self.chave}")
+
+    def _recortar(self, parte: int, dados: bytes, inicio: int, fim: int) -> bytes:
+        """Recorta de uma parte apenas os bytes dentro do intervalo pedido"""
+        posicao = parte * self.tamanho_parte
+        return dados[max(inicio - posicao, 0):fim - posicao + 1]
+
+
+class ServidorMidia:
+    """Servidor HTTP local que entrega mídias com suporte a requisições Range
+
+    O servidor escuta apenas em 127.0.0.1 e só entrega as fontes
+    registradas, cada uma em uma URL com um token aleatório. Assim o player
+    do sistema pode começar a reprodução em poucos segundos e avançar no
+    vídeo pedindo apenas os trechos necessários, sem que o arquivo inteiro
+    seja baixado antes. Deve ser iniciado e usado no mesmo loop asyncio.
+    """
+
+    HOST = "127.0.0.1"
+
+    # Número de fontes registradas mantidas; as mais antigas são descartadas
+    MAX_FONTES = 32
+
+    # Limites da requisição aceita
+    MAX_CABECALHOS = 100
+    TEMPO_LIMITE_REQUISICAO = 30
+
+    def __init__(self, porta: int = 0):
+        """Inicializa o servidor, sem iniciá-lo; com porta 0 o sistema escolhe uma porta livre"""
+        self.porta = porta
+        self._servidor = None
+        self._fontes: "OrderedDict[str, Tuple[str, object]]" = OrderedDict()  # token -> (chave, fonte)
+        self._tokens: Dict[str, str] = {}  # chave -> token
+        self._conexoes = set()
+
+    @property
+    def ativo(self) -> bool:
+        """Indica se o servidor está escutando"""
+        return self._servidor is not None
+
+    async def iniciar(self):
+        """Começa a escutar conexões, se ainda não estiver escutando"""
+        if self._servidor is None:
+            self._servidor = await asyncio.start_server(self._atender, self.HOST, self.porta)
+            self.porta = self._servidor.sockets[0].getsockname()[1]
+
+    async def encerrar(self):
+        """Para de escutar e descarta as fontes registradas"""
+        servidor, self._servidor = self._servidor, None
+        if servidor is not None:
+            servidor.close()
+            # Fechar as transmissões em andamento, que manteriam o servidor aberto
+            for writer in list(self._conexoes):
+                writer.close()
+            await servidor.wait_closed()
+        self._fontes.clear()
+        self._tokens.clear()
+
+    def registrar(self, chave: str, fonte, nome: str = "video.mp4") -> str:
+        """Registra uma fonte e retorna sua URL; a mesma chave reaproveita o token anterior"""
+        token = self._tokens.get(chave)
+        if token is None:
+            token = secrets.token_urlsafe(16)
+            self._tokens[chave] = token
+
+        self._fontes[token] = (chave, fonte)
+        self._fontes.move_to_end(token)
+        while len(self._fontes) > self.MAX_FONTES:
+            _, (antiga, _) = self._fontes.popitem(last=False)
+            self._tokens.pop(antiga, None)
+
+        return f"http://{self.HOST}:{self.porta}/{token}/{quote(nome)}"
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atende uma requisição e fecha a conexão"""
+        self._conexoes.add(writer)
+        try:
+            requisicao = await asyncio.wait_for(self._ler_requisicao(reader), self.TEMPO_LIMITE_REQUISICAO)
+            if requisicao is None:
+                await self._responder(writer, 400, "Bad Request")
+                return
+
+            metodo, caminho, cabecalhos = requisicao
+            if metodo not in ("GET", "HEAD"):
+                await self._responder(writer, 405, "Method Not Allowed", {"Allow": "GET, HEAD"})
+                return
+
+            token = unquote(caminho.lstrip("/").split("/", 1)[0])
+            registro = self._fontes.get(token)
+            if registro is None:
+                await self._responder(writer, 404, "Not Found")
+                return
+
+            await self._enviar_midia(writer, metodo, registro[1], cabecalhos.get("range"))
+
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            # O player fechou a conexão (por exemplo, ao avançar no vídeo)
+            pass
+        except Exception as e:
+            print(f"Erro ao transmitir mídia: {e}")
+        finally:
+            self._conexoes.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _ler_requisicao(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str]]]:
+        """Lê a linha de requisição e os cabeçalhos; retorna None se a requisição for inválida"""
+        partes = (await reader.readline()).decode("latin-1").split()
+        if len(partes) != 3 or not partes[2].startswith("HTTP/"):
+            return None
+
+        cabecalhos = {}
+        for _ in range(self.MAX_CABECALHOS):
+            linha = (await reader.readline()).decode("latin-1").strip()
+            if not linha:
+                return partes[0], partes[1], cabecalhos
+            nome, _, valor = linha.partition(":")
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+        return None
+
+    def _analisar_range(self, valor: Optional[str], tamanho: int) -> Optional[Tuple[int, int]]:
+        """Converte o cabeçalho Range em (inicio, fim), inclusive
+
+        Retorna None para servir o arquivo inteiro (sem Range, com vários
+        intervalos ou com sintaxe inválida) e levanta ValueError se o
+        intervalo não puder ser atendido.
+        """
+        if not valor or not valor.startswith("bytes=") or "," in valor:
+            return None
+
+        inicio, _, fim = valor[len("bytes="):].strip().partition("-")
+        try:
+            inicio = int(inicio) if inicio else None
+            fim = int(fim) if fim else None
+        except ValueError:
+            return None
+
+        if inicio is None:
+            # Sufixo: os últimos N bytes
+            if not fim:
+                raise ValueError("Intervalo vazio")
+            return max(tamanho - fim, 0), tamanho - 1
+
+        fim = tamanho - 1 if fim is None else min(fim, tamanho - 1)
+        if inicio >= tamanho or fim < inicio:
+            raise ValueError("Intervalo fora do arquivo")
+        return inicio, fim
+
+    async def _enviar_midia(self, writer: asyncio.StreamWriter, metodo: str, fonte, valor_range: Optional[str]):
+        """Envia a mídia inteira ou o intervalo pedido"""
+        try:
+            intervalo = self._analisar_range(valor_range, fonte.tamanho)
+        except ValueError:
+            await self._responder(writer, 416, "Range Not Satisfiable",
+                                  {"Content-Range": f"bytes */{fonte.tamanho}"})
+            return
+
+        cabecalhos = {"Content-Type": fonte.tipo, "Accept-Ranges": "bytes"}
+        if intervalo is None:
+            inicio, fim = 0, fonte.tamanho - 1
+            codigo, motivo = 200, "OK"
+        else:
+            inicio, fim = intervalo
+            codigo, motivo = 206, "Partial Content"
+            cabecalhos["Content-Range"] = f"bytes {inicio}-{fim}/{fonte.tamanho}"
+
+        cabecalhos["Content-Length"] = str(max(fim - inicio + 1, 0))
+        self._escrever_cabecalhos(writer, codigo, motivo, cabecalhos)
+        await writer.drain()
+
+        if metodo == "HEAD" or fonte.tamanho == 0:
+            return
+
+        # drain aplica a contrapressão: a leitura só avança no ritmo do player
+        dados = fonte.ler(inicio, fim)
+        try:
+            async for bloco in dados:
+                writer.write(bloco)
+                await writer.drain()
+        finally:
+            await dados.aclose()
+
+    async def _responder(self, writer: asyncio.StreamWriter, codigo: int, motivo: str,
+                         cabecalhos: Dict[str, str] = None):
+        """Envia uma resposta sem corpo"""
+        cabecalhos = dict(cabecalhos or {})
+        cabecalhos["Content-Length"] = "0"
+        self._escrever_cabecalhos(writer, codigo, motivo, cabecalhos)
+        await writer.drain()
+
+    def _escrever_cabecalhos(self, writer: asyncio.StreamWriter, codigo: int, motivo: str,
+                             cabecalhos: Dict[str, str]):
+        """Escreve a linha de status e os cabeçalhos da resposta"""
+        linhas = [f"HTTP/1.1 {codigo} {motivo}"]
+        linhas += [f"{nome}: {valor}" for nome, valor in cabecalhos.items()]
+        linhas.append("Connection: close")
+        writer.write(("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1"))
@@ -1,18 +1,49 @@
 import os
 import configparser
+import shutil
 import json
 import asyncio
-from typing import List, Dict, Any, Optional, Set
+import queue
+import threading
+import time
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
-from pyrogram import Client
-from pyrogram.errors import RPCError
+
+from src.infrastructure.repositories import TelegramRepository
+from .agendador_downloads import AgendadorDownloads
+from .cache_aulas import CacheAulas
+from .limitador_requisicoes import LimitadorRequisicoes
+from .loop_telegram import LoopTelegram
+from .manifesto_downloads import ManifestoDownloads
+from .montagem_curso import MontagemCurso
+from .pos_processamento import PosProcessamento
+from .reserva_nomes import ReservaNomes
+from .servidor_midia import CachePartes, FonteArquivo, FontePartes, ServidorMidia
+from .telemetria_downloads import ArquivoTelemetria, TelemetriaDownloads
 
 try:
+    from pyrogram import Client
+    from pyrogram.errors import RPCError
     from pyrogram.types import Chat, Message
-    from pyrogram.enums import ChatType
+    from pyrogram.enums import ChatType, MessagesFilter
     PYROGRAM_AVAILABLE = True
 except ImportError:
     PYROGRAM_AVAILABLE = False
+    Client = Chat = Message = None
+    
+    # Substitutos usados quando o Pyrogram não está instalado, para que o
+    # serviço funcione com um cliente alternativo (como o cliente falso)
+    class RPCError(Exception):
+        """Substituto usado quando o Pyrogram não está instalado"""
+    
+    class ChatType:
+        """Substituto usado quando o Pyrogram não está instalado"""
+        CHANNEL = "channel"
+        SUPERGROUP = "supergroup"
+    
+    class MessagesFilter:
+        """Substituto usado quando o Pyrogram não está instalado"""
+        VIDEO = "video"
 
 class TelegramService:
     """Serviço para gerenciar conexão e downloads do Telegram"""
@@ -20,8 +51,62 @@ class TelegramService:
     # Arquivo de configuração salvo na pasta do usuário para maior segurança
     CONFIG_FILE = os.path.join(os.path.expanduser("~"), ".plano_estudo_telegram.json")
     
-    def __init__(self):
-        """Inicializa o serviço de Telegram"""
+    # Cache da lista de canais e tempo, em segundos, após o qual ela é atualizada
+    CANAIS_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".plano_estudo_telegram_canais.json")
+    CANAIS_CACHE_TTL = 6 * 60 * 60
+    
+    # Número de diálogos lidos entre as atualizações parciais da lista de canais
+    DIALOGOS_POR_PAGINA = 100
+    
+    # Número padrão de downloads simultâneos
+    MAX_DOWNLOADS_SIMULTANEOS = 3
+    
+    # Tamanho das partes entregues por stream_media (1 MB, definido pelo Pyrogram)
+    TAMANHO_PARTE = 1024 * 1024
+    
+    # Arquivos a partir deste tamanho são baixados em partes e podem ser retomados
+    TAMANHO_MINIMO_RETOMADA = 10 * TAMANHO_PARTE
+    
+    # Intervalo, em partes, entre os registros do progresso no manifesto
+    PARTES_POR_REGISTRO = 8
+    
+    # Download segmentado: arquivos grandes baixados em vários trechos simultâneos
+    TAMANHO_MINIMO_SEGMENTADO = 64 * TAMANHO_PARTE
+    PARTES_POR_SEGMENTO = 16
+    SEGMENTOS_SIMULTANEOS = 4
+    
+    # Período, em segundos, após um FloodWait em que o download segmentado é evitado
+    JANELA_PRESSAO_FLOOD = 120
+    
+    # Máximo de IDs por chamada a get_messages (limite da API do Telegram)
+    MENSAGENS_POR_LOTE = 200
+    
+    # Pasta, dentro da pasta de downloads, com uma única cópia de cada mídia
+    PASTA_ARMAZENAMENTO = ".armazenamento"
+    
+    # Cursos virtuais: aulas identificadas por tg://<channel_id>/<message_id> e
+    # baixadas sob demanda para um cache de tamanho limitado
+    PREFIXO_AULA_VIRTUAL = "tg://"
+    PASTA_CACHE_AULAS = ".cache_aulas"
+    TAMANHO_CACHE_AULAS = 5 * 1024 * 1024 * 1024
+    AULAS_PRE_CARREGADAS = 2
+    
+    # Aulas virtuais fora do cache são transmitidas ao player por um servidor
+    # HTTP local, mantendo em memória até este número de partes recentes
+    PARTES_CACHE_TRANSMISSAO = 64
+    
+    # Miniaturas geradas pelo pós-processamento, dentro do armazenamento
+    PASTA_MINIATURAS = ".miniaturas"
+    
+    def __init__(self, cliente=None, db_path: str = None, pasta_downloads: str = None):
+        """Inicializa o serviço de Telegram
+        
+        Args:
+            cliente: Cliente já criado (ver ClienteTelegram), usado no lugar do
+                cliente do Pyrogram; com ele, as credenciais não são carregadas
+            db_path: Banco de dados do manifesto e dos cursos montados (padrão: o do aplicativo)
+            pasta_downloads: Pasta dos downloads (padrão: ~/Downloads/TelegramVideos)
+        """
         self.app = None
         self.client_ready = False
         self.config_path = 'config.ini'
@@ -29,10 +114,42 @@ class TelegramService:
         self.download_dir = 'downloads'
         self.api_id = None
         self.api_hash = None
+        self.max_downloads_simultaneos = self.MAX_DOWNLOADS_SIMULTANEOS
+        self.download_segmentado = False
+        self.tamanho_cache_aulas = self.TAMANHO_CACHE_AULAS
+        self.aulas_pre_carregadas = self.AULAS_PRE_CARREGADAS
+        self.transmitir_aulas = True
+        self.pos_processar = True
+        self.gerar_miniaturas = False
+        self.db_path = db_path
+        self.pasta_downloads = pasta_downloads
+        self.limitador = LimitadorRequisicoes()
+        
+        # Um único loop, em thread própria, mantém o cliente conectado
+        self.loop_telegram = LoopTelegram()
+        self._cliente_conectado = None
+        self._trava_conexao = None
+        self._semaforo_downloads = None
+        self._armazenamentos_em_andamento = {}
+        self._cache_aulas = None
+        self._servidor_midia = None
+        self._cache_partes = CachePartes(self.PARTES_CACHE_TRANSMISSAO)
+        self._pos_processamento = None
+        
+        # Eventos da montagem de cursos a partir dos canais, consumidos pela interface
+        self.eventos_cursos = queue.Queue()
+        
+        self.repository = TelegramRepository(db_path)
         
         # Criar diretório de downloads se não existir
         if not os.path.exists(self.download_dir):
             os.makedirs(self.download_dir)
+        
+        # Cliente fornecido (por exemplo, o cliente falso dos benchmarks)
+        if cliente is not None:
+            self.app = cliente
+            self.client_ready = True
+            return
             
         # Verificar se a biblioteca está disponível
         if not PYROGRAM_AVAILABLE:
@@ -67,7 +184,8 @@ class TelegramService:
             self.api_hash = config.get("pyrogram", "api_hash")
             
             # Criar cliente Pyrogram
-            self.app = Client(self.session_name, api_id=self.api_id, api_hash=self.api_hash)
+            self.app = Client(self.session_name, api_id=self.api_id, api_hash=self.api_hash,
+                              sleep_threshold=0)
             self.client_ready = True
             return True
         except Exception as e:
@@ -92,7 +210,14 @@ class TelegramService:
             # Salvar no arquivo de configuração
             config = {
                 'api_id': api_id,
-                'api_hash': api_hash
+                'api_hash': api_hash,
+                'max_downloads_simultaneos': self.max_downloads_simultaneos,
+                'download_segmentado': self.download_segmentado,
+                'tamanho_cache_aulas_mb': self.tamanho_cache_aulas // (1024 * 1024),
+                'aulas_pre_carregadas': self.aulas_pre_carregadas,
+                'transmitir_aulas': self.transmitir_aulas,
+                'pos_processar': self.pos_processar,
+                'gerar_miniaturas': self.gerar_miniaturas
             }
             
             # Garantir que o diretório de configuração exista
@@ -107,215 +232,206 @@ class TelegramService:
             print(f"Erro ao salvar credenciais: {e}")
             return False
             
-    async def list_channels(self) -> List[Dict[str, Any]]:
-        """Lista todos os canais e grupos disponíveis"""
+    async def list_channels(self, on_parcial=None) -> List[Dict[str, Any]]:
+        """Lista todos os canais e grupos disponíveis
+        
+        Os diálogos são lidos em páginas; a cada página, on_parcial (se
+        informado) recebe a lista de canais encontrados até o momento. Ao
+        final de uma listagem completa, a lista é gravada no cache.
+        """
         if not self.client_ready:
             return []
             
         channels = []
+        vistos = set()
+        
+        async def listar(client):
+            # A listagem de diálogos não pode ser retomada do meio, então é
+            # refeita após um FloodWait e os canais repetidos são ignorados
+            dialogos = 0
+            async for dialog in self.limitador.iterar(lambda ultimo: client.get_dialogs()):
+                chat = dialog.chat
+                if chat.type in (ChatType.CHANNEL, ChatType.SUPERGROUP) and chat.id not in vistos:
+                    vistos.add(chat.id)
+                    channels.append({
+                        'id': chat.id,
+                        'title': chat.title,
+                        'type': str(chat.type),
+                        'members_count': getattr(chat, 'members_count', 0)
+                    })
+                
+                dialogos += 1
+                if on_parcial and dialogos % self.DIALOGOS_POR_PAGINA == 0:
+                    on_parcial(list(channels))
+        
         try:
-            # Verificar se o cliente já está conectado
-            is_connected = getattr(self.app, "is_connected", False)
-            
-            if is_connected:
-                # Se já está conectado, usar diretamente
-                async for dialog in self.app.get_dialogs():
-                    chat = dialog.chat
-                    if chat.type in (ChatType.CHANNEL, ChatType.SUPERGROUP):
-                        channels.append({
-                            'id': chat.id,
-                            'title': chat.title,
-                            'type': str(chat.type),
-                            'members_count': getattr(chat, 'members_count', 0)
-                        })
-            else:
-                # Se não está conectado, usar o contexto async with
-                async with self.app:
-                    async for dialog in self.app.get_dialogs():
-                        chat = dialog.chat
-                        if chat.type in (ChatType.CHANNEL, ChatType.SUPERGROUP):
-                            channels.append({
-                                'id': chat.id,
-                                'title': chat.title,
-                                'type': str(chat.type),
-                                'members_count': getattr(chat, 'members_count', 0)
-                            })
+            # A conexão é reaproveitada entre as listagens
+            await self._executar_conectado(listar)
+            self._salvar_cache_canais(channels)
         except Exception as e:
             print(f"Erro ao listar canais: {e}")
             
         return channels
+    
+    def carregar_cache_canais(self) -> tuple:
+        """Carrega a lista de canais do cache
+        
+        Returns:
+            tuple: (canais, expirado); expirado é True se o cache não existe ou passou do TTL
+        """
+        try:
+            if os.path.exists(self.CANAIS_CACHE_FILE):
+                with open(self.CANAIS_CACHE_FILE, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+                
+                idade = time.time() - cache.get('atualizado_em', 0)
+                return cache.get('canais', []), idade > self.CANAIS_CACHE_TTL
+        except Exception as e:
+            print(f"Erro ao carregar cache de canais: {e}")
+        
+        return [], True
+    
+    def _salvar_cache_canais(self, channels: List[Dict[str, Any]]):
+        """Grava a lista de canais no cache"""
+        try:
+            temporario = self.CANAIS_CACHE_FILE + ".tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({'atualizado_em': time.time(), 'canais': channels}, f, ensure_ascii=False)
+            os.replace(temporario, self.CANAIS_CACHE_FILE)
+        except Exception as e:
+            print(f"Erro ao salvar cache de canais: {e}")
         
-    async def download_channel_videos(self, channel_id, progress_callback=None):
+    async def download_messages_range(self, channel_id, primeiro_id: int, ultimo_id: int,
+                                      progress_callback=None, max_simultaneos: int = None):
         """
-        Faz download de todos os vídeos de um canal específico
+        Faz download das mídias de um intervalo de mensagens de um canal
+        
+        Os IDs são pedidos em lotes de até MENSAGENS_POR_LOTE por chamada e os
+        grupos de mídia são montados a partir dos próprios lotes, sem chamadas
+        a get_media_group. Os downloads são distribuídos entre os workers.
         
         Args:
             channel_id: ID do canal
+            primeiro_id: Primeira mensagem do intervalo
+            ultimo_id: Última mensagem do intervalo (inclusive)
             progress_callback: Função de callback para reportar progresso
+            max_simultaneos: Número de downloads simultâneos (padrão: configuração do serviço)
         
         Returns:
-            dict: Resultados do download
+            dict: Resultados do download, no mesmo formato de download_channel_videos
         """
-        print(f"TelegramService.download_channel_videos iniciando para canal {channel_id}")
         if not self.has_valid_credentials():
-            print("Credenciais inválidas")
-            raise ValueError("Credenciais de API não configuradas. Configure suas credenciais em 'Telegram > Configurar API'")
-            
-        # Verificar se o cliente já está conectado
-        is_connected = getattr(self.app, "is_connected", False)
-        print(f"Cliente já está conectado? {is_connected}")
-        
-        download_path = os.path.join(os.path.expanduser("~"), "Downloads", "TelegramVideos")
-        os.makedirs(download_path, exist_ok=True)
-        print(f"Usando pasta de download: {download_path}")
+            raise ValueError("Credenciais de API não configuradas")
         
+        primeiro_id, ultimo_id = sorted((primeiro_id, ultimo_id))
         status = {
             "total": 0,
             "baixados": 0,
             "ignorados": 0,
             "erros": 0,
-            "arquivos": []
+            "arquivos": [],
+            **self.limitador.estado()
         }
+        telemetria = TelemetriaDownloads()
+        status.update(telemetria.estado())
         
-        try:
-            print("Obtendo cliente Telegram")
-            client = self._get_client()
+        client = await self._conectar()
+        channel_dir = await self._obter_pasta_canal(client, channel_id, self._obter_pasta_downloads())
+        manifesto = ManifestoDownloads(self.repository)
+        nomes = ReservaNomes()
+        
+        def itens_do_grupo(media_group_id, mensagens):
+            # Criar pasta para o grupo de mídia
+            group_dir = os.path.join(channel_dir, f"media_group_{media_group_id}")
+            os.makedirs(group_dir, exist_ok=True)
+            return [(msg, group_dir) for msg in sorted(mensagens, key=lambda msg: msg.id)]
+        
+        async def midias_do_intervalo():
+            grupos = {}
             
-            # Função para processar as mensagens
-            async def process_messages():
-                print("Iniciando processamento de mensagens")
-                # Contar mensagens com mídia
-                count = 0
-                print("Contando mensagens com vídeo")
-                async for message in client.get_chat_history(channel_id):
-                    if message.video:
-                        count += 1
+            for topo in range(ultimo_id, primeiro_id - 1, -self.MENSAGENS_POR_LOTE):
+                ids = list(range(topo, max(primeiro_id - 1, topo - self.MENSAGENS_POR_LOTE), -1))
                 
-                status["total"] = count
-                print(f"Total de vídeos encontrados: {count}")
-                if progress_callback:
-                    print("Chamando callback de progresso inicial")
-                    progress_callback(status)
+                try:
+                    mensagens = await self.limitador.executar(
+                        client.get_messages, channel_id, message_ids=ids
+                    )
+                except Exception as e:
+                    print(f"Erro ao obter mensagens {ids[-1]}-{ids[0]}: {e}")
+                    status["erros"] += 1
+                    continue
                 
-                # Processar e baixar
-                print("Iniciando download dos vídeos")
-                async for message in client.get_chat_history(channel_id):
-                    if message.video:
-                        video = message.video
-                        file_name = f"{message.date.strftime('%Y%m%d')}_{video.file_name or f'video_{video.file_id[-10:]}.mp4'}"
-                        file_path = os.path.join(download_path, file_name)
-                        print(f"Processando vídeo: {file_name}")
-                        
-                        if os.path.exists(file_path):
-                            print(f"Vídeo já existe, ignorando: {file_path}")
-                            status["ignorados"] += 1
-                        else:
-                            try:
-                                print(f"Baixando vídeo para: {file_path}")
-                                await client.download_media(
-                                    message, 
-                                    file_name=file_path
-                                )
-                                print(f"Download concluído: {file_path}")
-                                status["baixados"] += 1
-                                status["arquivos"].append(file_path)
-                            except Exception as e:
-                                print(f"Erro ao baixar vídeo: {e}")
-                                status["erros"] += 1
-                        
-                        if progress_callback:
-                            print("Atualizando progresso")
-                            progress_callback(status)
+                for message in mensagens:
+                    if message.empty or not message.media:
+                        continue
+                    
+                    status["total"] += 1
+                    if message.media_group_id:
+                        grupos.setdefault(message.media_group_id, []).append(message)
+                    else:
+                        # Mensagem de mídia única
+                        yield message, channel_dir
                 
-                print(f"Processamento concluído. Status final: {status}")
+                # Um grupo que chega ao fim do lote pode continuar no próximo
+                completos = [
+                    media_group_id for media_group_id, grupo in grupos.items()
+                    if all(msg.id != ids[-1] for msg in grupo)
+                ]
+                for media_group_id in completos:
+                    for item in itens_do_grupo(media_group_id, grupos.pop(media_group_id)):
+                        yield item
             
-            # Executar de acordo com o estado de conexão
-            if is_connected:
-                print("Executando com cliente já conectado")
-                await process_messages()
-                return status
+            for media_group_id, grupo in grupos.items():
+                for item in itens_do_grupo(media_group_id, grupo):
+                    yield item
+        
+        def registrar_resultado(item, resultado):
+            status.update(self.limitador.estado())
+            if resultado is None:
+                status["ignorados"] += 1
+            elif isinstance(resultado, Exception) or not resultado:
+                status["erros"] += 1
             else:
-                print("Conectando cliente com context manager")
-                async with client:
-                    await process_messages()
-                    return status
-                
-        except RPCError as e:
-            print(f"Erro do Telegram: {e}")
-            raise
-        except Exception as e:
-            print(f"Erro ao baixar vídeos: {e}")
-            raise
-    
-    async def _download_messages_range(
-        self, channel_id: int, channel_dir: str, 
-        start_id: int, end_id: int, 
-        processed_media_groups: Set[str], control_data: Dict[str, Any],
-        progress_callback=None
-    ):
-        """Faz download de mensagens em um intervalo específico"""
-        total_range = start_id - end_id
-        current = 0
-        
-        message_id = start_id
-        async with self.app:
-            while message_id > end_id:
-                # Atualizar progresso
-                if progress_callback and total_range > 0:
-                    current += 1
-                    progress_percent = min(int((current / total_range) * 100), 100)
-                    progress_callback(progress_percent, 100, f"Mensagem {message_id}/{start_id}")
-                
-                try:
-                    message = await self.app.get_messages(channel_id, message_ids=message_id)
-                    
-                    if not message.empty and message.media:
-                        if message.media_group_id:
-                            # Mensagem faz parte de um grupo de mídia
-                            if message.media_group_id not in processed_media_groups:
-                                # Criar pasta para o grupo de mídia
-                                group_dir = os.path.join(channel_dir, f"media_group_{message.media_group_id}")
-                                if not os.path.exists(group_dir):
-                                    os.makedirs(group_dir)
-                                
-                                # Baixar grupo de mídia
-                                media_group = await self.app.get_media_group(channel_id, message.id)
-                                download_success = True
-                                
-                                for msg in media_group:
-                                    success = await self._download_media(msg, group_dir)
-                                    if not success:
-                                        download_success = False
-                                        break
-                                
-                                if download_success:
-                                    processed_media_groups.add(message.media_group_id)
-                                    control_data["processed_media_groups"] = list(processed_media_groups)
-                                    control_data["last_message_id"] = message_id
-                                    self._save_control_file(channel_id, control_data)
-                        else:
-                            # Mensagem de mídia única
-                            success = await self._download_media(message, channel_dir)
-                            if success:
-                                control_data["last_message_id"] = message_id
-                                self._save_control_file(channel_id, control_data)
-                
-                except errors.FloodWait as e:
-                    if progress_callback:
-                        progress_callback(0, 100, f"Aguardando {e.value} segundos (limite de requisições)...")
-                    await asyncio.sleep(e.value)
-                    continue
-                except Exception as e:
-                    print(f"Erro ao processar mensagem {message_id}: {e}")
-                
-                message_id -= 1
+                status["baixados"] += 1
+            
+            if progress_callback and telemetria.pronto_para_notificar():
+                concluidos = status["baixados"] + status["ignorados"] + status["erros"]
+                status.update(telemetria.estado(status["total"] - concluidos))
+                progress_callback(status)
+        
+        agendador = AgendadorDownloads(
+            max_simultaneos or self.max_downloads_simultaneos,
+            semaforo=self._obter_semaforo_downloads()
+        )
+        try:
+            with self.limitador.observar_chamadas(lambda estado: telemetria.registrar_espera(estado["espera"])):
+                await agendador.executar(
+                    midias_do_intervalo(),
+                    lambda item: self._download_media(client, item[0], item[1], manifesto, nomes, telemetria),
+                    registrar_resultado
+                )
+        finally:
+            manifesto.gravar()
+            self._registrar_sessao(channel_id, telemetria, status)
+        
+        status.update(telemetria.estado())
+        if progress_callback:
+            progress_callback(status)
+        return status
     
-    async def _download_media(self, message: Message, folder: str) -> bool:
-        """Faz download de uma mídia específica"""
+    async def _download_media(self, client, message: Message, folder: str, manifesto: ManifestoDownloads,
+                              nomes: ReservaNomes = None,
+                              telemetria: TelemetriaDownloads = None) -> Optional[bool]:
+        """Faz download de uma mídia específica, registrando-a no manifesto
+        
+        Retorna True se a mídia está na pasta, None se ela não é suportada
+        (ignorada) e False se o download falhou.
+        """
         try:
             extension = self._get_media_extension(message)
-            if not extension:
-                return False  # Não é uma mídia suportada
+            midia = self._obter_midia(message)
+            if not extension or not midia:
+                return None  # Não é uma mídia suportada
             
             # Obter nome do arquivo
             if message.caption:
@@ -329,70 +445,77 @@ class TelegramService:
             filename = self._sanitize_filename(filename)
             file_path = os.path.join(folder, f"{filename}{extension}")
             
-            # Verificar se o arquivo já existe
-            base_path = file_path
-            counter = 1
-            while os.path.exists(file_path):
-                name, ext = os.path.splitext(base_path)
-                file_path = f"{name}_{counter}{ext}"
-                counter += 1
+            # Outro download (de outro canal ou item da fila) pode estar trazendo a mesma mídia
+            await self._aguardar_armazenamento(midia.file_unique_id)
             
-            # Fazer download
-            await message.download(file_name=file_path)
-            print(f"Baixou mídia: {os.path.basename(file_path)}")
+            # Mídias já armazenadas são reconhecidas pelo identificador, mesmo se
+            # movidas; basta criar a vista nesta pasta, se ainda não existir
+            nomes = nomes if nomes is not None else ReservaNomes()
+            armazenado = self._caminho_armazenamento(midia.file_unique_id, extension)
+            origem = manifesto.caminho(midia.file_unique_id)
+            if not (origem and os.path.exists(origem)):
+                origem = armazenado if os.path.exists(armazenado) else None
             
-            # Aguardar para evitar limites de requisição
-            await asyncio.sleep(1)
+            # A vista pode já existir com outro nome (legendas repetidas recebem sufixos)
+            if origem and nomes.vista(folder, origem):
+                return True
+            
+            # Reservar um nome livre na pasta (os nomes existentes são lidos uma única vez)
+            file_path = nomes.reservar(file_path)
+            
+            # Fazer download para o armazenamento, se a mídia ainda não estiver lá
+            if origem is None:
+                origem = armazenado
+                concluido = asyncio.Event()
+                self._armazenamentos_em_andamento[midia.file_unique_id] = concluido
+                acompanhamento = (
+                    telemetria.arquivo(midia.file_unique_id, os.path.basename(file_path),
+                                       getattr(midia, "file_size", None))
+                    if telemetria else None
+                )
+                sucesso = False
+                try:
+                    await self._baixar_arquivo(
+                        client, message.chat.id, message, midia, origem, manifesto, acompanhamento
+                    )
+                    sucesso = True
+                except Exception:
+                    nomes.liberar(file_path)
+                    # Downloads interrompidos mantêm o estado parcial para serem retomados
+                    if not manifesto.parcial(midia.file_unique_id):
+                        manifesto.registrar(
+                            message.chat.id, message.id, midia.file_unique_id,
+                            ManifestoDownloads.ESTADO_ERRO, tamanho=getattr(midia, "file_size", None)
+                        )
+                    raise
+                finally:
+                    self._armazenamentos_em_andamento.pop(midia.file_unique_id, None)
+                    concluido.set()
+                    if telemetria:
+                        telemetria.concluir(midia.file_unique_id, sucesso)
+                print(f"Baixou mídia: {os.path.basename(file_path)}")
+            
+            self._criar_vista(origem, file_path)
+            nomes.registrar_vista(file_path, origem)
+            manifesto.registrar(
+                message.chat.id, message.id, midia.file_unique_id,
+                ManifestoDownloads.ESTADO_CONCLUIDO,
+                tamanho=getattr(midia, "file_size", None), caminho=origem, vista=file_path
+            )
             return True
         
-        except errors.FloodWait as e:
-            print(f"Aguardando {e.value} segundos (limite de requisições)...")
-            await asyncio.sleep(e.value)
-            return False
         except Exception as e:
             print(f"Erro ao baixar mídia: {e}")
             return False
     
-    async def _get_last_message_id(self, chat_id: int) -> int:
-        """Obtém o ID da última mensagem do chat"""
-        try:
-            last_message = None
-            async for message in self.app.get_chat_history(chat_id, limit=1):
-                last_message = message
-            
-            if last_message:
-                return last_message.id
-            return 0
-        except errors.FloodWait as e:
-            print(f"Aguardando {e.value} segundos (limite de requisições)...")
-            await asyncio.sleep(e.value)
-            return await self._get_last_message_id(chat_id)
-        except Exception as e:
-            print(f"Erro ao obter última mensagem: {e}")
-            return 0
-    
-    def _load_control_file(self, channel_id: int) -> Optional[Dict[str, Any]]:
-        """Carrega o arquivo de controle para um canal"""
-        control_filename = os.path.join(self.download_dir, f"control_{channel_id}.json")
-        if os.path.exists(control_filename):
-            try:
-                with open(control_filename, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Erro ao carregar arquivo de controle: {e}")
+    def _obter_midia(self, message: Message):
+        """Obtém o objeto de mídia (com file_unique_id) de uma mensagem"""
+        for atributo in ("video", "document", "photo", "audio", "voice", "animation"):
+            midia = getattr(message, atributo, None)
+            if midia:
+                return midia
         return None
     
-    def _save_control_file(self, channel_id: int, data: Dict[str, Any]) -> bool:
-        """Salva o arquivo de controle para um canal"""
-        try:
-            control_filename = os.path.join(self.download_dir, f"control_{channel_id}.json")
-            with open(control_filename, 'w') as f:
-                json.dump(data, f)
-            return True
-        except Exception as e:
-            print(f"Erro ao salvar arquivo de controle: {e}")
-            return False
-    
     def _get_media_extension(self, message: Message) -> str:
         """Obtém a extensão do arquivo com base no tipo de mídia"""
         if message.photo:
@@ -451,10 +574,24 @@ class TelegramService:
                     config = json.load(f)
                     self.api_id = config.get('api_id')
                     self.api_hash = config.get('api_hash')
+                    self.max_downloads_simultaneos = int(
+                        config.get('max_downloads_simultaneos', self.MAX_DOWNLOADS_SIMULTANEOS)
+                    )
+                    self.download_segmentado = bool(config.get('download_segmentado', False))
+                    self.tamanho_cache_aulas = int(
+                        config.get('tamanho_cache_aulas_mb', self.TAMANHO_CACHE_AULAS // (1024 * 1024))
+                    ) * 1024 * 1024
+                    self.aulas_pre_carregadas = int(
+                        config.get('aulas_pre_carregadas', self.AULAS_PRE_CARREGADAS)
+                    )
+                    self.transmitir_aulas = bool(config.get('transmitir_aulas', True))
+                    self.pos_processar = bool(config.get('pos_processar', True))
+                    self.gerar_miniaturas = bool(config.get('gerar_miniaturas', False))
                     
                     # Criar cliente Pyrogram se as credenciais foram carregadas com sucesso
                     if self.api_id and self.api_hash and PYROGRAM_AVAILABLE:
-                        self.app = Client(self.session_name, api_id=self.api_id, api_hash=self.api_hash)
+                        self.app = Client(self.session_name, api_id=self.api_id, api_hash=self.api_hash,
+                                          sleep_threshold=0)
                         self.client_ready = True
         except Exception as e:
             print(f"Erro ao carregar credenciais: {e}")
@@ -468,89 +605,991 @@ class TelegramService:
                 "plano_estudo_downloader",
                 api_id=self.api_id,
                 api_hash=self.api_hash,
-                workdir=os.path.expanduser("~")
+                workdir=os.path.expanduser("~"),
+                sleep_threshold=0
             )
         return self.app
+    
+    def executar(self, corrotina):
+        """Agenda uma corrotina no loop do Telegram e retorna um concurrent.futures.Future"""
+        return self.loop_telegram.executar(corrotina)
+    
+    async def _conectar(self):
+        """Retorna o cliente conectado, conectando-o ou reconectando-o se necessário
+        
+        Deve ser chamado no loop do Telegram. A conexão é mantida entre as
+        operações e só é refeita se tiver caído ou se o cliente mudar.
+        """
+        if self._trava_conexao is None:
+            self._trava_conexao = asyncio.Lock()
+        
+        async with self._trava_conexao:
+            client = self._get_client()
+            
+            # As credenciais mudaram: encerrar a sessão do cliente anterior
+            if self._cliente_conectado is not None and self._cliente_conectado is not client:
+                await self._desconectar()
+            
+            if not getattr(client, "is_connected", False):
+                print("Conectando ao Telegram...")
+                await client.start()
+            
+            self._cliente_conectado = client
+            return client
+    
+    async def _desconectar(self):
+        """Encerra a sessão do cliente conectado, se houver"""
+        client, self._cliente_conectado = self._cliente_conectado, None
+        if client is not None and getattr(client, "is_connected", False):
+            try:
+                await client.stop()
+            except Exception as e:
+                print(f"Erro ao desconectar do Telegram: {e}")
+    
+    async def _encerrar(self):
+        """Fecha o servidor de mídia e o pós-processamento e encerra a sessão do cliente (no loop do Telegram)"""
+        if self._servidor_midia is not None:
+            await self._servidor_midia.encerrar()
+        if self._pos_processamento is not None:
+            await self._pos_processamento.encerrar()
+        await self._desconectar()
+    
+    async def _executar_conectado(self, operacao):
+        """Executa operacao(client) com o cliente conectado, reconectando uma vez se a conexão cair"""
+        for tentativa in range(2):
+            client = await self._conectar()
+            try:
+                return await operacao(client)
+            except (ConnectionError, OSError) as e:
+                if tentativa:
+                    raise
+                print(f"Conexão com o Telegram perdida, reconectando: {e}")
+                await self._desconectar()
+    
+    def _obter_semaforo_downloads(self) -> asyncio.Semaphore:
+        """Semáforo compartilhado por todos os downloads (criado no loop do Telegram)"""
+        if self._semaforo_downloads is None:
+            self._semaforo_downloads = asyncio.Semaphore(self.max_downloads_simultaneos)
+        return self._semaforo_downloads
+    
+    def _obter_pasta_downloads(self) -> str:
+        """Retorna a pasta onde os vídeos baixados são salvos, criando-a se necessário"""
+        download_path = self.pasta_downloads or os.path.join(os.path.expanduser("~"), "Downloads", "TelegramVideos")
+        os.makedirs(download_path, exist_ok=True)
+        return download_path
+    
+    def fechar(self):
+        """Encerra as tarefas e o loop do Telegram, desconecta o cliente e fecha o repositório"""
+        # Os downloads são cancelados antes da desconexão, para que fiquem
+        # pendentes (e não com erro) e sejam retomados na próxima execução
+        self.loop_telegram.encerrar(ao_encerrar=self._encerrar)
+        self.repository.fechar()
 
-    async def download_channel_videos(self, channel_id, progress_callback=None):
+    async def download_channel_videos(self, channel_id, progress_callback=None,
+                                      max_simultaneos: int = None, reconciliar: bool = False):
         """
-        Faz download de todos os vídeos de um canal específico
+        Faz download dos vídeos de um canal específico
+        
+        Por padrão, apenas as mensagens mais novas que a última sincronização
+        são lidas. Com reconciliar=True, todo o histórico é percorrido.
         
         Args:
             channel_id: ID do canal
             progress_callback: Função de callback para reportar progresso
+            max_simultaneos: Número de downloads simultâneos (padrão: configuração do serviço)
+            reconciliar: Se True, faz uma passagem completa pelo histórico
         
         Returns:
             dict: Resultados do download
         """
         if not self.has_valid_credentials():
             raise ValueError("Credenciais de API não configuradas")
-            
-        # Verificar se o cliente já está conectado
-        is_connected = getattr(self.app, "is_connected", False)
         
-        download_path = os.path.join(os.path.expanduser("~"), "Downloads", "TelegramVideos")
-        os.makedirs(download_path, exist_ok=True)
+        download_path = self._obter_pasta_downloads()
         
         status = {
             "total": 0,
             "baixados": 0,
             "ignorados": 0,
             "erros": 0,
-            "arquivos": []
+            "arquivos": [],
+            "bytes_economizados": 0,
+            **self.limitador.estado()
         }
         
+        # Progresso em bytes, vazão e tempo restante da sessão
+        telemetria = TelemetriaDownloads()
+        status.update(telemetria.estado())
+        
         try:
-            client = self._get_client()
+            client = await self._conectar()
+            channel_dir = await self._obter_pasta_canal(client, channel_id, download_path)
+            economia = {"arquivos": 0, "bytes": 0}
             
-            # Função para processar as mensagens
-            async def process_messages():
-                # Contar mensagens com mídia
-                count = 0
-                async for message in client.get_chat_history(channel_id):
+            # O canal vira um curso, montado à medida que os vídeos ficam prontos
+            montagem = MontagemCurso(
+                channel_dir, os.path.basename(channel_dir), self.eventos_cursos, self.db_path
+            )
+            
+            # Arquivos reservados pelos downloads em andamento
+            reservados = set()
+            
+            # Marca d'água: última mensagem já sincronizada do canal
+            sincronizacao = None if reconciliar else self.repository.obter_sincronizacao(channel_id)
+            ultimo_sincronizado = sincronizacao["ultimo_message_id"] if sincronizacao else 0
+            
+            # Mídias já baixadas, indexadas pelo identificador único do Telegram
+            manifesto = ManifestoDownloads(self.repository)
+            
+            # Estimativa do total, refinada à medida que o histórico é lido
+            estimativa = {"encontrados": 0, "maior_id": ultimo_sincronizado}
+            
+            # Mensagens cujo download falhou, para não avançar a marca d'água além delas
+            falhas = []
+            
+            async def videos_do_canal():
+                # O histórico vem da mensagem mais nova para a mais antiga, então
+                # a leitura para ao alcançar a marca d'água (sem buscar mais páginas)
+                historico = self.limitador.iterar(
+                    lambda ultima: client.get_chat_history(
+                        channel_id, offset_id=ultima.id if ultima else 0
+                    )
+                )
+                async for message in historico:
+                    if message.id <= ultimo_sincronizado:
+                        break
+                    
+                    estimativa["maior_id"] = max(estimativa["maior_id"], message.id)
+                    
                     if message.video:
-                        count += 1
+                        estimativa["encontrados"] += 1
+                        status["total"] = max(status["total"], estimativa["encontrados"])
+                        montagem.planejar(message)
+                        yield message
+            
+            async def contar_videos():
+                # Contagem barata pelo servidor, quando disponível
+                try:
+                    contagem = await self.limitador.executar(
+                        client.search_messages_count, channel_id, filter=MessagesFilter.VIDEO
+                    )
+                except Exception as e:
+                    print(f"Contagem de vídeos indisponível: {e}")
+                    return
                 
-                status["total"] = count
-                if progress_callback:
+                status["total"] = max(contagem, estimativa["encontrados"])
+                notificar()
+            
+            def notificar(forcar: bool = False):
+                # A interface recebe no máximo algumas atualizações por segundo
+                if progress_callback and telemetria.pronto_para_notificar(forcar):
+                    concluidos = status["baixados"] + status["ignorados"] + status["erros"]
+                    status.update(telemetria.estado(status["total"] - concluidos))
                     progress_callback(status)
+            
+            async def acompanhar_bytes():
+                # O progresso em bytes chega à interface mesmo sem arquivos concluídos
+                while True:
+                    await asyncio.sleep(telemetria.intervalo_notificacao)
+                    notificar()
+            
+            def notificar_espera(estado_limitador):
+                # Mostrar na interface a espera pedida pelo Telegram a esta sessão
+                status.update(estado_limitador)
+                telemetria.registrar_espera(estado_limitador["espera"])
+                notificar(forcar=True)
+            
+            async def baixar_aula(message):
+                resultado = await self._baixar_video(
+                    client, channel_id, message, channel_dir, reservados, manifesto, economia, telemetria
+                )
                 
-                # Processar e baixar
-                async for message in client.get_chat_history(channel_id):
-                    if message.video:
-                        video = message.video
-                        file_name = f"{message.date.strftime('%Y%m%d')}_{video.file_name or f'video_{video.file_id[-10:]}.mp4'}"
-                        file_path = os.path.join(download_path, file_name)
-                        
-                        if os.path.exists(file_path):
-                            status["ignorados"] += 1
-                        else:
-                            try:
-                                await client.download_media(
-                                    message, 
-                                    file_name=file_path
-                                )
-                                status["baixados"] += 1
-                                status["arquivos"].append(file_path)
-                            except Exception as e:
-                                print(f"Erro ao baixar vídeo: {e}")
-                                status["erros"] += 1
-                        
-                        if progress_callback:
-                            progress_callback(status)
-            
-            # Executar de acordo com o estado de conexão
-            if is_connected:
+                # Vídeos baixados agora ou antes (já presentes na pasta do canal) entram no curso
+                vista = os.path.join(channel_dir, self._nome_video(message))
+                if os.path.exists(vista):
+                    montagem.adicionar(message.id, vista)
+                return resultado
+            
+            def registrar_resultado(message, resultado):
+                # Agregar o resultado de cada worker no status compartilhado
+                status.update(self.limitador.estado())
+                status["bytes_economizados"] = economia["bytes"]
+                if isinstance(resultado, Exception):
+                    print(f"Erro ao baixar vídeo: {resultado}")
+                    status["erros"] += 1
+                    falhas.append(message.id)
+                elif resultado is None:
+                    status["ignorados"] += 1
+                else:
+                    status["baixados"] += 1
+                    status["arquivos"].append(resultado)
+                
+                notificar()
+            
+            # Função para processar as mensagens
+            async def process_messages():
+                # O histórico é lido uma única vez; os downloads começam
+                # já com a primeira página e o total é estimado em paralelo
+                # (a contagem do servidor só vale para a passagem completa)
+                tarefa_contagem = asyncio.ensure_future(
+                    contar_videos() if not ultimo_sincronizado else asyncio.sleep(0)
+                )
+                
+                # O semáforo limita o total de downloads de todos os canais em andamento
+                agendador = AgendadorDownloads(
+                    max_simultaneos or self.max_downloads_simultaneos,
+                    semaforo=self._obter_semaforo_downloads()
+                )
+                tarefa_bytes = asyncio.ensure_future(acompanhar_bytes())
+                try:
+                    await agendador.executar(videos_do_canal(), baixar_aula, registrar_resultado)
+                finally:
+                    # Terminados os downloads, a estimativa do total não é mais necessária
+                    tarefa_bytes.cancel()
+                    tarefa_contagem.cancel()
+                    await asyncio.gather(tarefa_bytes, tarefa_contagem, return_exceptions=True)
+                    manifesto.gravar()
+                    await montagem.finalizar()
+                    self._registrar_sessao(channel_id, telemetria, status)
+                
+                # Ao final, o total é o número de vídeos efetivamente encontrados
+                status["total"] = estimativa["encontrados"]
+                status.update(telemetria.estado())
+                
+                # Avançar a marca d'água até logo antes da primeira mensagem que
+                # falhou: só ela e as seguintes são lidas de novo na próxima vez
+                marca = min(falhas) - 1 if falhas else estimativa["maior_id"]
+                if marca > ultimo_sincronizado:
+                    self.repository.salvar_sincronizacao(channel_id, marca)
+            
+            # Só as esperas causadas pelas chamadas desta sessão entram na telemetria
+            with self.limitador.observar_chamadas(notificar_espera):
                 await process_messages()
-                return status
-            else:
-                async with client:
-                    await process_messages()
-                    return status
+            return status
                 
         except RPCError as e:
             print(f"Erro do Telegram: {e}")
             raise
         except Exception as e:
             print(f"Erro ao baixar vídeos: {e}")
-            raise 
\ No newline at end of file
+            raise
+    
+    async def download_message(self, channel_id, message_id: int, progress_callback=None):
+        """
+        Faz download da mídia de uma única mensagem
+        
+        Args:
+            channel_id: ID do canal
+            message_id: ID da mensagem
+            progress_callback: Função de callback para reportar progresso
+        
+        Returns:
+            dict: Resultados do download, no mesmo formato de download_channel_videos
+        """
+        if not self.has_valid_credentials():
+            raise ValueError("Credenciais de API não configuradas")
+        
+        download_path = self._obter_pasta_downloads()
+        status = {
+            "total": 1,
+            "baixados": 0,
+            "ignorados": 0,
+            "erros": 0,
+            "arquivos": [],
+            **self.limitador.estado()
+        }
+        telemetria = TelemetriaDownloads()
+        
+        client = await self._conectar()
+        channel_dir = await self._obter_pasta_canal(client, channel_id, download_path)
+        manifesto = ManifestoDownloads(self.repository)
+        
+        try:
+            message = await self.limitador.executar(
+                client.get_messages, channel_id, message_ids=message_id
+            )
+            if message.empty or not message.media:
+                raise ValueError(f"A mensagem {message_id} não contém mídia")
+            
+            async with self._obter_semaforo_downloads():
+                if message.video:
+                    caminho = await self._baixar_video(
+                        client, channel_id, message, channel_dir, set(), manifesto, telemetria=telemetria
+                    )
+                    if caminho:
+                        status["baixados"] = 1
+                        status["arquivos"].append(caminho)
+                    else:
+                        status["ignorados"] = 1
+                else:
+                    resultado = await self._download_media(client, message, channel_dir, manifesto)
+                    if resultado:
+                        status["baixados"] = 1
+                    elif resultado is None:
+                        status["ignorados"] = 1
+                    else:
+                        status["erros"] = 1
+        finally:
+            manifesto.gravar()
+            self._registrar_sessao(channel_id, telemetria, status)
+        
+        status.update(telemetria.estado())
+        if progress_callback:
+            progress_callback(status)
+        return status
+    
+    async def _baixar_video(self, client, channel_id, message, channel_dir: str,
+                            reservados: Set[str], manifesto: ManifestoDownloads,
+                            economia: Dict[str, int] = None,
+                            telemetria: TelemetriaDownloads = None) -> Optional[str]:
+        """Baixa o vídeo de uma mensagem para o armazenamento e cria sua vista na pasta do canal
+        
+        Retorna o caminho da vista, ou None se o vídeo não precisou ser baixado
+        (já estava na pasta do canal ou já estava armazenado a partir de outro
+        canal; neste caso a vista é criada e a economia é contabilizada).
+        """
+        video = message.video
+        
+        file_name = self._nome_video(message)
+        vista = os.path.join(channel_dir, file_name)
+        armazenado = self._caminho_armazenamento(
+            video.file_unique_id, os.path.splitext(file_name)[1] or ".mp4"
+        )
+        
+        # Outro worker pode estar baixando o mesmo arquivo
+        if vista in reservados or armazenado in reservados:
+            return None
+        reservados.update((vista, armazenado))
+        
+        # Outro download (de qualquer canal) pode estar trazendo a mesma mídia
+        await self._aguardar_armazenamento(video.file_unique_id)
+        
+        # Mídias já armazenadas são reconhecidas pelo identificador, mesmo se renomeadas
+        origem = manifesto.caminho(video.file_unique_id)
+        if not (origem and os.path.exists(origem)):
+            origem = armazenado if os.path.exists(armazenado) else None
+        
+        # Arquivos baixados antes do armazenamento (na própria vista ou na
+        # pasta de downloads) são adotados como origem
+        if origem is None:
+            for legado in (vista, os.path.join(os.path.dirname(channel_dir), file_name)):
+                if os.path.exists(legado):
+                    origem = legado
+                    break
+        
+        if origem:
+            ja_na_vista = os.path.exists(vista)
+            if not ja_na_vista:
+                self._criar_vista(origem, vista)
+                if economia is not None:
+                    economia["arquivos"] += 1
+                    economia["bytes"] += video.file_size or 0
+            
+            manifesto.registrar(
+                channel_id, message.id, video.file_unique_id,
+                ManifestoDownloads.ESTADO_CONCLUIDO, tamanho=video.file_size, caminho=origem, vista=vista
+            )
+            return None
+        
+        concluido = asyncio.Event()
+        self._armazenamentos_em_andamento[video.file_unique_id] = concluido
+        acompanhamento = telemetria.arquivo(video.file_unique_id, file_name, video.file_size) if telemetria else None
+        sucesso = False
+        try:
+            await self._baixar_arquivo(client, channel_id, message, video, armazenado, manifesto, acompanhamento)
+            sucesso = True
+        except Exception:
+            # Downloads interrompidos mantêm o estado parcial para serem retomados
+            if not manifesto.parcial(video.file_unique_id):
+                manifesto.registrar(
+                    channel_id, message.id, video.file_unique_id,
+                    ManifestoDownloads.ESTADO_ERRO, tamanho=video.file_size
+                )
+            raise
+        finally:
+            self._armazenamentos_em_andamento.pop(video.file_unique_id, None)
+            concluido.set()
+            if telemetria:
+                telemetria.concluir(video.file_unique_id, sucesso)
+        
+        self._criar_vista(armazenado, vista)
+        manifesto.registrar(
+            channel_id, message.id, video.file_unique_id,
+            ManifestoDownloads.ESTADO_CONCLUIDO, tamanho=video.file_size, caminho=armazenado, vista=vista
+        )
+        
+        # Checksum, duração e resolução são obtidos em segundo plano
+        if self.pos_processar:
+            self._obter_pos_processamento().adicionar(video.file_unique_id, armazenado, (vista,))
+        return vista
+    
+    async def _aguardar_armazenamento(self, file_unique_id: str):
+        """Aguarda o fim dos downloads em andamento da mesma mídia para o armazenamento
+        
+        Após o retorno, sem outro await, quem chamou pode registrar o seu próprio download.
+        """
+        while file_unique_id in self._armazenamentos_em_andamento:
+            await self._armazenamentos_em_andamento[file_unique_id].wait()
+    
+    def _nome_video(self, message) -> str:
+        """Nome do arquivo de um vídeo na pasta do canal: data da postagem e nome original"""
+        video = message.video
+        return f"{message.date.strftime('%Y%m%d')}_{video.file_name or f'video_{video.file_id[-10:]}.mp4'}"
+    
+    async def _obter_pasta_canal(self, client, channel_id, download_path: str) -> str:
+        """Retorna a pasta de vistas de um canal, nomeada pelo título do canal"""
+        try:
+            chat = await self.limitador.executar(client.get_chat, channel_id)
+            nome = self._sanitize_filename(chat.title or str(channel_id))
+        except Exception as e:
+            print(f"Erro ao obter nome do canal {channel_id}: {e}")
+            nome = str(channel_id)
+        
+        channel_dir = os.path.join(download_path, nome)
+        os.makedirs(channel_dir, exist_ok=True)
+        return channel_dir
+    
+    def _obter_pos_processamento(self) -> PosProcessamento:
+        """Retorna o pós-processamento, criando-o e retomando os arquivos pendentes na primeira chamada"""
+        if self._pos_processamento is None:
+            pasta_miniaturas = None
+            if self.gerar_miniaturas:
+                pasta_miniaturas = os.path.join(
+                    self._obter_pasta_downloads(), self.PASTA_ARMAZENAMENTO, self.PASTA_MINIATURAS
+                )
+            self._pos_processamento = PosProcessamento(self.repository, self.db_path, pasta_miniaturas)
+            self._pos_processamento.retomar()
+        return self._pos_processamento
+    
+    def _registrar_sessao(self, channel_id, telemetria: TelemetriaDownloads, status: Dict[str, Any]):
+        """Grava no histórico a sessão de download, se algo foi transferido ou houve espera"""
+        sessao = telemetria.resumo()
+        if sessao["bytes"] or sessao["flood_waits"]:
+            sessao["erros"] = status["erros"]
+            self.repository.registrar_sessao(channel_id, sessao)
+    
+    def _caminho_armazenamento(self, file_unique_id: str, extensao: str) -> str:
+        """Caminho da cópia única de uma mídia no armazenamento endereçado pelo file_unique_id
+        
+        O armazenamento fica dentro da pasta de downloads, para que as vistas
+        dos canais possam ser criadas como hardlinks no mesmo disco.
+        """
+        armazenamento = os.path.join(
+            self._obter_pasta_downloads(), self.PASTA_ARMAZENAMENTO, file_unique_id[:2]
+        )
+        os.makedirs(armazenamento, exist_ok=True)
+        return os.path.join(armazenamento, f"{file_unique_id}{extensao}")
+    
+    def _criar_vista(self, origem: str, destino: str) -> str:
+        """Cria o arquivo destino apontando para a origem, sem ocupar espaço extra
+        
+        Tenta um hardlink; se o sistema não permitir, um link simbólico; em
+        último caso, uma cópia. Retorna o método usado.
+        """
+        if os.path.exists(destino):
+            return "existente"
+        
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        try:
+            os.link(origem, destino)
+            return "hardlink"
+        except OSError:
+            pass
+        
+        try:
+            os.symlink(os.path.abspath(origem), destino)
+            return "symlink"
+        except (OSError, NotImplementedError):
+            pass
+        
+        shutil.copy2(origem, destino)
+        return "copia"
+    
+    @classmethod
+    def e_aula_virtual(cls, caminho: str) -> bool:
+        """Indica se o caminho de uma aula é a URI de uma aula virtual (baixada sob demanda)"""
+        return bool(caminho) and caminho.startswith(cls.PREFIXO_AULA_VIRTUAL)
+    
+    def uri_aula(self, channel_id, message_id: int) -> str:
+        """URI de uma aula virtual"""
+        return f"{self.PREFIXO_AULA_VIRTUAL}{channel_id}/{message_id}"
+    
+    def _analisar_uri(self, uri: str) -> Tuple[int, int]:
+        """Retorna (channel_id, message_id) de uma URI de aula virtual"""
+        channel_id, message_id = uri[len(self.PREFIXO_AULA_VIRTUAL):].split("/", 1)
+        return int(channel_id), int(message_id)
+    
+    def _obter_cache_aulas(self) -> CacheAulas:
+        """Retorna o cache das aulas virtuais, criando-o na primeira chamada"""
+        if self._cache_aulas is None:
+            self._cache_aulas = CacheAulas(
+                os.path.join(self._obter_pasta_downloads(), self.PASTA_CACHE_AULAS),
+                self.tamanho_cache_aulas
+            )
+        return self._cache_aulas
+    
+    async def montar_curso_virtual(self, channel_id, progress_callback=None) -> Optional[int]:
+        """Cria um curso com as aulas de um canal sem baixar os vídeos
+        
+        Apenas os metadados das mensagens são lidos (legendas, álbuns, datas e
+        durações); cada aula aponta para a URI tg://<channel_id>/<message_id>
+        e o vídeo só é baixado quando a aula é aberta. Assim que o curso é
+        cadastrado, o evento ("abrir", id_curso) é publicado para que a
+        interface o exiba, e as aulas chegam em lotes enquanto o histórico é lido.
+        
+        Returns:
+            int: ID do curso, ou None se não foi possível cadastrá-lo
+        """
+        if not self.has_valid_credentials():
+            raise ValueError("Credenciais de API não configuradas")
+        
+        client = await self._conectar()
+        try:
+            chat = await self.limitador.executar(client.get_chat, channel_id)
+            nome = chat.title or str(channel_id)
+        except Exception as e:
+            print(f"Erro ao obter nome do canal {channel_id}: {e}")
+            nome = str(channel_id)
+        
+        montagem = MontagemCurso(
+            f"{self.PREFIXO_AULA_VIRTUAL}{channel_id}", nome, self.eventos_cursos, self.db_path,
+            tamanho_lote=500
+        )
+        
+        try:
+            id_curso = await montagem.abrir()
+            if id_curso is None:
+                return None
+            self.eventos_cursos.put(("abrir", id_curso))
+            
+            historico = self.limitador.iterar(
+                lambda ultima: client.get_chat_history(channel_id, offset_id=ultima.id if ultima else 0)
+            )
+            total = 0
+            async for message in historico:
+                if not message.video:
+                    continue
+                
+                montagem.planejar(message)
+                montagem.adicionar(message.id, self.uri_aula(channel_id, message.id))
+                
+                total += 1
+                if progress_callback and total % self.DIALOGOS_POR_PAGINA == 0:
+                    progress_callback(total)
+            
+            return id_curso
+        finally:
+            await montagem.finalizar()
+    
+    async def obter_aula_virtual(self, uri: str, pre_carregar: List[str] = ()) -> str:
+        """Retorna o arquivo local de uma aula virtual ou a URL local de onde ela é transmitida
+        
+        Aulas que estão no cache (ou já foram baixadas com o canal) são
+        abertas direto do disco. As demais são transmitidas pelo servidor de
+        mídia, se transmitir_aulas estiver ativo, ou baixadas por inteiro
+        para o cache. As aulas seguintes (até aulas_pre_carregadas) são
+        baixadas em segundo plano.
+        """
+        cache = self._obter_cache_aulas()
+        caminho = cache.obter(uri)
+        if not caminho:
+            if self.transmitir_aulas:
+                caminho = await self._transmitir_aula_virtual(uri)
+            else:
+                caminho = await self._baixar_aula_virtual(uri)
+        cache.marcar_assistida(uri)
+        
+        proximas = list(pre_carregar)[:self.aulas_pre_carregadas]
+        if proximas:
+            self.executar(self._pre_carregar_aulas(proximas))
+        
+        return caminho
+    
+    async def _pre_carregar_aulas(self, uris: List[str]):
+        """Baixa para o cache, uma de cada vez, as aulas que ainda não estão nele"""
+        for uri in uris:
+            if self._obter_cache_aulas().obter(uri):
+                continue
+            
+            try:
+                await self._baixar_aula_virtual(uri)
+            except Exception as e:
+                print(f"Erro ao pré-carregar aula {uri}: {e}")
+    
+    async def _baixar_aula_virtual(self, uri: str) -> str:
+        """Baixa o vídeo de uma aula virtual para o cache e retorna o caminho do arquivo"""
+        cache = self._obter_cache_aulas()
+        
+        # A mesma aula pode estar sendo pré-carregada
+        em_andamento = self._armazenamentos_em_andamento.get(uri)
+        if em_andamento:
+            await em_andamento.wait()
+            caminho = cache.obter(uri)
+            if caminho:
+                return caminho
+        
+        concluido = asyncio.Event()
+        self._armazenamentos_em_andamento[uri] = concluido
+        try:
+            client, channel_id, message, midia = await self._obter_mensagem_aula(uri)
+            
+            # Mídias já baixadas com o canal são usadas diretamente
+            manifesto = ManifestoDownloads(self.repository)
+            armazenado = manifesto.caminho(midia.file_unique_id)
+            if armazenado and os.path.exists(armazenado):
+                return armazenado
+            
+            caminho = cache.caminho(uri, self._extensao_aula(message, midia))
+            
+            try:
+                await self._baixar_arquivo(client, channel_id, message, midia, caminho, manifesto)
+            finally:
+                manifesto.gravar()
+            
+            cache.registrar(uri, caminho)
+            return caminho
+        finally:
+            self._armazenamentos_em_andamento.pop(uri, None)
+            concluido.set()
+    
+    async def _obter_mensagem_aula(self, uri: str) -> Tuple[Any, int, Any, Any]:
+        """Retorna (client, channel_id, message, midia) da mensagem de uma aula virtual"""
+        channel_id, message_id = self._analisar_uri(uri)
+        client = await self._conectar()
+        message = await self.limitador.executar(
+            client.get_messages, channel_id, message_ids=message_id
+        )
+        
+        midia = self._obter_midia(message) if message and not message.empty else None
+        if not midia:
+            raise ValueError(f"A mensagem {message_id} não contém mídia")
+        
+        return client, channel_id, message, midia
+    
+    def _extensao_aula(self, message, midia) -> str:
+        """Extensão do arquivo de uma aula virtual"""
+        return (os.path.splitext(getattr(midia, "file_name", None) or "")[1]
+                or self._get_media_extension(message) or ".mp4")
+    
+    async def _obter_servidor_midia(self) -> ServidorMidia:
+        """Retorna o servidor de mídia local, iniciando-o na primeira chamada (no loop do Telegram)"""
+        if self._servidor_midia is None:
+            self._servidor_midia = ServidorMidia()
+        await self._servidor_midia.iniciar()
+        return self._servidor_midia
+    
+    async def _transmitir_aula_virtual(self, uri: str) -> str:
+        """Registra uma aula virtual no servidor de mídia e retorna a URL para o player
+        
+        O vídeo não é baixado antes: cada requisição do player busca apenas as
+        partes do trecho pedido, guardando as mais recentes em memória. Se a
+        mídia já foi baixada com o canal, o arquivo local é servido.
+        """
+        client, channel_id, message, midia = await self._obter_mensagem_aula(uri)
+        servidor = await self._obter_servidor_midia()
+        nome = f"{message.id}{self._extensao_aula(message, midia)}"
+        
+        armazenado = ManifestoDownloads(self.repository).caminho(midia.file_unique_id)
+        if armazenado and os.path.exists(armazenado):
+            return servidor.registrar(uri, FonteArquivo(armazenado), nome)
+        
+        fonte = FontePartes(
+            midia.file_unique_id,
+            midia.file_size,
+            lambda parte, quantidade: self._ler_partes(client, message, parte, quantidade),
+            self._cache_partes,
+            tamanho_parte=self.TAMANHO_PARTE,
+            tipo=getattr(midia, "mime_type", None) or "video/mp4"
+        )
+        return servidor.registrar(uri, fonte, nome)
+    
+    async def _ler_partes(self, client, message, parte_inicial: int, quantidade: int):
+        """Lê partes de uma mídia com stream_media, retomando do ponto certo após um FloodWait"""
+        recebidas = 0
+        partes = self.limitador.iterar(
+            lambda ultima: client.stream_media(
+                message, offset=parte_inicial + recebidas, limit=quantidade - recebidas
+            ),
+            itens_por_requisicao=1, partes_de_arquivo=True
+        )
+        try:
+            async for parte in partes:
+                recebidas += 1
+                yield parte
+        finally:
+            await partes.aclose()
+    
+    def relatorio_deduplicacao(self) -> Dict[str, int]:
+        """Retorna quantas cópias repetidas deixaram de ser baixadas e os bytes economizados"""
+        return self.repository.obter_relatorio_deduplicacao()
+    
+    def historico_downloads(self, limite: int = 50) -> List[Dict[str, Any]]:
+        """Retorna as sessões de download mais recentes, com bytes, duração e esperas"""
+        return self.repository.listar_sessoes(limite)
+    
+    async def _baixar_arquivo(self, client, channel_id, message, midia, file_path: str,
+                              manifesto: ManifestoDownloads, acompanhamento: ArquivoTelemetria = None):
+        """Baixa a mídia de uma mensagem, em partes retomáveis se o arquivo for grande
+        
+        Se acompanhamento for informado, recebe o progresso do arquivo em bytes.
+        """
+        tamanho = getattr(midia, "file_size", None) or 0
+        
+        if tamanho < self.TAMANHO_MINIMO_RETOMADA:
+            # O progress executado no loop (corrotina) evita as threads do Pyrogram
+            await self.limitador.executar(
+                client.download_media, message, file_name=file_path,
+                progress=acompanhamento.atualizar_async if acompanhamento else None
+            )
+        elif (self.download_segmentado and tamanho >= self.TAMANHO_MINIMO_SEGMENTADO
+                and not self.limitador.sob_pressao(self.JANELA_PRESSAO_FLOOD)):
+            await self._baixar_segmentado(client, channel_id, message, midia, file_path, manifesto, acompanhamento)
+        else:
+            await self._baixar_em_partes(client, channel_id, message, midia, file_path, manifesto, acompanhamento)
+    
+    async def _baixar_em_partes(self, client, channel_id, message, midia, file_path: str,
+                                manifesto: ManifestoDownloads, acompanhamento: ArquivoTelemetria = None):
+        """Baixa a mídia em partes de 1 MB para um arquivo .part, retomando downloads interrompidos
+        
+        O número de bytes já gravados em disco fica registrado no manifesto
+        com o estado parcial. Ao reiniciar, o download continua a partir da
+        última parte completa, e o arquivo só recebe o nome final depois de
+        baixado por inteiro.
+        """
+        caminho_parcial = file_path + ".part"
+        tamanho = midia.file_size
+        
+        # Considerar apenas o que já foi confirmado em disco e registrado no manifesto
+        # (o arquivo de um download segmentado é pré-alocado com o tamanho total)
+        bytes_existentes = os.path.getsize(caminho_parcial) if os.path.exists(caminho_parcial) else 0
+        if manifesto.parcial(midia.file_unique_id):
+            bytes_existentes = min(bytes_existentes, manifesto.bytes_parciais(midia.file_unique_id))
+        
+        # Retomar sempre no início de uma parte
+        parte_inicial = min(bytes_existentes, tamanho) // self.TAMANHO_PARTE
+        gravados = parte_inicial * self.TAMANHO_PARTE
+        baixados = gravados
+        partes_sem_registro = 0
+        concluido = False
+        
+        if gravados:
+            print(f"Retomando {os.path.basename(file_path)} a partir de {gravados // self.TAMANHO_PARTE} MB")
+        if acompanhamento:
+            acompanhamento.retomar(gravados)
+        
+        def registrar_parcial():
+            manifesto.registrar(
+                channel_id, message.id, midia.file_unique_id,
+                ManifestoDownloads.ESTADO_PARCIAL, tamanho=tamanho,
+                caminho=file_path, bytes_baixados=gravados
+            )
+        
+        try:
+            with open(caminho_parcial, "r+b" if gravados else "wb") as arquivo:
+                arquivo.truncate(gravados)
+                arquivo.seek(gravados)
+                
+                # Cada parte é uma requisição; após um FloodWait a leitura
+                # continua da parte seguinte à última gravada
+                partes = self.limitador.iterar(
+                    lambda ultima: client.stream_media(message, offset=baixados // self.TAMANHO_PARTE),
+                    itens_por_requisicao=1, partes_de_arquivo=True
+                )
+                # A escrita e o fsync rodam fora do loop, que também atende os
+                # demais downloads e as transmissões do servidor de mídia
+                async for parte in partes:
+                    await asyncio.to_thread(arquivo.write, parte)
+                    baixados += len(parte)
+                    partes_sem_registro += 1
+                    if acompanhamento:
+                        acompanhamento.atualizar(baixados)
+                    
+                    if partes_sem_registro >= self.PARTES_POR_REGISTRO:
+                        await asyncio.to_thread(self._sincronizar_arquivo, arquivo)
+                        gravados = baixados
+                        partes_sem_registro = 0
+                        registrar_parcial()
+                
+                await asyncio.to_thread(self._sincronizar_arquivo, arquivo)
+                gravados = baixados
+            
+            if baixados != tamanho:
+                raise IOError(
+                    f"Download incompleto de {os.path.basename(file_path)}: {baixados} de {tamanho} bytes"
+                )
+            
+            # O arquivo só aparece com o nome final quando está completo
+            os.replace(caminho_parcial, file_path)
+            concluido = True
+            
+        finally:
+            if not concluido:
+                registrar_parcial()
+    
+    @staticmethod
+    def _sincronizar_arquivo(arquivo):
+        """Grava em disco o conteúdo do arquivo (bloqueante; executado fora do loop)"""
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    
+    async def _baixar_segmentado(self, client, channel_id, message, midia, file_path: str,
+                                 manifesto: ManifestoDownloads, acompanhamento: ArquivoTelemetria = None):
+        """Baixa a mídia em vários trechos simultâneos gravados em um arquivo pré-alocado
+        
+        O arquivo é dividido em segmentos de PARTES_POR_SEGMENTO partes,
+        baixados por até SEGMENTOS_SIMULTANEOS tarefas com stream_media e
+        gravados na posição correta com os.pwrite. O manifesto guarda os bytes
+        do prefixo contíguo já concluído, como no download sequencial. Se o
+        Telegram responder com FloodWait, o restante do arquivo é baixado por
+        uma única tarefa.
+        """
+        caminho_parcial = file_path + ".part"
+        tamanho = midia.file_size
+        total_partes = (tamanho + self.TAMANHO_PARTE - 1) // self.TAMANHO_PARTE
+        
+        # Retomar a partir do prefixo já registrado no manifesto
+        bytes_existentes = os.path.getsize(caminho_parcial) if os.path.exists(caminho_parcial) else 0
+        prefixo = min(bytes_existentes, manifesto.bytes_parciais(midia.file_unique_id))
+        parte_inicial = prefixo // self.TAMANHO_PARTE
+        
+        segmentos = [
+            (inicio, min(self.PARTES_POR_SEGMENTO, total_partes - inicio))
+            for inicio in range(parte_inicial, total_partes, self.PARTES_POR_SEGMENTO)
+        ]
+        pendentes = asyncio.Queue()
+        for segmento in segmentos:
+            pendentes.put_nowait(segmento)
+        
+        concluidos = set()
+        estado = {
+            "gravados": parte_inicial * self.TAMANHO_PARTE,
+            "prefixo": parte_inicial * self.TAMANHO_PARTE,
+            "recebidos": parte_inicial * self.TAMANHO_PARTE
+        }
+        if acompanhamento:
+            acompanhamento.retomar(estado["recebidos"])
+        
+        def registrar_parcial():
+            manifesto.registrar(
+                channel_id, message.id, midia.file_unique_id,
+                ManifestoDownloads.ESTADO_PARCIAL, tamanho=tamanho,
+                caminho=file_path, bytes_baixados=estado["gravados"]
+            )
+        
+        # Registrar antes de pré-alocar, para que o tamanho do arquivo nunca
+        # seja tomado como progresso em uma retomada
+        registrar_parcial()
+        manifesto.gravar()
+        
+        fd = os.open(caminho_parcial, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+        trava_escrita = threading.Lock()
+        em_execucao = set()
+        
+        async def executar_io(funcao, *args):
+            # Escritas e fsync rodam fora do loop; o descritor só é fechado
+            # depois que todas terminarem, mesmo se a tarefa for cancelada
+            futuro = asyncio.get_running_loop().run_in_executor(None, funcao, *args)
+            em_execucao.add(futuro)
+            futuro.add_done_callback(em_execucao.discard)
+            return await asyncio.shield(futuro)
+        
+        def gravar_na_posicao(dados: bytes, posicao: int):
+            if hasattr(os, "pwrite"):
+                os.pwrite(fd, dados, posicao)
+            else:
+                with trava_escrita:
+                    os.lseek(fd, posicao, os.SEEK_SET)
+                    os.write(fd, dados)
+        
+        async def avancar_prefixo():
+            # O prefixo contíguo avança enquanto os segmentos seguintes estiverem prontos
+            parte = estado["prefixo"] // self.TAMANHO_PARTE
+            avancou = False
+            while parte in concluidos:
+                concluidos.discard(parte)
+                parte = min(parte + self.PARTES_POR_SEGMENTO, total_partes)
+                avancou = True
+            
+            if avancou:
+                prefixo = estado["prefixo"] = min(parte * self.TAMANHO_PARTE, tamanho)
+                await executar_io(os.fsync, fd)
+                
+                # Outra tarefa pode ter registrado um prefixo maior durante o fsync
+                if prefixo > estado["gravados"]:
+                    estado["gravados"] = prefixo
+                    registrar_parcial()
+        
+        async def baixar_segmentos(principal: bool):
+            while not pendentes.empty():
+                # Sob FloodWait, apenas a tarefa principal continua
+                if not principal and self.limitador.sob_pressao(self.JANELA_PRESSAO_FLOOD):
+                    return
+                
+                inicio, partes = pendentes.get_nowait()
+                posicao = inicio * self.TAMANHO_PARTE
+                esperado = min(partes * self.TAMANHO_PARTE, tamanho - posicao)
+                recebidos = 0
+                
+                # O limitador aguarda e retoma o segmento após um FloodWait
+                trecho = self.limitador.iterar(
+                    lambda ultima: client.stream_media(
+                        message,
+                        limit=partes - recebidos // self.TAMANHO_PARTE,
+                        offset=inicio + recebidos // self.TAMANHO_PARTE
+                    ),
+                    itens_por_requisicao=1, partes_de_arquivo=True
+                )
+                async for parte in trecho:
+                    await executar_io(gravar_na_posicao, parte, posicao + recebidos)
+                    recebidos += len(parte)
+                    
+                    # O progresso soma as partes recebidas por todos os segmentos
+                    estado["recebidos"] += len(parte)
+                    if acompanhamento:
+                        acompanhamento.atualizar(estado["recebidos"])
+                
+                if recebidos != esperado:
+                    raise IOError(
+                        f"Segmento incompleto de {os.path.basename(file_path)}: "
+                        f"{recebidos} de {esperado} bytes a partir de {posicao}"
+                    )
+                
+                concluidos.add(inicio)
+                await avancar_prefixo()
+        
+        concluido = False
+        try:
+            if os.fstat(fd).st_size != tamanho:
+                os.ftruncate(fd, tamanho)
+            
+            tarefas = [
+                asyncio.ensure_future(baixar_segmentos(indice == 0))
+                for indice in range(min(self.SEGMENTOS_SIMULTANEOS, len(segmentos)) or 1)
+            ]
+            try:
+                await asyncio.gather(*tarefas)
+            finally:
+                for tarefa in tarefas:
+                    tarefa.cancel()
+            
+            # Conferir que todos os segmentos foram gravados antes de concluir
+            await executar_io(os.fsync, fd)
+            if estado["gravados"] != tamanho or os.fstat(fd).st_size != tamanho:
+                raise IOError(
+                    f"Download incompleto de {os.path.basename(file_path)}: "
+                    f"{estado['gravados']} de {tamanho} bytes"
+                )
+            
+            os.close(fd)
+            fd = None
+            os.replace(caminho_parcial, file_path)
+            concluido = True
+            
+        finally:
+            if fd is not None:
+                # Aguardar as escritas ainda em execução antes de fechar o descritor
+                if em_execucao:
+                    await asyncio.gather(*em_execucao, return_exceptions=True)
+                os.close(fd)
+            if not concluido:
+                registrar_parcial()
@@ -0,0 +1,179 @@
+import collections
+import threading
+import time
+from datetime import datetime
+from typing import Any, Deque, Dict, Tuple
+
+class _Vazao:
+    """Vazão em bytes por segundo, como média móvel sobre uma janela de tempo"""
+
+    def __init__(self, janela: float):
+        """Inicializa a medição com a janela em segundos"""
+        self.janela = janela
+        self._amostras: Deque[Tuple[float, int]] = collections.deque()
+
+    def registrar(self, agora: float, acumulado: int):
+        """Registra o total acumulado de bytes no instante informado"""
+        self._amostras.append((agora, acumulado))
+        # Manter uma amostra anterior ao início da janela, como referência
+        while len(self._amostras) > 2 and self._amostras[1][0] <= agora - self.janela:
+            self._amostras.popleft()
+
+    def valor(self, agora: float) -> float:
+        """Bytes por segundo na janela; zero se não houver amostras suficientes"""
+        if len(self._amostras) < 2:
+            return 0.0
+
+        inicio, bytes_inicio = self._amostras[0]
+        _, bytes_fim = self._amostras[-1]
+        return (bytes_fim - bytes_inicio) / max(agora - inicio, 0.001)
+
+
+class ArquivoTelemetria:
+    """Progresso em bytes de um arquivo em download"""
+
+    def __init__(self, telemetria: "TelemetriaDownloads", chave: str, nome: str, tamanho: int):
+        """Inicializa o acompanhamento do arquivo, ainda sem bytes baixados"""
+        self.telemetria = telemetria
+        self.chave = chave
+        self.nome = nome
+        self.tamanho = tamanho or 0
+        self.baixados = 0
+        self.vazao = _Vazao(telemetria.janela)
+
+    def retomar(self, baixados: int):
+        """Informa os bytes já gravados de um download retomado, sem contá-los como transferidos"""
+        with self.telemetria.trava:
+            self.baixados = baixados
+
+    def atualizar(self, baixados: int, tamanho: int = None):
+        """Informa o total de bytes já baixados do arquivo (compatível com o progress do Pyrogram)"""
+        self.telemetria.somar(self, baixados - self.baixados)
+
+    async def atualizar_async(self, baixados: int, tamanho: int = None):
+        """Versão assíncrona de atualizar, para o progress de download_media (executada no loop)"""
+        self.atualizar(baixados, tamanho)
+
+
+class TelemetriaDownloads:
+    """Telemetria de uma sessão de downloads: bytes, vazão, tempo restante e esperas
+
+    Os downloads informam o progresso de cada arquivo em bytes (as partes
+    do stream_media ou o progress do download_media). A vazão é uma média
+    móvel sobre os últimos `janela` segundos, por arquivo e no total, e o
+    tempo restante de cada arquivo vem da sua própria vazão. Para o total,
+    os arquivos ainda não iniciados são estimados pelo tamanho médio dos
+    já vistos. As notificações para a interface são limitadas a uma a cada
+    `intervalo_notificacao` segundos.
+    """
+
+    def __init__(self, janela: float = 10.0, intervalo_notificacao: float = 0.25):
+        """Inicializa a sessão, começando a contar o tempo agora"""
+        self.janela = janela
+        self.intervalo_notificacao = intervalo_notificacao
+
+        # O progress de download_media pode vir de outra thread
+        self.trava = threading.Lock()
+
+        self.inicio = time.monotonic()
+        self.iniciada_em = datetime.now().isoformat(timespec="seconds")
+        self.bytes_baixados = 0
+        self.arquivos_concluidos = 0
+        self.bytes_concluidos = 0
+        self.flood_waits = 0
+        self.espera_total = 0.0
+
+        self._ativos: Dict[str, ArquivoTelemetria] = {}
+        self._vazao = _Vazao(janela)
+        self._ultima_notificacao = 0.0
+
+    def arquivo(self, chave: str, nome: str, tamanho: int) -> ArquivoTelemetria:
+        """Começa a acompanhar um arquivo e retorna seu acompanhamento"""
+        acompanhamento = ArquivoTelemetria(self, chave, nome, tamanho)
+        with self.trava:
+            self._ativos[chave] = acompanhamento
+        return acompanhamento
+
+    def somar(self, acompanhamento: ArquivoTelemetria, quantidade: int):
+        """Conta os bytes recebidos de um arquivo"""
+        agora = time.monotonic()
+        with self.trava:
+            acompanhamento.baixados += quantidade
+            acompanhamento.vazao.registrar(agora, acompanhamento.baixados)
+            self.bytes_baixados += quantidade
+            self._vazao.registrar(agora, self.bytes_baixados)
+
+    def concluir(self, chave: str, sucesso: bool = True):
+        """Deixa de acompanhar um arquivo; os concluídos entram na média de tamanho"""
+        with self.trava:
+            acompanhamento = self._ativos.pop(chave, None)
+            if acompanhamento and sucesso:
+                self.arquivos_concluidos += 1
+                self.bytes_concluidos += acompanhamento.tamanho
+
+    def registrar_espera(self, segundos: float):
+        """Registra uma espera pedida pelo Telegram (FloodWait)"""
+        with self.trava:
+            self.flood_waits += 1
+            self.espera_total += segundos
+
+    def pronto_para_notificar(self, forcar: bool = False) -> bool:
+        """Indica se já passou o intervalo mínimo desde a última notificação, e a registra"""
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_notificacao < self.intervalo_notificacao:
+            return False
+        self._ultima_notificacao = agora
+        return True
+
+    def estado(self, pendentes: int = 0) -> Dict[str, Any]:
+        """Retorna bytes, vazão e tempos restantes da sessão
+
+        Args:
+            pendentes: Arquivos ainda não concluídos, incluindo os em andamento
+        """
+        agora = time.monotonic()
+        with self.trava:
+            velocidade = self._vazao.valor(agora)
+            ativos = list(self._ativos.values())
+
+            arquivos = []
+            for acompanhamento in ativos:
+                vazao_arquivo = acompanhamento.vazao.valor(agora)
+                faltam = max(acompanhamento.tamanho - acompanhamento.baixados, 0)
+                arquivos.append({
+                    "nome": acompanhamento.nome,
+                    "baixados": acompanhamento.baixados,
+                    "tamanho": acompanhamento.tamanho,
+                    "velocidade": vazao_arquivo,
+                    "eta": faltam / vazao_arquivo if vazao_arquivo > 0 else None,
+                })
+
+            vistos = self.arquivos_concluidos + len(ativos)
+            tamanho_medio = (
+                (self.bytes_concluidos + sum(a.tamanho for a in ativos)) / vistos if vistos else 0
+            )
+            bytes_restantes = (
+                sum(max(a.tamanho - a.baixados, 0) for a in ativos)
+                + max(pendentes - len(ativos), 0) * tamanho_medio
+            )
+
+            return {
+                "bytes_baixados": self.bytes_baixados,
+                "velocidade": velocidade,
+                "eta": bytes_restantes / velocidade if velocidade > 0 else None,
+                "arquivos_em_andamento": arquivos,
+                "espera_total": self.espera_total,
+            }
+
+    def resumo(self) -> Dict[str, Any]:
+        """Resumo da sessão para o histórico"""
+        duracao = time.monotonic() - self.inicio
+        return {
+            "iniciada_em": self.iniciada_em,
+            "duracao": duracao,
+            "bytes": self.bytes_baixados,
+            "arquivos": self.arquivos_concluidos,
+            "velocidade_media": self.bytes_baixados / duracao if duracao > 0 else 0,
+            "flood_waits": self.flood_waits,
+            "espera_total": self.espera_total,
+        }
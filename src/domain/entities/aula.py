@@ -13,6 +13,7 @@ class Aula:
     data_conclusao: Optional[str] = None
     modulo_id: Optional[str] = None
     id: Optional[int] = None
+    ordem: Optional[int] = None
     
     @property
     def titulo_formatado(self) -> str:
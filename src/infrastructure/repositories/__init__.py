@@ -1,3 +1,4 @@
 from .curso_repository import CursoRepository
+from .telegram_repository import TelegramRepository
 
-__all__ = ['CursoRepository'] 
\ No newline at end of file
+__all__ = ['CursoRepository', 'TelegramRepository']
\ No newline at end of file
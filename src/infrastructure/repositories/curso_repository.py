@@ -1,5 +1,6 @@
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Callable
 import os
+import re
 from datetime import datetime, timedelta
 from pathlib import Path
 import sqlite3
@@ -10,6 +11,12 @@ from src.domain.entities import Curso, Modulo, Aula
 class CursoRepository:
     """Repositório para operações relacionadas a cursos"""
     
+    # Lista de extensões de vídeo comuns
+    EXTENSOES_VIDEO = ('.mp4', '.avi', '.mkv', '.mov', '.wmv')
+    
+    # Quantidade de aulas inseridas por lote na ingestão
+    TAMANHO_LOTE = 500
+    
     def __init__(self, db_path: str = None):
         """Inicializa o repositório com conexão ao banco de dados"""
         if db_path is None:
@@ -46,6 +53,8 @@ class CursoRepository:
                 concluida INTEGER DEFAULT 0,
                 anotacoes TEXT,
                 data_conclusao TEXT,
+                modulo TEXT,
+                ordem INTEGER,
                 FOREIGN KEY (curso_id) REFERENCES cursos (id)
             )
         ''')
@@ -80,6 +89,44 @@ class CursoRepository:
             print("Adicionando coluna anotacoes à tabela aulas")
             self.cursor.execute('ALTER TABLE aulas ADD COLUMN anotacoes TEXT')
         
+        # Módulo e ordem explícitos (cursos montados a partir de canais do Telegram)
+        if 'modulo' not in colunas_aulas:
+            print("Adicionando coluna modulo à tabela aulas")
+            self.cursor.execute('ALTER TABLE aulas ADD COLUMN modulo TEXT')
+        
+        if 'ordem' not in colunas_aulas:
+            print("Adicionando coluna ordem à tabela aulas")
+            self.cursor.execute('ALTER TABLE aulas ADD COLUMN ordem INTEGER')
+        
+        # Álbum e data da postagem, para continuar os módulos na próxima sincronização
+        for coluna, tipo in (('grupo', 'INTEGER'), ('postada_em', 'TEXT')):
+            if coluna not in colunas_aulas:
+                print(f"Adicionando coluna {coluna} à tabela aulas")
+                self.cursor.execute(f'ALTER TABLE aulas ADD COLUMN {coluna} {tipo}')
+        
+        # Um vídeo aparece uma única vez em cada curso
+        self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_aulas_curso_video'"
+        )
+        if not self.cursor.fetchone():
+            print("Removendo aulas repetidas e criando o índice único de aulas por curso")
+            # Mantém, de cada vídeo repetido, a aula concluída ou, entre as demais, a mais antiga
+            self.cursor.execute('''
+                DELETE FROM aulas WHERE id NOT IN (
+                    SELECT (
+                        SELECT outra.id FROM aulas AS outra
+                        WHERE outra.curso_id = aula.curso_id AND outra.caminho_video = aula.caminho_video
+                        ORDER BY outra.concluida DESC, outra.id
+                        LIMIT 1
+                    )
+                    FROM aulas AS aula
+                    GROUP BY aula.curso_id, aula.caminho_video
+                )
+            ''')
+            self.cursor.execute(
+                'CREATE UNIQUE INDEX idx_aulas_curso_video ON aulas (curso_id, caminho_video)'
+            )
+        
         self.conn.commit()
     
     def listar_cursos(self) -> List[Tuple[int, str, str]]:
@@ -303,13 +350,283 @@ class CursoRepository:
         except Exception as e:
             print(f"Erro ao analisar estrutura do curso: {e}")
     
+    def _normalizar_caminho(self, caminho: str) -> str:
+        """Normaliza o caminho de um curso, preservando URIs (como tg://<canal> dos cursos virtuais)"""
+        return caminho if "://" in caminho else os.path.normpath(caminho)
+    
+    def existe_curso(self, caminho: str) -> Optional[int]:
+        """Retorna o ID do curso cadastrado com o caminho informado, se existir"""
+        try:
+            self.cursor.execute(
+                'SELECT id FROM cursos WHERE caminho = ?',
+                (self._normalizar_caminho(caminho),)
+            )
+            
+            row = self.cursor.fetchone()
+            return row[0] if row else None
+            
+        except sqlite3.Error as e:
+            print(f"Erro ao verificar curso: {e}")
+            return None
+    
+    def escanear_curso(self, caminho: str, cancelado: Callable[[], bool] = None,
+                       progresso: Callable[[int], Any] = None) -> Optional[List[Dict[str, str]]]:
+        """Varre o diretório do curso e retorna os vídeos encontrados, sem acessar o banco
+        
+        Retorna None se a varredura for cancelada.
+        """
+        padrao = re.compile(r'^(\d+)[\s.-]+(.+)\.(?:mp4|avi|mkv|mov|wmv)$', re.IGNORECASE)
+        videos = []
+        
+        for raiz, dirs, arquivos in os.walk(caminho):
+            if cancelado and cancelado():
+                return None
+            
+            # Ignorar diretórios ocultos
+            if os.path.basename(raiz).startswith('.'):
+                continue
+            
+            for arquivo in sorted(arquivos):
+                if not arquivo.lower().endswith(self.EXTENSOES_VIDEO):
+                    continue
+                
+                # Tentar extrair número e título
+                match = padrao.match(arquivo)
+                
+                if match:
+                    numero = match.group(1)
+                    titulo = match.group(2)
+                else:
+                    numero = ""
+                    titulo = os.path.splitext(arquivo)[0]
+                
+                videos.append({
+                    "numero": numero,
+                    "titulo": titulo,
+                    "caminho_video": os.path.join(raiz, arquivo),
+                    "duracao": "00:00:00"  # Seria necessário um método para extrair duração real
+                })
+            
+            if progresso:
+                progresso(len(videos))
+        
+        return videos
+    
+    def ingerir_curso(self, caminho: str, videos: List[Dict[str, str]],
+                      cancelado: Callable[[], bool] = None,
+                      progresso: Callable[[int, int], Any] = None) -> Optional[int]:
+        """Cadastra um curso e suas aulas em lotes, em uma única transação
+        
+        Se a ingestão for cancelada, nada é gravado e o retorno é None.
+        """
+        caminho = os.path.normpath(caminho)
+        
+        try:
+            self.cursor.execute(
+                'INSERT INTO cursos (nome, caminho, data_inicio) VALUES (?, ?, datetime("now"))',
+                (os.path.basename(caminho), caminho)
+            )
+            id_curso = self.cursor.lastrowid
+            
+            total = len(videos)
+            for inicio in range(0, total, self.TAMANHO_LOTE):
+                if cancelado and cancelado():
+                    self.conn.rollback()
+                    return None
+                
+                lote = videos[inicio:inicio + self.TAMANHO_LOTE]
+                self.inserir_aulas_em_lote(id_curso, lote, commit=False)
+                
+                if progresso:
+                    progresso(inicio + len(lote), total)
+            
+            self.conn.commit()
+            return id_curso
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"Erro ao cadastrar curso: {e}")
+            return None
+    
+    def inserir_aulas_em_lote(self, id_curso: int, videos: List[Dict[str, str]], commit: bool = True) -> bool:
+        """Insere várias aulas de uma vez, ignorando vídeos já cadastrados no curso
+        
+        Os vídeos repetidos são descartados pelo índice único (curso_id,
+        caminho_video), inclusive os repetidos no próprio lote.
+        
+        Os vídeos podem informar também "modulo", "ordem", "grupo" e
+        "postada_em"; sem eles, o módulo é a pasta do vídeo e a ordem vem do
+        número no título.
+        """
+        try:
+            self.cursor.executemany(
+                '''
+                INSERT OR IGNORE INTO aulas 
+                (curso_id, caminho_video, titulo, duracao, concluida, modulo, ordem, grupo, postada_em) 
+                VALUES (?, ?, ?, ?, 0, ?, ?, ?, ?)
+                ''',
+                [
+                    (
+                        id_curso,
+                        video["caminho_video"],
+                        f"{video['numero']}. {video['titulo']}" if video["numero"] else video["titulo"],
+                        video["duracao"],
+                        video.get("modulo"),
+                        video.get("ordem"),
+                        video.get("grupo"),
+                        video.get("postada_em")
+                    )
+                    for video in videos
+                ]
+            )
+            
+            if commit:
+                self.conn.commit()
+            return True
+            
+        except sqlite3.Error as e:
+            print(f"Erro ao inserir aulas: {e}")
+            return False
+    
+    def obter_ou_criar_curso(self, caminho: str, nome: str) -> Optional[int]:
+        """Retorna o ID do curso com o caminho informado, cadastrando-o se não existir"""
+        id_curso = self.existe_curso(caminho)
+        if id_curso is not None:
+            return id_curso
+        
+        try:
+            self.cursor.execute(
+                'INSERT INTO cursos (nome, caminho, data_inicio) VALUES (?, ?, datetime("now"))',
+                (nome, self._normalizar_caminho(caminho))
+            )
+            self.conn.commit()
+            return self.cursor.lastrowid
+            
+        except sqlite3.Error as e:
+            print(f"Erro ao cadastrar curso: {e}")
+            return None
+    
+    def obter_modulos_aulas(self, id_curso: int) -> Dict[str, Tuple[Optional[str], Optional[int]]]:
+        """Retorna {caminho_video: (modulo, ordem)} das aulas de um curso"""
+        try:
+            self.cursor.execute(
+                'SELECT caminho_video, modulo, ordem FROM aulas WHERE curso_id = ?',
+                (id_curso,)
+            )
+            return {row[0]: (row[1], row[2]) for row in self.cursor.fetchall()}
+            
+        except sqlite3.Error as e:
+            print(f"Erro ao obter módulos das aulas: {e}")
+            return {}
+    
+    def obter_aula_anterior(self, id_curso: int, ordem: int) -> Optional[Dict[str, Any]]:
+        """Retorna modulo, grupo e postada_em da última aula do curso com ordem menor que a informada"""
+        try:
+            self.cursor.execute(
+                '''
+                SELECT modulo, grupo, postada_em FROM aulas
+                WHERE curso_id = ? AND ordem < ?
+                ORDER BY ordem DESC
+                LIMIT 1
+                ''',
+                (id_curso, ordem)
+            )
+            row = self.cursor.fetchone()
+            return dict(row) if row else None
+            
+        except sqlite3.Error as e:
+            print(f"Erro ao obter aula anterior: {e}")
+            return None
+    
+    def atualizar_modulos_aulas(self, id_curso: int, alteracoes: List[Tuple[str, int, str]]) -> bool:
+        """Atualiza o módulo e a ordem de várias aulas; cada alteração é (modulo, ordem, caminho_video)"""
+        try:
+            self.cursor.executemany(
+                'UPDATE aulas SET modulo = ?, ordem = ? WHERE curso_id = ? AND caminho_video = ?',
+                [(modulo, ordem, id_curso, caminho) for modulo, ordem, caminho in alteracoes]
+            )
+            
+            self.conn.commit()
+            return True
+            
+        except sqlite3.Error as e:
+            print(f"Erro ao atualizar módulos das aulas: {e}")
+            return False
+    
+    def atualizar_duracoes_aulas(self, duracoes: List[Tuple[str, str]]) -> bool:
+        """Atualiza a duração das aulas de qualquer curso; cada item é (duracao, caminho_video)"""
+        try:
+            self.cursor.executemany(
+                'UPDATE aulas SET duracao = ? WHERE caminho_video = ?',
+                duracoes
+            )
+            
+            self.conn.commit()
+            return True
+            
+        except sqlite3.Error as e:
+            print(f"Erro ao atualizar duração das aulas: {e}")
+            return False
+    
+    def obter_aulas_por_caminhos(self, id_curso: int, caminhos: List[str]) -> List[Tuple[str, Aula]]:
+        """Retorna pares (modulo, aula) das aulas de um curso com os caminhos informados"""
+        aulas = []
+        
+        try:
+            for inicio in range(0, len(caminhos), self.TAMANHO_LOTE):
+                lote = caminhos[inicio:inicio + self.TAMANHO_LOTE]
+                self.cursor.execute(
+                    f'''
+                    SELECT id, caminho_video, titulo, duracao, concluida, anotacoes, data_conclusao,
+                           modulo, ordem
+                    FROM aulas
+                    WHERE curso_id = ? AND caminho_video IN ({", ".join("?" * len(lote))})
+                    ''',
+                    (id_curso, *lote)
+                )
+                
+                for row in self.cursor.fetchall():
+                    aula_dict = dict(row)
+                    aulas.append((aula_dict['modulo'], self._criar_aula(aula_dict)))
+            
+        except sqlite3.Error as e:
+            print(f"Erro ao obter aulas: {e}")
+        
+        return aulas
+    
+    def _criar_aula(self, aula_dict: Dict[str, Any]) -> Aula:
+        """Cria uma Aula a partir de uma linha da tabela aulas"""
+        # Extrair número e título da aula
+        titulo_completo = aula_dict['titulo']
+        partes = titulo_completo.split(". ", 1)
+        
+        if len(partes) > 1 and partes[0].isdigit():
+            numero = partes[0]
+            titulo = partes[1]
+        else:
+            numero = ""
+            titulo = titulo_completo
+        
+        return Aula(
+            id=aula_dict['id'],
+            titulo=titulo,
+            caminho_video=aula_dict['caminho_video'],
+            duracao=aula_dict['duracao'],
+            numero=numero,
+            concluida=bool(aula_dict['concluida']),
+            anotacoes=aula_dict['anotacoes'],
+            data_conclusao=aula_dict['data_conclusao'],
+            ordem=aula_dict.get('ordem')
+        )
+    
     def _carregar_aulas_do_curso(self, curso: Curso):
         """Carrega as aulas de um curso agrupadas por módulos"""
         try:
             # Carregar todas as aulas do curso
             self.cursor.execute(
                 '''
-                SELECT id, caminho_video, titulo, duracao, concluida, anotacoes, data_conclusao
+                SELECT id, caminho_video, titulo, duracao, concluida, anotacoes, data_conclusao,
+                       modulo, ordem
                 FROM aulas
                 WHERE curso_id = ?
                 ORDER BY caminho_video
@@ -325,57 +642,43 @@ class CursoRepository:
             for aula_row in aulas_rows:
                 aula_dict = dict(aula_row)
                 
-                # Extrair diretório da aula
-                caminho_video = aula_dict['caminho_video']
-                diretorio = os.path.dirname(caminho_video)
+                # Módulo explícito ou, na falta dele, o diretório da aula
+                diretorio = aula_dict['modulo']
                 
-                # Verificar se é pasta raiz
-                if diretorio == curso.caminho:
-                    diretorio = "(Raiz)"
-                else:
-                    # Pegar apenas o nome do diretório
-                    diretorio = os.path.basename(diretorio)
+                if not diretorio:
+                    diretorio = os.path.dirname(aula_dict['caminho_video'])
+                    
+                    # Verificar se é pasta raiz
+                    if diretorio == curso.caminho:
+                        diretorio = "(Raiz)"
+                    else:
+                        # Pegar apenas o nome do diretório
+                        diretorio = os.path.basename(diretorio)
                 
                 # Adicionar ao dicionário
                 if diretorio not in aulas_por_diretorio:
                     aulas_por_diretorio[diretorio] = []
                 
-                # Extrair número e título da aula
-                titulo_completo = aula_dict['titulo']
-                partes = titulo_completo.split(". ", 1)
-                
-                if len(partes) > 1 and partes[0].isdigit():
-                    numero = partes[0]
-                    titulo = partes[1]
-                else:
-                    numero = ""
-                    titulo = titulo_completo
-                
-                # Criar objeto Aula
-                aula = Aula(
-                    id=aula_dict['id'],
-                    titulo=titulo,
-                    caminho_video=caminho_video,
-                    duracao=aula_dict['duracao'],
-                    numero=numero,
-                    concluida=bool(aula_dict['concluida']),
-                    anotacoes=aula_dict['anotacoes'],
-                    data_conclusao=aula_dict['data_conclusao']
-                )
-                
-                aulas_por_diretorio[diretorio].append(aula)
+                aulas_por_diretorio[diretorio].append(self._criar_aula(aula_dict))
             
             # Criar módulos a partir dos diretórios
             for nome_diretorio, aulas in aulas_por_diretorio.items():
-                # Ordenar aulas por número
-                aulas.sort(key=lambda a: int(a.numero) if a.numero and a.numero.isdigit() else float('inf'))
+                # Ordenar aulas pela ordem explícita e depois por número
+                aulas.sort(key=lambda a: (
+                    a.ordem if a.ordem is not None else float('inf'),
+                    int(a.numero) if a.numero and a.numero.isdigit() else float('inf')
+                ))
                 
                 # Criar módulo
                 modulo = Modulo(nome=nome_diretorio, aulas=aulas, id=None)
                 curso.modulos.append(modulo)
             
-            # Ordenar módulos (colocando "(Raiz)" primeiro)
-            curso.modulos.sort(key=lambda m: (m.nome != "(Raiz)", m.nome))
+            # Ordenar módulos (colocando "(Raiz)" primeiro e depois pela ordem da primeira aula)
+            curso.modulos.sort(key=lambda m: (
+                m.nome != "(Raiz)",
+                m.aulas[0].ordem if m.aulas and m.aulas[0].ordem is not None else float('inf'),
+                m.nome
+            ))
             
         except sqlite3.Error as e:
             print(f"Erro ao carregar aulas do curso: {e}")
@@ -0,0 +1,487 @@
+from typing import Optional, Dict, Any, List, Tuple
+import os
+import sqlite3
+import threading
+
+class TelegramRepository:
+    """Repositório para o estado dos downloads do Telegram"""
+
+    def __init__(self, db_path: str = None):
+        """Inicializa o repositório com conexão ao banco de dados"""
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), "dados_cursos.db")
+
+        # A conexão é usada pela thread do loop assíncrono do Telegram e pela
+        # interface, por isso o acesso é serializado por um lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.cursor = self.conn.cursor()
+        self.lock = threading.RLock()
+
+        # Inicializar banco de dados
+        self._inicializar_tabelas()
+
+    def _inicializar_tabelas(self):
+        """Inicializa as tabelas do banco de dados"""
+        with self.lock:
+            # Estado de sincronização por canal
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS telegram_sincronizacao (
+                    channel_id INTEGER PRIMARY KEY,
+                    ultimo_message_id INTEGER NOT NULL DEFAULT 0,
+                    ultima_sincronizacao TEXT
+                )
+            ''')
+
+            # Manifesto de downloads: uma linha por mídia de cada mensagem
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS telegram_manifesto (
+                    channel_id INTEGER NOT NULL,
+                    message_id INTEGER NOT NULL,
+                    file_unique_id TEXT NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'pendente',
+                    tamanho INTEGER,
+                    caminho TEXT,
+                    vista TEXT,
+                    checksum TEXT,
+                    bytes_baixados INTEGER,
+                    duracao REAL,
+                    largura INTEGER,
+                    altura INTEGER,
+                    miniatura TEXT,
+                    processado_em TEXT,
+                    atualizado_em TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (channel_id, message_id, file_unique_id)
+                )
+            ''')
+
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_telegram_manifesto_arquivo
+                ON telegram_manifesto (file_unique_id, estado)
+            ''')
+
+            # Fila persistente de downloads (canais inteiros ou mensagens avulsas)
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS telegram_fila (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tipo TEXT NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    message_id INTEGER,
+                    message_id_final INTEGER,
+                    titulo TEXT,
+                    prioridade INTEGER NOT NULL DEFAULT 0,
+                    reconciliar INTEGER NOT NULL DEFAULT 0,
+                    estado TEXT NOT NULL DEFAULT 'na_fila',
+                    total INTEGER DEFAULT 0,
+                    baixados INTEGER DEFAULT 0,
+                    ignorados INTEGER DEFAULT 0,
+                    erros INTEGER DEFAULT 0,
+                    bytes INTEGER DEFAULT 0,
+                    mensagem_erro TEXT,
+                    criado_em TEXT DEFAULT CURRENT_TIMESTAMP,
+                    iniciado_em TEXT,
+                    concluido_em TEXT
+                )
+            ''')
+
+            # Histórico das sessões de download, para análise da vazão ao longo do tempo
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS telegram_sessoes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel_id INTEGER,
+                    iniciada_em TEXT NOT NULL,
+                    duracao REAL NOT NULL DEFAULT 0,
+                    bytes INTEGER NOT NULL DEFAULT 0,
+                    arquivos INTEGER NOT NULL DEFAULT 0,
+                    erros INTEGER NOT NULL DEFAULT 0,
+                    velocidade_media REAL NOT NULL DEFAULT 0,
+                    flood_waits INTEGER NOT NULL DEFAULT 0,
+                    espera_total REAL NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            # Verificar e adicionar colunas necessárias
+            self._verificar_e_adicionar_colunas()
+
+            self.conn.commit()
+
+    def _verificar_e_adicionar_colunas(self):
+        """Verifica e adiciona colunas que podem estar faltando"""
+        self.cursor.execute("PRAGMA table_info(telegram_manifesto)")
+        colunas_manifesto = [info[1] for info in self.cursor.fetchall()]
+
+        if 'bytes_baixados' not in colunas_manifesto:
+            print("Adicionando coluna bytes_baixados à tabela telegram_manifesto")
+            self.cursor.execute('ALTER TABLE telegram_manifesto ADD COLUMN bytes_baixados INTEGER')
+
+        # Vista da mídia na pasta do canal e resultados do pós-processamento
+        for coluna, tipo in (('vista', 'TEXT'), ('duracao', 'REAL'), ('largura', 'INTEGER'), ('altura', 'INTEGER'),
+                             ('miniatura', 'TEXT'), ('processado_em', 'TEXT')):
+            if coluna not in colunas_manifesto:
+                print(f"Adicionando coluna {coluna} à tabela telegram_manifesto")
+                self.cursor.execute(f'ALTER TABLE telegram_manifesto ADD COLUMN {coluna} {tipo}')
+
+        # Intervalos de mensagens na fila: message_id a message_id_final
+        self.cursor.execute("PRAGMA table_info(telegram_fila)")
+        colunas_fila = [info[1] for info in self.cursor.fetchall()]
+
+        if 'message_id_final' not in colunas_fila:
+            print("Adicionando coluna message_id_final à tabela telegram_fila")
+            self.cursor.execute('ALTER TABLE telegram_fila ADD COLUMN message_id_final INTEGER')
+
+    def obter_sincronizacao(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        """Obtém o estado de sincronização de um canal"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    '''
+                    SELECT channel_id, ultimo_message_id, ultima_sincronizacao
+                    FROM telegram_sincronizacao WHERE channel_id = ?
+                    ''',
+                    (channel_id,)
+                )
+
+                row = self.cursor.fetchone()
+                return dict(row) if row else None
+
+        except sqlite3.Error as e:
+            print(f"Erro ao obter sincronização do canal: {e}")
+            return None
+
+    def salvar_sincronizacao(self, channel_id: int, ultimo_message_id: int) -> bool:
+        """Registra a maior mensagem processada de um canal e a hora da sincronização"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    '''
+                    INSERT INTO telegram_sincronizacao (channel_id, ultimo_message_id, ultima_sincronizacao)
+                    VALUES (?, ?, datetime('now'))
+                    ON CONFLICT(channel_id) DO UPDATE SET
+                        ultimo_message_id = MAX(ultimo_message_id, excluded.ultimo_message_id),
+                        ultima_sincronizacao = excluded.ultima_sincronizacao
+                    ''',
+                    (channel_id, ultimo_message_id)
+                )
+
+                self.conn.commit()
+                return True
+
+        except sqlite3.Error as e:
+            print(f"Erro ao salvar sincronização do canal: {e}")
+            return False
+
+    def obter_estado_arquivo(self, file_unique_id: str) -> Tuple[Optional[str], Optional[Tuple[str, int]]]:
+        """Retorna o caminho em que a mídia foi baixada e (caminho, bytes_baixados) do seu download interrompido"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    '''
+                    SELECT estado, caminho, bytes_baixados FROM telegram_manifesto
+                    WHERE file_unique_id = ? AND estado IN ('concluido', 'parcial')
+                    ''',
+                    (file_unique_id,)
+                )
+
+                concluido = None
+                parcial = None
+                for estado, caminho, bytes_baixados in self.cursor.fetchall():
+                    if estado == 'concluido':
+                        concluido = caminho
+                    else:
+                        parcial = (caminho, bytes_baixados or 0)
+                return concluido, parcial
+
+        except sqlite3.Error as e:
+            print(f"Erro ao consultar manifesto de downloads: {e}")
+            return None, None
+
+    def obter_arquivos_concluidos(self) -> Dict[str, str]:
+        """Retorna {file_unique_id: caminho} de todas as mídias já baixadas"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    '''
+                    SELECT file_unique_id, caminho FROM telegram_manifesto
+                    WHERE estado = 'concluido'
+                    '''
+                )
+
+                return {row[0]: row[1] for row in self.cursor.fetchall()}
+
+        except sqlite3.Error as e:
+            print(f"Erro ao carregar manifesto de downloads: {e}")
+            return {}
+
+    def obter_arquivos_parciais(self) -> Dict[str, Tuple[str, int]]:
+        """Retorna {file_unique_id: (caminho, bytes_baixados)} dos downloads interrompidos"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    '''
+                    SELECT file_unique_id, caminho, bytes_baixados FROM telegram_manifesto
+                    WHERE estado = 'parcial'
+                    '''
+                )
+
+                return {row[0]: (row[1], row[2] or 0) for row in self.cursor.fetchall()}
+
+        except sqlite3.Error as e:
+            print(f"Erro ao carregar downloads parciais: {e}")
+            return {}
+
+    def salvar_manifesto_em_lote(self, entradas: List[Tuple]) -> bool:
+        """Grava várias entradas do manifesto em uma única transação
+
+        Cada entrada é (channel_id, message_id, file_unique_id, estado,
+        tamanho, caminho, checksum, bytes_baixados, vista). Valores None não
+        apagam os já gravados.
+        """
+        try:
+            with self.lock:
+                self.cursor.executemany(
+                    '''
+                    INSERT INTO telegram_manifesto
+                    (channel_id, message_id, file_unique_id, estado, tamanho, caminho, checksum,
+                     bytes_baixados, vista, atualizado_em)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+                    ON CONFLICT(channel_id, message_id, file_unique_id) DO UPDATE SET
+                        estado = excluded.estado,
+                        tamanho = COALESCE(excluded.tamanho, tamanho),
+                        caminho = COALESCE(excluded.caminho, caminho),
+                        checksum = COALESCE(excluded.checksum, checksum),
+                        bytes_baixados = COALESCE(excluded.bytes_baixados, bytes_baixados),
+                        vista = COALESCE(excluded.vista, vista),
+                        atualizado_em = excluded.atualizado_em
+                    ''',
+                    entradas
+                )
+
+                self.conn.commit()
+                return True
+
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar manifesto de downloads: {e}")
+            return False
+
+    def obter_arquivos_sem_pos_processamento(self, limite: int = 500) -> List[Tuple[str, str, Tuple[str, ...]]]:
+        """Retorna (file_unique_id, caminho, vistas) das mídias baixadas que ainda não foram pós-processadas"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    '''
+                    SELECT file_unique_id, caminho, vista FROM telegram_manifesto
+                    WHERE estado = 'concluido' AND processado_em IS NULL
+                      AND file_unique_id IN (
+                          SELECT file_unique_id FROM telegram_manifesto
+                          WHERE estado = 'concluido' AND processado_em IS NULL
+                          GROUP BY file_unique_id
+                          LIMIT ?
+                      )
+                    ORDER BY file_unique_id
+                    ''',
+                    (limite,)
+                )
+
+                arquivos: Dict[str, Tuple[str, List[str]]] = {}
+                for file_unique_id, caminho, vista in self.cursor.fetchall():
+                    caminho_atual, vistas = arquivos.setdefault(file_unique_id, (caminho, []))
+                    if caminho and (caminho_atual is None or caminho > caminho_atual):
+                        arquivos[file_unique_id] = (caminho, vistas)
+                    if vista and vista not in vistas:
+                        vistas.append(vista)
+
+                return [(file_unique_id, caminho, tuple(vistas))
+                        for file_unique_id, (caminho, vistas) in arquivos.items()]
+
+        except sqlite3.Error as e:
+            print(f"Erro ao listar arquivos sem pós-processamento: {e}")
+            return []
+
+    def salvar_pos_processamento_em_lote(self, entradas: List[Tuple]) -> bool:
+        """Grava os resultados do pós-processamento em todas as entradas de cada mídia
+
+        Cada entrada é (checksum, duracao, largura, altura, miniatura, file_unique_id).
+        """
+        try:
+            with self.lock:
+                self.cursor.executemany(
+                    '''
+                    UPDATE telegram_manifesto SET
+                        checksum = ?, duracao = ?, largura = ?, altura = ?, miniatura = ?,
+                        processado_em = datetime('now')
+                    WHERE file_unique_id = ?
+                    ''',
+                    entradas
+                )
+
+                self.conn.commit()
+                return True
+
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar pós-processamento: {e}")
+            return False
+
+    def obter_relatorio_deduplicacao(self) -> Dict[str, int]:
+        """Retorna {arquivos, bytes} das cópias repetidas que não precisaram ser baixadas"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    '''
+                    SELECT COALESCE(SUM(copias - 1), 0), COALESCE(SUM((copias - 1) * tamanho), 0)
+                    FROM (
+                        SELECT COUNT(*) AS copias, MAX(COALESCE(tamanho, 0)) AS tamanho
+                        FROM telegram_manifesto
+                        WHERE estado = 'concluido'
+                        GROUP BY file_unique_id
+                    )
+                    '''
+                )
+
+                arquivos, bytes_economizados = self.cursor.fetchone()
+                return {"arquivos": arquivos, "bytes": bytes_economizados}
+
+        except sqlite3.Error as e:
+            print(f"Erro ao calcular economia da deduplicação: {e}")
+            return {"arquivos": 0, "bytes": 0}
+
+    # Colunas da fila que podem ser alteradas por atualizar_item_fila
+    COLUNAS_FILA = (
+        'prioridade', 'estado', 'total', 'baixados', 'ignorados', 'erros', 'bytes',
+        'mensagem_erro', 'iniciado_em', 'concluido_em'
+    )
+
+    def adicionar_item_fila(self, tipo: str, channel_id: int, titulo: str = None, prioridade: int = 0,
+                            message_id: int = None, reconciliar: bool = False,
+                            message_id_final: int = None) -> Optional[int]:
+        """Adiciona um canal ou uma mensagem à fila de downloads e retorna o ID do item"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    '''
+                    INSERT INTO telegram_fila (
+                        tipo, channel_id, message_id, message_id_final, titulo, prioridade, reconciliar
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''',
+                    (tipo, channel_id, message_id, message_id_final, titulo, prioridade, int(reconciliar))
+                )
+
+                self.conn.commit()
+                return self.cursor.lastrowid
+
+        except sqlite3.Error as e:
+            print(f"Erro ao adicionar item à fila: {e}")
+            return None
+
+    def listar_fila(self) -> List[Dict[str, Any]]:
+        """Lista os itens da fila de downloads na ordem de inserção"""
+        try:
+            with self.lock:
+                self.cursor.execute('SELECT * FROM telegram_fila ORDER BY id')
+                return [dict(row) for row in self.cursor.fetchall()]
+
+        except sqlite3.Error as e:
+            print(f"Erro ao listar fila de downloads: {e}")
+            return []
+
+    def atualizar_item_fila(self, id_item: int, **campos) -> bool:
+        """Atualiza colunas de um item da fila"""
+        campos = {coluna: valor for coluna, valor in campos.items() if coluna in self.COLUNAS_FILA}
+        if not campos:
+            return False
+
+        try:
+            with self.lock:
+                atribuicoes = ", ".join(f"{coluna} = ?" for coluna in campos)
+                self.cursor.execute(
+                    f'UPDATE telegram_fila SET {atribuicoes} WHERE id = ?',
+                    (*campos.values(), id_item)
+                )
+
+                self.conn.commit()
+                return True
+
+        except sqlite3.Error as e:
+            print(f"Erro ao atualizar item da fila: {e}")
+            return False
+
+    def reiniciar_itens_ativos(self) -> int:
+        """Devolve à fila os itens que estavam em andamento quando o aplicativo foi fechado"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    "UPDATE telegram_fila SET estado = 'na_fila' WHERE estado = 'ativo'"
+                )
+
+                self.conn.commit()
+                return self.cursor.rowcount
+
+        except sqlite3.Error as e:
+            print(f"Erro ao retomar fila de downloads: {e}")
+            return 0
+
+    def remover_item_fila(self, id_item: int) -> bool:
+        """Remove um item da fila"""
+        try:
+            with self.lock:
+                self.cursor.execute('DELETE FROM telegram_fila WHERE id = ?', (id_item,))
+                self.conn.commit()
+                return True
+
+        except sqlite3.Error as e:
+            print(f"Erro ao remover item da fila: {e}")
+            return False
+
+    def remover_concluidos_fila(self) -> bool:
+        """Remove da fila os itens já concluídos"""
+        try:
+            with self.lock:
+                self.cursor.execute("DELETE FROM telegram_fila WHERE estado = 'concluido'")
+                self.conn.commit()
+                return True
+
+        except sqlite3.Error as e:
+            print(f"Erro ao limpar fila de downloads: {e}")
+            return False
+
+    def registrar_sessao(self, channel_id: Optional[int], sessao: Dict[str, Any]) -> bool:
+        """Grava no histórico o resumo de uma sessão de download"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    '''
+                    INSERT INTO telegram_sessoes (
+                        channel_id, iniciada_em, duracao, bytes, arquivos, erros,
+                        velocidade_media, flood_waits, espera_total
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''',
+                    (
+                        channel_id, sessao["iniciada_em"], sessao["duracao"], sessao["bytes"],
+                        sessao["arquivos"], sessao.get("erros", 0), sessao["velocidade_media"],
+                        sessao["flood_waits"], sessao["espera_total"]
+                    )
+                )
+
+                self.conn.commit()
+                return True
+
+        except sqlite3.Error as e:
+            print(f"Erro ao registrar sessão de download: {e}")
+            return False
+
+    def listar_sessoes(self, limite: int = 50) -> List[Dict[str, Any]]:
+        """Lista as sessões de download mais recentes"""
+        try:
+            with self.lock:
+                self.cursor.execute(
+                    'SELECT * FROM telegram_sessoes ORDER BY id DESC LIMIT ?', (limite,)
+                )
+                return [dict(row) for row in self.cursor.fetchall()]
+
+        except sqlite3.Error as e:
+            print(f"Erro ao listar sessões de download: {e}")
+            return []
+
+    def fechar(self):
+        """Fecha a conexão com o banco de dados"""
+        if self.conn:
+            self.conn.close()
@@ -0,0 +1,4 @@
+from .cliente_telegram import ClienteTelegram
+from .cliente_falso import ClienteTelegramFalso
+
+__all__ = ['ClienteTelegram', 'ClienteTelegramFalso']
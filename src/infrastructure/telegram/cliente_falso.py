@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+try:
+    from pyrogram.enums import ChatType, MessageMediaType
+    from pyrogram.errors import FloodWait
+except ImportError:
+    from src.application.services.limitador_requisicoes import FloodWait
+
+    class ChatType:
+        """Substituto usado quando o Pyrogram não está instalado"""
+        CHANNEL = "channel"
+        SUPERGROUP = "supergroup"
+
+    class MessageMediaType:
+        """Substituto usado quando o Pyrogram não está instalado"""
+        VIDEO = "video"
+
+class ClienteTelegramFalso:
+    """Cliente do Telegram simulado em memória, para medições e testes sem conta real
+
+    Os canais e vídeos são criados pelo próprio teste (adicionar_canal,
+    adicionar_video, gerar_canal) e o conteúdo das mídias é gerado de forma
+    determinística a partir do file_unique_id. Cada requisição (uma página
+    de diálogos ou do histórico, uma chamada a get_messages, uma parte de
+    stream_media...) pode receber:
+
+    - latencia: atraso fixo, em segundos;
+    - banda: bytes por segundo do enlace, compartilhado por todas as transferências;
+    - flood_wait_a_cada: a cada N requisições, um FloodWait de espera_flood_wait segundos.
+
+    As estatísticas (requisições por método, FloodWaits, bytes entregues e o
+    instante do primeiro byte) ficam em estatisticas.
+    """
+
+    TAMANHO_PARTE = 1024 * 1024
+    ITENS_POR_PAGINA = 100
+
+    def __init__(self, latencia: float = 0.0, banda: float = None, flood_wait_a_cada: int = 0,
+                 espera_flood_wait: int = 1):
+        """Inicializa o cliente sem canais, com a latência e a banda simuladas"""
+        self.latencia = latencia
+        self.banda = banda
+        self.flood_wait_a_cada = flood_wait_a_cada
+        self.espera_flood_wait = espera_flood_wait
+
+        self.is_connected = False
+        self.canais: Dict[int, SimpleNamespace] = {}
+        self.mensagens: Dict[int, Dict[int, SimpleNamespace]] = {}  # channel_id -> {message_id: mensagem}
+
+        self._enlace_livre_em = 0.0
+        self._blocos: Dict[str, bytes] = {}
+        self.estatisticas: Dict[str, Any] = {}
+        self.zerar_estatisticas()
+
+    def zerar_estatisticas(self):
+        """Zera os contadores das estatísticas"""
+        self.estatisticas = {
+            "requisicoes": {},
+            "flood_waits": 0,
+            "bytes_entregues": 0,
+            "primeiro_byte": None,
+        }
+
+    # Montagem dos dados simulados
+
+    def adicionar_canal(self, channel_id: int, titulo: str, tipo=ChatType.CHANNEL) -> SimpleNamespace:
+        """Cria um canal vazio"""
+        chat = SimpleNamespace(id=channel_id, title=titulo, type=tipo, members_count=0)
+        self.canais[channel_id] = chat
+        self.mensagens.setdefault(channel_id, {})
+        return chat
+
+    def adicionar_video(self, channel_id: int, tamanho: int, legenda: str = None, duracao: int = 60,
+                        media_group_id: int = None, data: datetime = None,
+                        file_unique_id: str = None) -> SimpleNamespace:
+        """Publica um vídeo no canal, com o próximo message_id
+
+        Um file_unique_id repetido representa a mesma mídia reenviada em
+        outra mensagem ou canal.
+        """
+        mensagem = self._nova_mensagem(channel_id, legenda, data)
+        unico = file_unique_id or f"v{channel_id}_{mensagem.id}"
+
+        mensagem.media_group_id = media_group_id
+        mensagem.media = MessageMediaType.VIDEO
+        mensagem.video = SimpleNamespace(
+            file_id=f"id_{unico}", file_unique_id=unico, file_size=tamanho,
+            file_name=f"{unico}.mp4", mime_type="video/mp4", duration=duracao,
+            width=1280, height=720
+        )
+        return mensagem
+
+    def adicionar_texto(self, channel_id: int, texto: str, data: datetime = None) -> SimpleNamespace:
+        """Publica uma mensagem de texto, sem mídia"""
+        mensagem = self._nova_mensagem(channel_id, None, data)
+        mensagem.text = texto
+        return mensagem
+
+    def gerar_canal(self, channel_id: int, titulo: str, videos: int, tamanho: int,
+                    tamanho_album: int = 0, textos_a_cada: int = 0) -> SimpleNamespace:
+        """Cria um canal com vídeos numerados, opcionalmente agrupados em álbuns e entremeados de textos"""
+        chat = self.adicionar_canal(channel_id, titulo)
+        inicio = datetime(2024, 1, 1)
+
+        for numero in range(1, videos + 1):
+            if textos_a_cada and numero % textos_a_cada == 0:
+                self.adicionar_texto(channel_id, f"Aviso {numero}", inicio + timedelta(hours=numero))
+
+            grupo = (channel_id * 100000 + (numero - 1) // tamanho_album) if tamanho_album else None
+            self.adicionar_video(
+                channel_id, tamanho, legenda=f"Aula {numero:03d}", media_group_id=grupo,
+                data=inicio + timedelta(hours=numero)
+            )
+
+        return chat
+
+    def conteudo(self, file_unique_id: str, inicio: int = 0, fim: int = None) -> bytes:
+        """Bytes de inicio a fim (exclusivo) do conteúdo determinístico de uma mídia"""
+        bloco = self._bloco(file_unique_id)
+        if fim is None:
+            fim = inicio + len(bloco)
+
+        partes = []
+        posicao = inicio
+        while posicao < fim:
+            deslocamento = posicao % len(bloco)
+            pedaco = bloco[deslocamento:deslocamento + fim - posicao]
+            partes.append(pedaco)
+            posicao += len(pedaco)
+        return b"".join(partes)
+
+    def _nova_mensagem(self, channel_id: int, legenda: Optional[str], data: Optional[datetime]) -> SimpleNamespace:
+        """Cria a próxima mensagem do canal, sem mídia"""
+        mensagens = self.mensagens[channel_id]
+        message_id = max(mensagens, default=0) + 1
+        mensagem = SimpleNamespace(
+            id=message_id, chat=self.canais[channel_id], date=data or datetime(2024, 1, 1),
+            caption=legenda, text=None, media=None, media_group_id=None, empty=False,
+            video=None, document=None, photo=None, audio=None, voice=None, animation=None,
+            video_note=None
+        )
+        mensagens[message_id] = mensagem
+        return mensagem
+
+    def _bloco(self, file_unique_id: str) -> bytes:
+        """Bloco de 1 MB que se repete no conteúdo de uma mídia"""
+        bloco = self._blocos.get(file_unique_id)
+        if bloco is None:
+            semente = hashlib.sha256(file_unique_id.encode()).digest()
+            bloco = semente * (self.TAMANHO_PARTE // len(semente))
+            self._blocos[file_unique_id] = bloco
+        return bloco
+
+    # Simulação da rede
+
+    async def _requisicao(self, metodo: str):
+        """Conta a requisição, aplica a latência e, quando configurado, levanta FloodWait"""
+        requisicoes = self.estatisticas["requisicoes"]
+        requisicoes[metodo] = requisicoes.get(metodo, 0) + 1
+
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+
+        if self.flood_wait_a_cada and sum(requisicoes.values()) % self.flood_wait_a_cada == 0:
+            self.estatisticas["flood_waits"] += 1
+            raise FloodWait(value=self.espera_flood_wait)
+
+    async def _transferir(self, quantidade: int):
+        """Aguarda o tempo de transferir os bytes pelo enlace compartilhado"""
+        if self.banda:
+            agora = time.monotonic()
+            self._enlace_livre_em = max(agora, self._enlace_livre_em) + quantidade / self.banda
+            await asyncio.sleep(self._enlace_livre_em - agora)
+        else:
+            await asyncio.sleep(0)
+
+        if self.estatisticas["primeiro_byte"] is None:
+            self.estatisticas["primeiro_byte"] = time.monotonic()
+        self.estatisticas["bytes_entregues"] += quantidade
+
+    def _obter_mensagem(self, chat_id: int, message_id: int) -> SimpleNamespace:
+        """Retorna a mensagem, ou uma mensagem vazia se não existir"""
+        mensagem = self.mensagens.get(chat_id, {}).get(message_id)
+        return mensagem or SimpleNamespace(id=message_id, empty=True, media=None)
+
+    # Interface do cliente (ver ClienteTelegram)
+
+    async def start(self):
+        """Conecta o cliente"""
+        self.is_connected = True
+        return self
+
+    async def stop(self):
+        """Desconecta o cliente"""
+        self.is_connected = False
+        return self
+
+    async def get_dialogs(self, limit: int = 0) -> AsyncIterator[SimpleNamespace]:
+        """Percorre os canais, uma página de ITENS_POR_PAGINA por requisição"""
+        canais = list(self.canais.values())
+        if limit:
+            canais = canais[:limit]
+
+        for indice, chat in enumerate(canais):
+            if indice % self.ITENS_POR_PAGINA == 0:
+                await self._requisicao("get_dialogs")
+            yield SimpleNamespace(chat=chat)
+
+    async def get_chat(self, chat_id: Union[int, str]) -> SimpleNamespace:
+        """Retorna os dados do canal"""
+        await self._requisicao("get_chat")
+        if chat_id not in self.canais:
+            raise ValueError(f"Canal {chat_id} não encontrado")
+        return self.canais[chat_id]
+
+    async def get_chat_history(self, chat_id: Union[int, str], limit: int = 0,
+                               offset_id: int = 0) -> AsyncIterator[SimpleNamespace]:
+        """Percorre as mensagens anteriores a offset_id, da mais nova para a mais antiga"""
+        ids = sorted(
+            (message_id for message_id in self.mensagens.get(chat_id, {})
+             if not offset_id or message_id < offset_id),
+            reverse=True
+        )
+        if limit:
+            ids = ids[:limit]
+
+        for indice, message_id in enumerate(ids):
+            if indice % self.ITENS_POR_PAGINA == 0:
+                await self._requisicao("get_chat_history")
+            yield self.mensagens[chat_id][message_id]
+
+    async def get_messages(self, chat_id: Union[int, str],
+                           message_ids: Union[int, List[int]] = None) -> Union[SimpleNamespace, List[SimpleNamespace]]:
+        """Retorna uma mensagem, ou uma lista de mensagens, pelos IDs"""
+        await self._requisicao("get_messages")
+        if isinstance(message_ids, int):
+            return self._obter_mensagem(chat_id, message_ids)
+        return [self._obter_mensagem(chat_id, message_id) for message_id in message_ids]
+
+    async def get_media_group(self, chat_id: Union[int, str], message_id: int) -> List[SimpleNamespace]:
+        """Retorna as mensagens do álbum da mensagem"""
+        await self._requisicao("get_media_group")
+        mensagem = self._obter_mensagem(chat_id, message_id)
+        grupo = getattr(mensagem, "media_group_id", None)
+        if grupo is None:
+            raise ValueError(f"A mensagem {message_id} não pertence a um grupo de mídia")
+
+        return sorted(
+            (outra for outra in self.mensagens[chat_id].values() if outra.media_group_id == grupo),
+            key=lambda outra: outra.id
+        )
+
+    async def search_messages_count(self, chat_id: Union[int, str], filter: Any = None) -> int:
+        """Conta os vídeos do canal"""
+        await self._requisicao("search_messages_count")
+        return sum(1 for mensagem in self.mensagens.get(chat_id, {}).values() if mensagem.video)
+
+    async def download_media(self, message: SimpleNamespace, file_name: str = None,
+                             progress: Any = None) -> Optional[str]:
+        """Grava a mídia da mensagem no arquivo, parte por parte"""
+        await self._requisicao("download_media")
+        midia = message.video
+        if midia is None:
+            return None
+
+        pasta = os.path.dirname(file_name)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        with open(file_name, "wb") as arquivo:
+            for posicao in range(0, midia.file_size, self.TAMANHO_PARTE):
+                fim = min(posicao + self.TAMANHO_PARTE, midia.file_size)
+                await self._transferir(fim - posicao)
+                arquivo.write(self.conteudo(midia.file_unique_id, posicao, fim))
+                if progress:
+                    # Como no Pyrogram, o progress pode ser uma função ou uma corrotina
+                    resultado = progress(fim, midia.file_size)
+                    if asyncio.iscoroutine(resultado):
+                        await resultado
+
+        return file_name
+
+    async def stream_media(self, message: SimpleNamespace, limit: int = 0,
+                           offset: int = 0) -> AsyncIterator[bytes]:
+        """Entrega a mídia em partes de 1 MB a partir da parte offset; cada parte é uma requisição"""
+        midia = message.video
+        total_partes = (midia.file_size + self.TAMANHO_PARTE - 1) // self.TAMANHO_PARTE
+        ultima = min(total_partes, offset + limit) if limit else total_partes
+
+        for parte in range(offset, ultima):
+            await self._requisicao("stream_media")
+            posicao = parte * self.TAMANHO_PARTE
+            fim = min(posicao + self.TAMANHO_PARTE, midia.file_size)
+            await self._transferir(fim - posicao)
+            yield self.conteudo(midia.file_unique_id, posicao, fim)
@@ -0,0 +1,52 @@
+from typing import Any, AsyncIterator, List, Optional, Protocol, Union
+
+class ClienteTelegram(Protocol):
+    """Operações do cliente do Telegram usadas pelo TelegramService
+
+    O pyrogram.Client já segue esta interface. Outro cliente (como o
+    ClienteTelegramFalso) pode ser passado ao TelegramService para executar
+    os mesmos fluxos sem uma conta real. Os objetos devolvidos precisam ter
+    os atributos usados dos tipos do Pyrogram (Chat, Message, Video...).
+    """
+
+    is_connected: bool
+
+    async def start(self) -> Any:
+        """Conecta o cliente"""
+        ...
+
+    async def stop(self) -> Any:
+        """Desconecta o cliente"""
+        ...
+
+    def get_dialogs(self, limit: int = 0) -> AsyncIterator[Any]:
+        """Percorre os diálogos da conta"""
+        ...
+
+    async def get_chat(self, chat_id: Union[int, str]) -> Any:
+        """Retorna os dados de um chat"""
+        ...
+
+    def get_chat_history(self, chat_id: Union[int, str], limit: int = 0, offset_id: int = 0) -> AsyncIterator[Any]:
+        """Percorre as mensagens de um chat, da mais nova para a mais antiga"""
+        ...
+
+    async def get_messages(self, chat_id: Union[int, str], message_ids: Union[int, List[int]] = None) -> Any:
+        """Retorna uma mensagem, ou uma lista de mensagens, pelos IDs"""
+        ...
+
+    async def get_media_group(self, chat_id: Union[int, str], message_id: int) -> List[Any]:
+        """Retorna as mensagens do grupo de mídia de uma mensagem"""
+        ...
+
+    async def search_messages_count(self, chat_id: Union[int, str], filter: Any = None) -> int:
+        """Conta as mensagens de um chat que atendem ao filtro"""
+        ...
+
+    async def download_media(self, message: Any, file_name: str = None, progress: Any = None) -> Optional[str]:
+        """Baixa a mídia de uma mensagem para um arquivo e retorna seu caminho"""
+        ...
+
+    def stream_media(self, message: Any, limit: int = 0, offset: int = 0) -> AsyncIterator[bytes]:
+        """Entrega a mídia de uma mensagem em partes de 1 MB, a partir da parte offset"""
+        ...
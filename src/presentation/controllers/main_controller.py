@@ -6,16 +6,23 @@ from typing import Dict, Any, Optional
 from src.application.services import AppService
 from src.domain.entities import Aula
 from src.presentation.views import ArvoreAulas, PainelDetalhes
+from src.presentation.views.componentes_ui import PonteInterface
 from src.presentation.controllers.telegram_controller import TelegramController
 
 class MainController:
     """Controlador principal da aplicação"""
     
+    # Intervalo de consulta dos cursos montados durante os downloads do Telegram
+    INTERVALO_CURSOS_TELEGRAM_MS = 500
+    
     def __init__(self, root):
         """Inicializa o controlador principal"""
         self.root = root
         self.app_service = AppService()
         
+        # Verificações do carregamento e dos downloads, feitas nos quadros da ponte
+        self.ponte = PonteInterface.obter(root)
+        
         # Configurar interface
         self._configurar_interface()
         
@@ -53,12 +60,23 @@ class MainController:
         # Inicializar controlador do Telegram na aba correspondente
         self.telegram_controller = TelegramController(self.frame_telegram)
         
+        # Acompanhar os cursos montados a partir dos canais baixados
+        self._eventos_cursos_adiados = []
+        self.ponte.acompanhar(self._verificar_cursos_telegram, self.INTERVALO_CURSOS_TELEGRAM_MS)
+        
         # Barra de status
         self.barra_status = ttk.Frame(self.root, relief=tk.SUNKEN, borderwidth=1)
         self.barra_status.pack(fill=tk.X, side=tk.BOTTOM, padx=10, pady=5)
         
         self.lbl_status = ttk.Label(self.barra_status, text="Pronto")
         self.lbl_status.pack(side=tk.LEFT, padx=5)
+        
+        # Progresso do carregamento em segundo plano (exibido apenas durante o carregamento)
+        self.progresso_carregamento = ttk.Progressbar(
+            self.barra_status,
+            mode="determinate",
+            length=200
+        )
     
     def _configurar_aba_plano(self):
         """Configura a aba de Plano de Estudo"""
@@ -166,6 +184,7 @@ class MainController:
         
         self.menu_arquivo.add_command(label="Abrir Curso", command=self._abrir_curso)
         self.menu_arquivo.add_command(label="Cursos Salvos", command=self._abrir_cursos_salvos)
+        self.menu_arquivo.add_command(label="Cancelar Carregamento", command=self._cancelar_carregamento)
         self.menu_arquivo.add_separator()
         self.menu_arquivo.add_command(label="Exportar Relatório", command=self._exportar_relatorio)
         self.menu_arquivo.add_separator()
@@ -219,23 +238,78 @@ class MainController:
         if not diretorio:
             return
         
+        # Carregar curso em segundo plano
+        self._iniciar_carregamento(f"Carregando curso de {diretorio}...", caminho=diretorio)
+    
+    def _iniciar_carregamento(self, mensagem: str, caminho: str = None, id_curso: int = None):
+        """Inicia o carregamento de um curso sem bloquear a interface"""
+        # Um novo carregamento cancela o anterior
+        carregamento = self.app_service.iniciar_carregamento_curso(caminho=caminho, id_curso=id_curso)
+        
         # Atualizar barra de status
-        self.lbl_status.config(text=f"Carregando curso de {diretorio}...")
-        self.root.update_idletasks()
+        self.lbl_status.config(text=mensagem)
+        self.progresso_carregamento.config(mode="indeterminate")
+        self.progresso_carregamento.pack(side=tk.RIGHT, padx=5)
+        self.progresso_carregamento.start(15)
         
-        # Carregar curso
-        curso = self.app_service.carregar_curso(diretorio)
+        self.ponte.acompanhar(lambda: self._verificar_carregamento(carregamento))
+    
+    def _verificar_carregamento(self, carregamento) -> bool:
+        """Consome os eventos do carregamento e atualiza a interface; retorna False ao terminar"""
+        progresso = None
+        
+        for tipo, dados in carregamento.obter_eventos():
+            # Ignorar eventos de carregamentos substituídos por outro
+            if carregamento is not self.app_service.carregamento_atual:
+                return False
+            
+            if tipo == "progresso":
+                # Apenas o progresso mais recente de cada quadro é exibido
+                progresso = dados
+            
+            elif tipo == "concluido":
+                self._finalizar_carregamento(carregamento, dados)
+                return False
+            
+            elif tipo == "erro":
+                self._ocultar_progresso_carregamento()
+                self.app_service.cancelar_carregamento()
+                messagebox.showerror("Erro ao Carregar Curso", dados)
+                self.lbl_status.config(text="Pronto")
+                return False
+            
+            elif tipo == "cancelado":
+                self._ocultar_progresso_carregamento()
+                self.lbl_status.config(text="Carregamento cancelado")
+                return False
         
-        if not curso:
-            messagebox.showerror(
-                "Erro ao Carregar Curso",
-                "Não foi possível carregar o curso selecionado."
-            )
-            self.lbl_status.config(text="Pronto")
+        if carregamento is not self.app_service.carregamento_atual:
+            return False
+        
+        if progresso:
+            etapa, texto, fracao = progresso
+            self.lbl_status.config(text=texto)
+            
+            if fracao is None:
+                if str(self.progresso_carregamento["mode"]) != "indeterminate":
+                    self.progresso_carregamento.config(mode="indeterminate")
+                    self.progresso_carregamento.start(15)
+            else:
+                self.progresso_carregamento.stop()
+                self.progresso_carregamento.config(mode="determinate", value=fracao * 100)
+        return True
+    
+    def _finalizar_carregamento(self, carregamento, curso):
+        """Exibe o curso carregado (etapa de renderização, na thread do Tk)"""
+        self._ocultar_progresso_carregamento()
+        
+        # Substituir o curso atual de uma só vez
+        if not self.app_service.concluir_carregamento(carregamento, curso):
             return
         
         # Atualizar interface
         self.arvore_aulas.carregar_curso(curso)
+        self.painel_detalhes.exibir_aula(None)
         
         # Atualizar informações de progresso
         self._atualizar_informacoes_progresso()
@@ -243,6 +317,51 @@ class MainController:
         # Atualizar barra de status
         self.lbl_status.config(text=f"Curso carregado: {curso.nome}")
     
+    def _verificar_cursos_telegram(self):
+        """Acrescenta ao curso exibido as aulas que ficaram prontas nos downloads do Telegram"""
+        curso = self.app_service.curso_atual
+        eventos = self._eventos_cursos_adiados + self.telegram_controller.obter_eventos_cursos()
+        self._eventos_cursos_adiados = []
+        
+        for tipo, dados in eventos:
+            if tipo == "curso":
+                id_curso, nome = dados
+                self.lbl_status.config(text=f"Curso criado a partir do canal: {nome}")
+            
+            elif tipo == "abrir":
+                # Curso virtual: exibido assim que cadastrado, com as aulas chegando aos poucos
+                self.notebook.select(self.frame_plano)
+                self._iniciar_carregamento("Carregando curso do canal...", id_curso=dados)
+                curso = None
+            
+            elif tipo == "aulas":
+                id_curso, aulas = dados
+                if self.app_service.carregamento_atual:
+                    # Aplicar depois que o curso em carregamento for exibido
+                    self._eventos_cursos_adiados.append((tipo, dados))
+                elif curso and curso.id == id_curso:
+                    self.arvore_aulas.adicionar_aulas(aulas)
+                    self._atualizar_informacoes_progresso()
+            
+            elif tipo == "reorganizado":
+                # Os módulos foram recalculados ao final do download: recarregar o curso
+                if curso and curso.id == dados and not self.app_service.carregamento_atual:
+                    self._iniciar_carregamento(f"Atualizando curso {curso.nome}...", id_curso=dados)
+    
+    def _cancelar_carregamento(self):
+        """Cancela o carregamento de curso em andamento"""
+        if not self.app_service.carregamento_atual:
+            return
+        
+        self.app_service.cancelar_carregamento()
+        self._ocultar_progresso_carregamento()
+        self.lbl_status.config(text="Carregamento cancelado")
+    
+    def _ocultar_progresso_carregamento(self):
+        """Oculta a barra de progresso do carregamento"""
+        self.progresso_carregamento.stop()
+        self.progresso_carregamento.pack_forget()
+    
     def _atualizar_informacoes_progresso(self):
         """Atualiza as informações de progresso"""
         if not self.app_service.curso_atual:
@@ -388,6 +507,7 @@ class MainController:
         
         # Fechar conexões
         self.app_service.fechar()
+        self.telegram_controller.fechar()
         
         # Fechar janela
         self.root.destroy()
@@ -425,6 +545,10 @@ class MainController:
     
     def _on_abrir_video(self, aula: Aula):
         """Trata a abertura do vídeo de uma aula"""
+        if self.telegram_controller.e_aula_virtual(aula.caminho_video):
+            self._abrir_aula_virtual(aula)
+            return
+        
         # Abrir vídeo
         resultado = self.app_service.abrir_video(aula)
         
@@ -434,6 +558,26 @@ class MainController:
                 f"Não foi possível abrir o vídeo:\n{aula.caminho_video}"
             )
     
+    def _abrir_aula_virtual(self, aula: Aula):
+        """Transmite (ou obtém do cache) o vídeo de uma aula virtual e o abre, pré-carregando as seguintes"""
+        aulas = self.app_service.curso_atual.obter_todas_aulas() if self.app_service.curso_atual else []
+        posicao = next((i for i, outra in enumerate(aulas) if outra is aula), len(aulas))
+        proximas = [outra.caminho_video for outra in aulas[posicao + 1:posicao + 11]]
+        
+        def concluir(caminho, erro=None):
+            if erro or not self.app_service.abrir_arquivo(caminho):
+                self.lbl_status.config(text="Pronto")
+                messagebox.showerror(
+                    "Erro ao Abrir Vídeo",
+                    f"Não foi possível obter o vídeo da aula:\n{aula.titulo}\n{erro or ''}"
+                )
+                return
+            
+            self.lbl_status.config(text=f"Reproduzindo: {aula.titulo}")
+        
+        self.lbl_status.config(text=f"Preparando aula: {aula.titulo}...")
+        self.telegram_controller.abrir_aula_virtual(aula.caminho_video, proximas, callback=concluir)
+    
     def _abrir_cursos_salvos(self):
         """Abre a janela de cursos salvos"""
         try:
@@ -513,26 +657,4 @@ class MainController:
     
     def _carregar_curso_por_id(self, id_curso, caminho):
         """Carrega um curso a partir do ID e caminho"""
-        # Atualizar barra de status
-        self.lbl_status.config(text=f"Carregando curso de {caminho}...")
-        self.root.update_idletasks()
-        
-        # Carregar curso
-        curso = self.app_service.carregar_curso_por_id(id_curso)
-        
-        if not curso:
-            messagebox.showerror(
-                "Erro ao Carregar Curso",
-                "Não foi possível carregar o curso selecionado."
-            )
-            self.lbl_status.config(text="Pronto")
-            return
-        
-        # Atualizar interface
-        self.arvore_aulas.carregar_curso(curso)
-        
-        # Atualizar informações de progresso
-        self._atualizar_informacoes_progresso()
-        
-        # Atualizar barra de status
-        self.lbl_status.config(text=f"Curso carregado: {curso.nome}") 
\ No newline at end of file
+        self._iniciar_carregamento(f"Carregando curso de {caminho}...", id_curso=id_curso)
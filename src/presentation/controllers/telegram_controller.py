@@ -1,11 +1,10 @@
+import queue
 import tkinter as tk
 from tkinter import ttk, messagebox
-import asyncio
-import threading
-import nest_asyncio
 
-from src.application.services import TelegramService
+from src.application.services import TelegramService, FilaDownloads
 from src.presentation.views import TelegramPanel
+from src.presentation.views.componentes_ui import PonteInterface
 
 class TelegramController:
     """Controlador para gerenciar a integração com o Telegram"""
@@ -13,13 +12,15 @@ class TelegramController:
     def __init__(self, master):
         """Inicializa o controlador do Telegram"""
         self.master = master
+        
+        # Resultados das tarefas do loop chegam à interface pela ponte, agrupados por quadro
+        self.ponte = PonteInterface.obter(master)
+        
+        # O serviço mantém uma thread com o loop asyncio e o cliente conectado
         self.telegram_service = TelegramService()
         
-        # Configurar loop assíncrono global e habilitar aninhamento
-        # Isso permite que múltiplas operações assíncronas sejam executadas no mesmo loop
-        self.main_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.main_loop)
-        nest_asyncio.apply(self.main_loop)
+        # Fila persistente de downloads, processada no loop do Telegram
+        self.fila_downloads = FilaDownloads(self.telegram_service)
         
         # Obter credenciais salvas, se existirem
         api_id, api_hash = self.telegram_service.get_credentials()
@@ -29,105 +30,120 @@ class TelegramController:
             master,
             on_configure_api=self.configure_api,
             on_list_channels=self.list_channels,
-            on_download_channel=self.download_channel,
+            on_load_cached_channels=self.telegram_service.carregar_cache_canais,
+            on_enqueue_download=self.enqueue_download,
+            on_list_queue=self.fila_downloads.obter_itens,
+            on_remove_queue_item=self.fila_downloads.remover,
+            on_clear_queue=self.fila_downloads.limpar_concluidos,
+            on_dedup_report=self.telegram_service.relatorio_deduplicacao,
+            on_open_virtual_course=self.open_virtual_course,
+            run_async=self.run_async,
             api_id=api_id,
             api_hash=api_hash
         )
         # Empacotar o painel para preencher todo o espaço disponível
         self.painel.pack(fill=tk.BOTH, expand=True)
+        
+        # Retomar os downloads pendentes da execução anterior
+        if self.telegram_service.has_valid_credentials():
+            self.fila_downloads.iniciar()
     
     def configure_api(self, api_id, api_hash):
         """Configura as credenciais da API do Telegram"""
         try:
             resultado = self.telegram_service.save_credentials(api_id, api_hash)
+            if resultado and self.telegram_service.has_valid_credentials():
+                self.fila_downloads.iniciar()
             return resultado
         except Exception as e:
             print(f"Erro ao configurar API: {e}")
             return False
     
-    async def list_channels(self):
-        """Lista os canais disponíveis no Telegram"""
+    def obter_eventos_cursos(self):
+        """Retorna os eventos da montagem de cursos publicados desde a última chamada"""
+        eventos = []
+        while True:
+            try:
+                eventos.append(self.telegram_service.eventos_cursos.get_nowait())
+            except queue.Empty:
+                return eventos
+    
+    def open_virtual_course(self, channel_id):
+        """Monta o curso virtual de um canal, exibido na aba Plano de Estudo assim que cadastrado"""
+        def concluir(id_curso, erro=None):
+            if erro:
+                self.painel.lbl_progresso.config(text=f"Erro ao montar curso: {erro}")
+            elif id_curso is None:
+                self.painel.lbl_progresso.config(text="Não foi possível cadastrar o curso.")
+            else:
+                self.painel.lbl_progresso.config(text="Todas as aulas do canal foram adicionadas ao curso.")
+        
+        self.run_async(self.telegram_service.montar_curso_virtual, channel_id, callback=concluir)
+    
+    def e_aula_virtual(self, caminho):
+        """Indica se a aula é de um curso virtual (baixada sob demanda)"""
+        return self.telegram_service.e_aula_virtual(caminho)
+    
+    def abrir_aula_virtual(self, uri, proximas=(), callback=None):
+        """Obtém o arquivo (ou a URL de transmissão) de uma aula virtual e pré-carrega as próximas; callback recebe (caminho) ou (None, erro)"""
+        return self.run_async(self.telegram_service.obter_aula_virtual, uri, list(proximas), callback=callback)
+    
+    async def list_channels(self, on_parcial=None):
+        """Lista os canais disponíveis no Telegram, reportando as páginas lidas a on_parcial"""
         if not self.telegram_service.has_valid_credentials():
             raise Exception("Credenciais de API não configuradas ou inválidas.")
         
         try:
-            canais = await self.telegram_service.list_channels()
+            canais = await self.telegram_service.list_channels(on_parcial)
             return canais
         except Exception as e:
             print(f"Erro ao listar canais: {e}")
             raise
     
-    async def download_channel(self, channel_id, progress_callback=None):
-        """Faz download de vídeos de um canal"""
-        print(f"Método download_channel chamado para o canal: {channel_id}")
-        
-        # Verificar se estamos usando o loop correto
-        current_loop = asyncio.get_running_loop()
-        if current_loop != self.main_loop:
-            print(f"AVISO: Loop atual ({id(current_loop)}) não é o loop principal ({id(self.main_loop)})")
-        
+    def enqueue_download(self, channel_id, titulo=None, prioridade=0, reconciliar=False, message_id=None,
+                         message_id_final=None):
+        """Adiciona um canal inteiro, uma mensagem ou um intervalo de mensagens à fila de downloads"""
         if not self.telegram_service.has_valid_credentials():
-            print("Credenciais inválidas ou não configuradas")
             raise Exception("Credenciais de API não configuradas ou inválidas.")
         
-        try:
-            # Adaptar o callback para o formato esperado pelo serviço
-            # O serviço espera um callback que recebe um dicionário de status,
-            # mas a interface espera (current, total, text)
-            adapter = None
-            if progress_callback:
-                print("Criando adaptador para callback de progresso")
-                def adapter(status):
-                    print(f"Callback de progresso chamado. Status: {status}")
-                    current = status.get("baixados", 0) + status.get("ignorados", 0)
-                    total = max(status.get("total", 1), 1)  # Evitar divisão por zero
-                    text = f"Baixados: {status.get('baixados', 0)}, Ignorados: {status.get('ignorados', 0)}, Erros: {status.get('erros', 0)}"
-                    progress_callback(current, total, text)
-            
-            print(f"Iniciando download_channel_videos para o canal: {channel_id}")
-            resultado = await self.telegram_service.download_channel_videos(
-                channel_id,
-                adapter
-            )
-            print(f"Download concluído. Resultado: {resultado}")
-            return resultado
-        except Exception as e:
-            print(f"Erro ao baixar vídeos: {e}")
-            raise
+        if message_id_final:
+            tipo = FilaDownloads.TIPO_INTERVALO
+        elif message_id:
+            tipo = FilaDownloads.TIPO_MENSAGEM
+        else:
+            tipo = FilaDownloads.TIPO_CANAL
+        return self.fila_downloads.adicionar(
+            tipo, channel_id, titulo, prioridade, message_id=message_id, reconciliar=reconciliar,
+            message_id_final=message_id_final
+        )
     
     def run_async(self, coro_func, *args, callback=None):
         """
-        Executa uma função corrotina usando o loop assíncrono compartilhado
+        Executa uma função corrotina no loop do Telegram
         
         Args:
             coro_func: A função corrotina a ser executada
             *args: Argumentos para a função
-            callback: Função de callback a ser chamada com o resultado
+            callback: Função chamada na thread do Tk com (resultado) ou (None, erro)
         """
-        try:
-            # Preparar função assíncrona com argumentos
-            async def async_task():
-                try:
-                    result = await coro_func(*args)
-                    if callback:
-                        # Agendar callback na thread principal
-                        self.master.after(0, lambda: callback(result))
-                    return result
-                except Exception as error:
-                    # Capturar o erro no escopo local
-                    error_msg = str(error)
-                    if callback:
-                        # Usar uma cópia local do erro para o callback
-                        self.master.after(0, lambda: callback(None, error_msg))
-                    raise
-            
-            # Executar a tarefa em uma thread separada
-            threading.Thread(
-                target=self._run_task_in_loop,
-                args=(async_task,),
-                daemon=True
-            ).start()
+        def concluir(future):
+            # Chamado na thread do loop: repassar o resultado para a thread do Tk
+            if future.cancelled():
+                return
             
+            erro = future.exception()
+            if erro:
+                error_msg = str(erro)
+                print(f"Erro ao executar tarefa assíncrona: {error_msg}")
+                if callback:
+                    self.ponte.enfileirar(callback, None, error_msg)
+            elif callback:
+                self.ponte.enfileirar(callback, future.result())
+        
+        try:
+            future = self.telegram_service.executar(coro_func(*args))
+            future.add_done_callback(concluir)
+            return future
         except Exception as error:
             # Capturar o erro no escopo local
             error_msg = str(error)
@@ -135,16 +151,6 @@ class TelegramController:
             if callback:
                 callback(None, error_msg)
     
-    def _run_task_in_loop(self, async_task):
-        """
-        Executa uma tarefa no loop principal
-        
-        Isso evita problemas de múltiplos loops que causam o erro 
-        "Task got Future attached to a different loop"
-        """
-        try:
-            # Usar o loop global
-            return self.main_loop.run_until_complete(async_task())
-        except Exception as e:
-            print(f"Erro ao executar tarefa no loop: {e}")
-            # Não re-levantar a exceção para evitar crashes na thread 
\ No newline at end of file
+    def fechar(self):
+        """Encerra a sessão do Telegram e a thread do loop"""
+        self.telegram_service.fechar()
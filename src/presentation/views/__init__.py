@@ -1,5 +1,6 @@
 from .arvore_aulas import ArvoreAulas
+from .lista_virtual_aulas import ListaVirtualAulas
 from .painel_detalhes import PainelDetalhes
 from .telegram_panel import TelegramPanel
 
-__all__ = ['ArvoreAulas', 'PainelDetalhes', 'TelegramPanel'] 
\ No newline at end of file
+__all__ = ['ArvoreAulas', 'ListaVirtualAulas', 'PainelDetalhes', 'TelegramPanel'] 
\ No newline at end of file
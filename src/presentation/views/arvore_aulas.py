@@ -1,12 +1,19 @@
+import bisect
 import tkinter as tk
 from tkinter import ttk
-from typing import Dict, Any, List, Callable, Optional
+from typing import Dict, Any, List, Callable, Optional, Tuple
 
 from src.domain.entities import Curso, Modulo, Aula
+from .lista_virtual_aulas import ListaVirtualAulas
+from .indice_busca import IndiceBusca
+from .componentes_ui import ConsultaAdiada
 
 class ArvoreAulas(ttk.Frame):
     """Componente para exibir a estrutura de aulas em forma de árvore"""
     
+    # Cursos com mais aulas que este limite são abertos no modo lista
+    LIMITE_AULAS_MODO_LISTA = 5000
+    
     def __init__(self, master=None, **kwargs):
         """Inicializa o componente de árvore de aulas"""
         # Extrair callbacks antes de inicializar o Frame
@@ -38,6 +45,36 @@ class ArvoreAulas(ttk.Frame):
         )
         self.btn_pesquisar.pack(side=tk.RIGHT, padx=(5, 0))
         
+        # Navegação entre os resultados da pesquisa
+        self.btn_proximo = ttk.Button(
+            self.frame_pesquisa,
+            text="▶",
+            width=3,
+            command=lambda: self._ir_para_resultado(1)
+        )
+        self.btn_proximo.pack(side=tk.RIGHT, padx=(5, 0))
+        
+        self.btn_anterior = ttk.Button(
+            self.frame_pesquisa,
+            text="◀",
+            width=3,
+            command=lambda: self._ir_para_resultado(-1)
+        )
+        self.btn_anterior.pack(side=tk.RIGHT, padx=(5, 0))
+        
+        self.lbl_resultados = ttk.Label(self.frame_pesquisa, text="", width=9, anchor=tk.CENTER)
+        self.lbl_resultados.pack(side=tk.RIGHT, padx=(5, 0))
+        
+        # Alternar entre árvore e lista virtualizada
+        self.modo_lista = tk.BooleanVar(value=False)
+        self.chk_modo_lista = ttk.Checkbutton(
+            self.frame_pesquisa,
+            text="Modo lista",
+            variable=self.modo_lista,
+            command=self._alternar_modo
+        )
+        self.chk_modo_lista.pack(side=tk.RIGHT, padx=(5, 0))
+        
         # Criar árvore
         self.frame_arvore = ttk.Frame(self)
         self.frame_arvore.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -80,6 +117,16 @@ class ArvoreAulas(ttk.Frame):
         # Empacotar árvore
         self.arvore.pack(fill=tk.BOTH, expand=True)
         
+        # Criar lista virtualizada (exibida apenas no modo lista)
+        self.lista = ListaVirtualAulas(
+            self,
+            cores=self.arvore_cores,
+            on_selecionar_item=self._on_selecionar_item_lista,
+            on_ativar_item=lambda aula: self._marcar_desmarcar_aula(not aula.concluida),
+            on_abrir_item=lambda aula: self._abrir_video(),
+            on_menu_contexto=lambda event: self.menu_contexto.post(event.x_root, event.y_root)
+        )
+        
         # Configurar tags para itens da árvore
         self.arvore.tag_configure("concluida", background=self.arvore_cores["aula_concluida"])
         self.arvore.tag_configure("modulo_completo", background=self.arvore_cores["modulo_completo"])
@@ -90,6 +137,10 @@ class ArvoreAulas(ttk.Frame):
         self.arvore.bind("<Double-1>", self._on_duplo_clique)
         self.arvore.bind("<space>", self._on_tecla_espaco)
         self.entry_pesquisa.bind("<Return>", self._pesquisar)
+        self.entry_pesquisa.bind("<KeyRelease>", self._on_digitar_pesquisa)
+        self.entry_pesquisa.bind("<Shift-Return>", lambda e: self._ir_para_resultado(-1))
+        self.entry_pesquisa.bind("<F3>", lambda e: self._ir_para_resultado(1))
+        self.entry_pesquisa.bind("<Shift-F3>", lambda e: self._ir_para_resultado(-1))
         
         # Adicionar menu de contexto
         self._criar_menu_contexto()
@@ -98,6 +149,27 @@ class ArvoreAulas(ttk.Frame):
         # Variáveis de controle
         self.curso_atual = None
         self.mapa_itens = {}  # Mapeamento de itens da árvore para objetos
+        self.aula_para_iid = {}  # Mapeamento inverso: id(aula) -> item da árvore
+        
+        # Índices do curso atual para acrescentar aulas sem percorrer o curso
+        self.ids_aulas = set()  # IDs das aulas já presentes
+        self.modulos_por_nome = {}  # Nome -> módulo
+        self.ordens_modulo = {}  # id(módulo) -> ordens das aulas, em ordem crescente
+        self.modulo_para_iid = {}  # id(módulo) -> item da árvore
+        
+        # Estado da pesquisa
+        self.indice_pesquisa = IndiceBusca()
+        self.termo_pesquisa = ""
+        self.resultados_pesquisa = []
+        self.posicao_resultado = -1
+        self.itens_destacados = set()
+        
+        # Pesquisa enquanto digita, executada fora da thread do Tk
+        self.consulta_pesquisa = ConsultaAdiada(
+            self,
+            lambda termo: self.indice_pesquisa.buscar(termo),
+            self._aplicar_resultado_pesquisa
+        )
         
     def _configurar_estilo(self):
         """Configura o estilo da árvore"""
@@ -167,10 +239,39 @@ class ArvoreAulas(ttk.Frame):
         
         # Limpar mapa de itens
         self.mapa_itens = {}
+        self.aula_para_iid = {}
+        self.modulo_para_iid = {}
+        
+        # Índices usados por adicionar_aulas
+        self.ids_aulas = set()
+        self.modulos_por_nome = {modulo.nome: modulo for modulo in curso.modulos} if curso else {}
+        self.ordens_modulo = {}
+        
+        # Reiniciar pesquisa e reconstruir o índice de títulos
+        self.consulta_pesquisa.cancelar()
+        self.termo_pesquisa = ""
+        self.resultados_pesquisa = []
+        self.posicao_resultado = -1
+        self.itens_destacados = set()
+        self.lbl_resultados.config(text="")
+        todas_aulas = curso.obter_todas_aulas() if curso else []
+        self.ids_aulas = {aula.id for aula in todas_aulas if aula.id is not None}
+        self.indice_pesquisa = IndiceBusca((aula, aula.titulo) for aula in todas_aulas)
         
         # Armazenar curso atual
+        novo_curso = curso is not self.curso_atual
         self.curso_atual = curso
         
+        # Cursos muito grandes abrem diretamente no modo lista
+        if (novo_curso and curso and not self.modo_lista.get()
+                and curso.total_aulas > self.LIMITE_AULAS_MODO_LISTA):
+            self.modo_lista.set(True)
+            self._exibir_modo()
+        
+        if self.modo_lista.get():
+            self.lista.carregar_curso(curso)
+            return
+        
         if not curso:
             return
         
@@ -189,6 +290,82 @@ class ArvoreAulas(ttk.Frame):
         for modulo in curso.modulos:
             self._adicionar_modulo(id_curso, modulo)
     
+    def adicionar_aulas(self, aulas: List[Tuple[str, Aula]]):
+        """Acrescenta aulas ao curso exibido, na posição dada pela ordem, criando os módulos que faltarem"""
+        curso = self.curso_atual
+        if not curso or not aulas:
+            return
+        
+        # Aulas já carregadas com o curso (ou repetidas no lote) não são repetidas
+        novas = []
+        for nome_modulo, aula in aulas:
+            if aula.id is not None:
+                if aula.id in self.ids_aulas:
+                    continue
+                self.ids_aulas.add(aula.id)
+            novas.append((nome_modulo, aula))
+        aulas = novas
+        if not aulas:
+            return
+        
+        raiz = self.arvore.get_children("")[0] if self.arvore.get_children("") else None
+        na_arvore = raiz and not self.modo_lista.get()
+        alterados = {}
+        
+        for nome_modulo, aula in aulas:
+            ordem = self._ordem(aula)
+            modulo = self.modulos_por_nome.get(nome_modulo)
+            
+            if modulo is None:
+                # Novo módulo, posicionado pela ordem da sua primeira aula
+                modulo = Modulo(nome=nome_modulo, aulas=[], id=None)
+                self.modulos_por_nome[nome_modulo] = modulo
+                
+                posicao_modulo = bisect.bisect_right(
+                    [self._ordem(m.aulas[0]) if m.aulas else float('inf') for m in curso.modulos],
+                    ordem
+                )
+                curso.modulos.insert(posicao_modulo, modulo)
+                
+                if na_arvore:
+                    id_modulo = self.arvore.insert(
+                        raiz, posicao_modulo, text=modulo.nome, values=("0%",), tags=("modulo",)
+                    )
+                    self.mapa_itens[id_modulo] = modulo
+                    self.modulo_para_iid[id(modulo)] = id_modulo
+            
+            # Ordens das aulas do módulo, montadas na primeira inserção e mantidas a cada nova aula
+            ordens = self.ordens_modulo.get(id(modulo))
+            if ordens is None:
+                ordens = [self._ordem(a) for a in modulo.aulas]
+                self.ordens_modulo[id(modulo)] = ordens
+            
+            posicao = bisect.bisect_right(ordens, ordem)
+            ordens.insert(posicao, ordem)
+            modulo.aulas.insert(posicao, aula)
+            alterados[id(modulo)] = modulo
+            
+            if na_arvore:
+                self._adicionar_aula(self.modulo_para_iid.get(id(modulo)), aula, posicao)
+        
+        self.indice_pesquisa.adicionar((aula, aula.titulo) for _, aula in aulas)
+        
+        if self.modo_lista.get():
+            self.lista.recarregar()
+            return
+        
+        if raiz:
+            # Atualizar o progresso apenas do curso e dos módulos alterados
+            for chave in alterados:
+                id_modulo = self.modulo_para_iid.get(chave)
+                if id_modulo:
+                    self._atualizar_status_item_recursivo(id_modulo)
+            self.arvore.item(raiz, values=(f"{curso.progresso}%",))
+    
+    def _ordem(self, aula: Aula) -> float:
+        """Chave de posição de uma aula; aulas sem ordem ficam no final"""
+        return aula.ordem if aula.ordem is not None else float('inf')
+    
     def _adicionar_modulo(self, id_pai, modulo: Modulo):
         """Adiciona um módulo e seus filhos à árvore"""
         # Determinar progresso do módulo
@@ -212,6 +389,7 @@ class ArvoreAulas(ttk.Frame):
         
         # Associar módulo ao nó
         self.mapa_itens[id_modulo] = modulo
+        self.modulo_para_iid[id(modulo)] = id_modulo
         
         # Adicionar aulas do módulo
         if hasattr(modulo, 'aulas') and modulo.aulas:
@@ -226,7 +404,7 @@ class ArvoreAulas(ttk.Frame):
         # Atualizar tags do módulo com base no estado das aulas
         self._atualizar_tags_modulo(id_modulo)
     
-    def _adicionar_aula(self, id_pai, aula: Aula):
+    def _adicionar_aula(self, id_pai, aula: Aula, posicao="end"):
         """Adiciona uma aula à árvore"""
         # Determinar status da aula
         status = "Concluída" if aula.concluida else "Pendente"
@@ -234,7 +412,7 @@ class ArvoreAulas(ttk.Frame):
         
         # Adicionar nó da aula
         id_aula = self.arvore.insert(
-            id_pai, "end",
+            id_pai, posicao,
             text=aula.titulo_formatado,
             values=(status,),
             tags=tags
@@ -242,6 +420,7 @@ class ArvoreAulas(ttk.Frame):
         
         # Associar aula ao nó
         self.mapa_itens[id_aula] = aula
+        self.aula_para_iid[id(aula)] = id_aula
     
     def _atualizar_tags_modulo(self, id_modulo):
         """Atualiza as tags de um módulo com base no estado das aulas"""
@@ -261,6 +440,10 @@ class ArvoreAulas(ttk.Frame):
     
     def atualizar_status_aulas(self):
         """Atualiza o status de todas as aulas na árvore"""
+        if self.modo_lista.get():
+            self.lista.atualizar()
+            return
+        
         # Atualizar recursivamente todos os itens da árvore
         for id_item in self.arvore.get_children():
             self._atualizar_status_item_recursivo(id_item)
@@ -340,6 +523,38 @@ class ArvoreAulas(ttk.Frame):
                 # Atualizar progresso do curso
                 self.arvore.item(id_item, values=(f"{item.progresso}%",))
     
+    def _obter_item_selecionado(self):
+        """Retorna o objeto selecionado na árvore ou na lista"""
+        if self.modo_lista.get():
+            return self.lista.item_selecionado
+        
+        selecionados = self.arvore.selection()
+        
+        if not selecionados:
+            return None
+        
+        return self.mapa_itens.get(selecionados[0])
+    
+    def _alternar_modo(self):
+        """Alterna entre a árvore e a lista virtualizada"""
+        self._exibir_modo()
+        self.carregar_curso(self.curso_atual)
+    
+    def _exibir_modo(self):
+        """Exibe o widget correspondente ao modo atual"""
+        if self.modo_lista.get():
+            self.frame_arvore.pack_forget()
+            self.lista.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        else:
+            self.lista.pack_forget()
+            self.lista.carregar_curso(None)
+            self.frame_arvore.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    
+    def _on_selecionar_item_lista(self, item):
+        """Trata a seleção de um item na lista virtualizada"""
+        if isinstance(item, Aula) and self.on_selecionar_aula:
+            self.on_selecionar_aula(item)
+    
     def _on_selecionar_item(self, event):
         """Trata a seleção de um item na árvore"""
         # Obter item selecionado
@@ -388,17 +603,8 @@ class ArvoreAulas(ttk.Frame):
     
     def _on_tecla_espaco(self, event):
         """Trata a tecla de espaço para marcar/desmarcar aulas"""
-        # Obter item selecionado
-        selecionados = self.arvore.selection()
-        
-        if not selecionados:
-            return
-        
-        # Obter o primeiro item selecionado
-        id_item = selecionados[0]
-        
-        # Obter objeto associado ao item
-        item = self.mapa_itens.get(id_item)
+        # Obter objeto associado ao item selecionado
+        item = self._obter_item_selecionado()
         
         if not item:
             return
@@ -410,17 +616,8 @@ class ArvoreAulas(ttk.Frame):
     
     def _marcar_desmarcar_aula(self, concluida: bool):
         """Marca ou desmarca uma aula como concluída"""
-        # Obter item selecionado
-        selecionados = self.arvore.selection()
-        
-        if not selecionados:
-            return
-        
-        # Obter o primeiro item selecionado
-        id_item = selecionados[0]
-        
-        # Obter objeto associado ao item
-        item = self.mapa_itens.get(id_item)
+        # Obter objeto associado ao item selecionado
+        item = self._obter_item_selecionado()
         
         if not item or not isinstance(item, Aula):
             return
@@ -434,17 +631,8 @@ class ArvoreAulas(ttk.Frame):
     
     def _marcar_desmarcar_todas_aulas(self, concluida: bool):
         """Marca ou desmarca todas as aulas de um módulo como concluídas"""
-        # Obter item selecionado
-        selecionados = self.arvore.selection()
-        
-        if not selecionados:
-            return
-        
-        # Obter o primeiro item selecionado
-        id_item = selecionados[0]
-        
-        # Obter objeto associado ao item
-        item = self.mapa_itens.get(id_item)
+        # Obter objeto associado ao item selecionado
+        item = self._obter_item_selecionado()
         
         if not item:
             return
@@ -453,17 +641,16 @@ class ArvoreAulas(ttk.Frame):
         aulas = []
         
         # Função recursiva para coletar aulas
-        def coletar_aulas(id_node):
-            for id_filho in self.arvore.get_children(id_node):
-                filho = self.mapa_itens.get(id_filho)
-                
-                if isinstance(filho, Aula):
-                    aulas.append(filho)
-                else:
-                    coletar_aulas(id_filho)
+        def coletar_aulas(modulo):
+            aulas.extend(modulo.aulas)
+            for submodulo in modulo.submodulos:
+                coletar_aulas(submodulo)
         
         # Coletar aulas do item selecionado
-        coletar_aulas(id_item)
+        if isinstance(item, Curso):
+            aulas = item.obter_todas_aulas()
+        elif isinstance(item, Modulo):
+            coletar_aulas(item)
         
         # Marcar cada aula
         for aula in aulas:
@@ -475,17 +662,8 @@ class ArvoreAulas(ttk.Frame):
     
     def _abrir_video(self):
         """Abre o vídeo da aula selecionada"""
-        # Obter item selecionado
-        selecionados = self.arvore.selection()
-        
-        if not selecionados:
-            return
-        
-        # Obter o primeiro item selecionado
-        id_item = selecionados[0]
-        
-        # Obter objeto associado ao item
-        item = self.mapa_itens.get(id_item)
+        # Obter objeto associado ao item selecionado
+        item = self._obter_item_selecionado()
         
         if not item or not isinstance(item, Aula):
             return
@@ -501,82 +679,110 @@ class ArvoreAulas(ttk.Frame):
         if not termo or not self.curso_atual:
             return
         
+        # Repetir a pesquisa com o mesmo termo avança para o próximo resultado
+        if termo == self.termo_pesquisa and self.resultados_pesquisa:
+            self._ir_para_resultado(1)
+            return
+        
+        self.termo_pesquisa = termo
+        
         # Destacar itens que correspondem à pesquisa
-        self._limpar_destaque_pesquisa()
-        self._destacar_itens_pesquisa(termo)
+        self._destacar_itens_pesquisa(self.consulta_pesquisa.executar_agora(termo))
+    
+    def _on_digitar_pesquisa(self, event=None):
+        """Agenda a pesquisa enquanto o usuário digita"""
+        termo = self.entry_pesquisa.get().strip()
+        
+        if termo == self.termo_pesquisa or not self.curso_atual:
+            return
+        
+        if not termo:
+            self.consulta_pesquisa.cancelar()
+            self.termo_pesquisa = ""
+            self._destacar_itens_pesquisa([], selecionar=False)
+            self.lbl_resultados.config(text="")
+            return
+        
+        self.consulta_pesquisa.agendar(termo)
+    
+    def _aplicar_resultado_pesquisa(self, termo, aulas):
+        """Aplica o resultado de uma pesquisa feita em segundo plano"""
+        # Ignorar resultados de um texto que já não está no campo
+        if termo != self.entry_pesquisa.get().strip():
+            return
+        
+        self.termo_pesquisa = termo
+        self._destacar_itens_pesquisa(aulas, selecionar=False)
+    
+    def _destacar_itens_pesquisa(self, aulas: List[Aula], selecionar: bool = True):
+        """Destaca as aulas encontradas e, opcionalmente, seleciona a primeira"""
+        self.resultados_pesquisa = aulas
+        self.posicao_resultado = -1
+        
+        if self.modo_lista.get():
+            self.lista.destacar(aulas)
+        else:
+            # Atualizar apenas os itens cujo destaque mudou
+            novos_destaques = {
+                self.aula_para_iid[id(aula)] for aula in aulas
+                if id(aula) in self.aula_para_iid
+            }
+            self._limpar_destaque_pesquisa(self.itens_destacados - novos_destaques)
+            
+            for item_id in novos_destaques - self.itens_destacados:
+                tags = list(self.arvore.item(item_id, "tags"))
+                if "pesquisa" not in tags:
+                    tags.append("pesquisa")
+                    self.arvore.item(item_id, tags=tags)
+                
+                # Expandir pais para mostrar o item
+                self._expandir_pais(item_id)
+            
+            self.itens_destacados = novos_destaques
+        
+        # Selecionar e mostrar o primeiro item encontrado
+        if aulas and selecionar:
+            self._ir_para_resultado(1)
+        else:
+            self.lbl_resultados.config(text=f"0/{len(aulas)}")
     
-    def _limpar_destaque_pesquisa(self):
-        """Remove o destaque de pesquisa de todos os itens"""
-        # Obter todos os itens recursivamente
-        todos_itens = []
-        
-        def coletar_itens(item_id):
-            todos_itens.append(item_id)
-            for filho_id in self.arvore.get_children(item_id):
-                coletar_itens(filho_id)
-        
-        # Coletar itens a partir da raiz
-        for item_id in self.arvore.get_children():
-            coletar_itens(item_id)
-        
-        # Remover tag de destaque de todos os itens
-        for item_id in todos_itens:
+    def _limpar_destaque_pesquisa(self, itens=None):
+        """Remove o destaque de pesquisa dos itens destacados"""
+        if itens is None:
+            itens = self.itens_destacados
+            self.itens_destacados = set()
+            self.resultados_pesquisa = []
+            self.posicao_resultado = -1
+        
+        for item_id in itens:
+            if not self.arvore.exists(item_id):
+                continue
+            
             tags = list(self.arvore.item(item_id, "tags"))
             if "pesquisa" in tags:
                 tags.remove("pesquisa")
                 self.arvore.item(item_id, tags=tags)
     
-    def _destacar_itens_pesquisa(self, termo):
-        """Destaca itens que correspondem ao termo de pesquisa"""
-        termo = termo.lower()
-        
-        # Configurar tag de pesquisa se ainda não estiver configurada
-        try:
-            self.arvore.tag_configure("pesquisa", background=self.arvore_cores["destaque_pesquisa"])
-        except:
-            pass
-        
-        # Função recursiva para verificar e destacar itens
-        def verificar_item(item_id):
-            encontrou = False
-            item = self.mapa_itens.get(item_id)
-            
-            if item:
-                # Verificar se o termo está no título do item
-                if isinstance(item, Aula) and termo in item.titulo.lower():
-                    # Adicionar tag de pesquisa
-                    tags = list(self.arvore.item(item_id, "tags"))
-                    if "pesquisa" not in tags:
-                        tags.append("pesquisa")
-                        self.arvore.item(item_id, tags=tags)
-                    
-                    # Expandir pais para mostrar o item
-                    self._expandir_pais(item_id)
-                    
-                    # Verificar se é o primeiro item encontrado
-                    if not self.primeiro_encontrado:
-                        self.primeiro_encontrado = item_id
-                    
-                    encontrou = True
-            
-            # Verificar filhos recursivamente
-            for filho_id in self.arvore.get_children(item_id):
-                if verificar_item(filho_id):
-                    encontrou = True
-            
-            return encontrou
+    def _ir_para_resultado(self, deslocamento: int):
+        """Seleciona o próximo ou o anterior resultado da pesquisa"""
+        if not self.resultados_pesquisa:
+            return
         
-        # Variável para rastrear o primeiro item encontrado
-        self.primeiro_encontrado = None
+        total = len(self.resultados_pesquisa)
+        self.posicao_resultado = (self.posicao_resultado + deslocamento) % total
+        aula = self.resultados_pesquisa[self.posicao_resultado]
         
-        # Verificar todos os itens começando pela raiz
-        for item_id in self.arvore.get_children():
-            verificar_item(item_id)
+        self.lbl_resultados.config(text=f"{self.posicao_resultado + 1}/{total}")
         
-        # Selecionar e mostrar o primeiro item encontrado
-        if self.primeiro_encontrado:
-            self.arvore.see(self.primeiro_encontrado)
-            self.arvore.selection_set(self.primeiro_encontrado)
+        if self.modo_lista.get():
+            self.lista.selecionar(aula)
+            return
+        
+        item_id = self.aula_para_iid.get(id(aula))
+        if item_id:
+            self._expandir_pais(item_id)
+            self.arvore.see(item_id)
+            self.arvore.selection_set(item_id)
             self._on_selecionar_item(None)  # Simular seleção do item
     
     def _expandir_pais(self, item_id):
@@ -585,4 +791,4 @@ class ArvoreAulas(ttk.Frame):
         
         while pai_id:
             self.arvore.item(pai_id, open=True)
-            pai_id = self.arvore.parent(pai_id) 
\ No newline at end of file
+            pai_id = self.arvore.parent(pai_id)
@@ -1,6 +1,11 @@
 import tkinter as tk
 from tkinter import ttk
 import tkinter.font as tkfont
+import collections
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
 
 class BarraProgresso(ttk.Frame):
     """Componente de barra de progresso personalizada com percentual"""
@@ -184,4 +189,198 @@ class Separador(ttk.Frame):
         else:
             # Separador simples
             self.separador = ttk.Separator(self.frame_separador, orient=tk.HORIZONTAL)
-            self.separador.pack(fill=tk.X, expand=True, pady=5)
\ No newline at end of file
+            self.separador.pack(fill=tk.X, expand=True, pady=5)
+
+
+class ConsultaAdiada:
+    """Consulta com atraso (debounce) executada fora da thread do Tk
+
+    Cada chamada a agendar() reinicia o temporizador. Quando ele expira, a
+    função de busca roda em uma thread de trabalho e o resultado volta para
+    a thread do Tk por uma fila verificada com after(). Resultados de
+    consultas antigas são descartados pelo contador de geração.
+    """
+    
+    def __init__(self, widget, funcao_busca: Callable[[str], Any],
+                 on_resultado: Callable[[str, Any], None], atraso_ms: int = 250,
+                 intervalo_verificacao_ms: int = 20):
+        """Inicializa a consulta adiada"""
+        self.widget = widget
+        self.funcao_busca = funcao_busca
+        self.on_resultado = on_resultado
+        self.atraso_ms = atraso_ms
+        self.intervalo_verificacao_ms = intervalo_verificacao_ms
+        
+        self.geracao = 0
+        self._id_temporizador = None
+        self._id_verificacao = None
+        self._resultados = queue.Queue()
+        self._pendentes = 0
+    
+    def agendar(self, termo: str):
+        """Agenda uma consulta, cancelando a que ainda estiver aguardando"""
+        if self._id_temporizador:
+            self.widget.after_cancel(self._id_temporizador)
+        
+        self._id_temporizador = self.widget.after(self.atraso_ms, lambda: self._disparar(termo))
+    
+    def executar_agora(self, termo: str) -> Any:
+        """Executa a consulta de forma síncrona, descartando as pendentes"""
+        self.cancelar()
+        return self.funcao_busca(termo)
+    
+    def cancelar(self):
+        """Cancela o temporizador e invalida as consultas em andamento"""
+        if self._id_temporizador:
+            self.widget.after_cancel(self._id_temporizador)
+            self._id_temporizador = None
+        
+        self.geracao += 1
+    
+    def _disparar(self, termo: str):
+        """Inicia a consulta em uma thread de trabalho"""
+        self._id_temporizador = None
+        self.geracao += 1
+        geracao = self.geracao
+        
+        def trabalhar():
+            try:
+                self._resultados.put((geracao, termo, self.funcao_busca(termo)))
+            except Exception as e:
+                # Registrar o erro e descartar o resultado (geração inválida)
+                print(f"Erro na consulta: {e}")
+                self._resultados.put((-1, termo, None))
+        
+        self._pendentes += 1
+        threading.Thread(target=trabalhar, daemon=True).start()
+        
+        if not self._id_verificacao:
+            self._id_verificacao = self.widget.after(self.intervalo_verificacao_ms, self._verificar)
+    
+    def _verificar(self):
+        """Aplica somente o resultado mais recente ainda válido"""
+        self._id_verificacao = None
+        ultimo: Optional[tuple] = None
+        
+        while True:
+            try:
+                geracao, termo, resultado = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            
+            self._pendentes -= 1
+            if geracao == self.geracao:
+                ultimo = (termo, resultado)
+        
+        if ultimo is not None:
+            self.on_resultado(*ultimo)
+        
+        if self._pendentes > 0:
+            self._id_verificacao = self.widget.after(self.intervalo_verificacao_ms, self._verificar)
+
+
+class PonteInterface:
+    """Ponte entre as threads de trabalho e a thread do Tk, com atualizações agrupadas
+
+    As threads de trabalho (carregamento de cursos, loop do Telegram) não
+    agendam nada no Tk. Elas gravam o estado em publicar(), que guarda só o
+    valor mais recente de cada canal, ou, para eventos que não podem ser
+    descartados (como o resultado de uma tarefa), em enfileirar(). Um único
+    after() periódico entrega a cada quadro o último valor de cada canal à
+    função registrada e, em seguida, os eventos na ordem em que chegaram.
+    Verificações feitas na própria thread do Tk (como a leitura de uma fila)
+    são executadas no mesmo quadro com acompanhar().
+
+    Há uma ponte por janela principal, obtida com PonteInterface.obter().
+    """
+
+    # Intervalo entre os quadros, em milissegundos (20 por segundo)
+    INTERVALO_MS = 50
+
+    def __init__(self, widget, intervalo_ms: int = INTERVALO_MS):
+        """Inicializa a ponte e agenda o primeiro quadro; deve ser criada na thread do Tk"""
+        self.widget = widget
+        self.intervalo_ms = intervalo_ms
+
+        self._trava = threading.Lock()
+        self._estados: Dict[Any, Any] = {}
+        self._eventos = collections.deque()
+        self._renderizadores: Dict[Any, Callable[[Any], None]] = {}
+        self._acompanhamentos = []
+
+        self._id_quadro = self.widget.after(self.intervalo_ms, self._quadro)
+
+    @classmethod
+    def obter(cls, widget) -> "PonteInterface":
+        """Retorna a ponte da janela principal do widget, criando-a na primeira chamada"""
+        raiz = widget._root()
+        ponte = getattr(raiz, "_ponte_interface", None)
+        if ponte is None:
+            ponte = cls(raiz)
+            raiz._ponte_interface = ponte
+        return ponte
+
+    def registrar(self, canal: Any, funcao: Callable[[Any], None]):
+        """Define a função que exibe o estado de um canal (chamada na thread do Tk)"""
+        self._renderizadores[canal] = funcao
+
+    def publicar(self, canal: Any, valor: Any):
+        """Grava o estado mais recente de um canal; pode ser chamado de qualquer thread"""
+        with self._trava:
+            self._estados[canal] = valor
+
+    def enfileirar(self, funcao: Callable[..., Any], *args):
+        """Agenda uma chamada para o próximo quadro, sem descartá-la; pode ser chamado de qualquer thread"""
+        with self._trava:
+            self._eventos.append((funcao, args))
+
+    def acompanhar(self, funcao: Callable[[], Optional[bool]], intervalo_ms: int = 0):
+        """Executa funcao nos quadros, no máximo a cada intervalo_ms, até que ela retorne False
+
+        Um erro em uma execução não encerra o acompanhamento.
+        """
+        self._acompanhamentos.append([funcao, intervalo_ms / 1000, 0.0])
+
+    def encerrar(self):
+        """Interrompe os quadros"""
+        if self._id_quadro:
+            self.widget.after_cancel(self._id_quadro)
+            self._id_quadro = None
+
+    def _quadro(self):
+        """Entrega os estados e eventos acumulados e executa os acompanhamentos"""
+        with self._trava:
+            estados, self._estados = self._estados, {}
+            eventos, self._eventos = self._eventos, collections.deque()
+
+        # Os estados vêm antes dos eventos: um resultado final prevalece sobre o parcial
+        for canal, valor in estados.items():
+            funcao = self._renderizadores.get(canal)
+            if funcao:
+                self._chamar(funcao, valor)
+
+        for funcao, args in eventos:
+            self._chamar(funcao, *args)
+
+        agora = time.monotonic()
+        for acompanhamento in list(self._acompanhamentos):
+            funcao, intervalo, ultima = acompanhamento
+            if agora - ultima < intervalo:
+                continue
+            acompanhamento[2] = agora
+            if self._chamar(funcao) is False:
+                self._acompanhamentos.remove(acompanhamento)
+
+        self._id_quadro = self.widget.after(self.intervalo_ms, self._quadro)
+
+    def _chamar(self, funcao: Callable[..., Any], *args) -> Any:
+        """Chama uma função da interface, sem que um erro interrompa os quadros seguintes
+
+        Um erro é registrado e resulta em None, para que um acompanhamento
+        só seja encerrado quando a própria função retornar False.
+        """
+        try:
+            return funcao(*args)
+        except Exception as e:
+            print(f"Erro ao atualizar a interface: {e}")
+            return None
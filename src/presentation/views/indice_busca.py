@@ -0,0 +1,39 @@
+import unicodedata
+from typing import Any, Iterable, List, Tuple
+
+def normalizar_texto(texto: str) -> str:
+    """Normaliza um texto para comparação: sem acentos e sem diferença de caixa"""
+    if not texto:
+        return ""
+
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return sem_acentos.casefold()
+
+class IndiceBusca:
+    """Índice de títulos pré-normalizados para pesquisa por substring"""
+
+    def __init__(self, itens: Iterable[Tuple[Any, str]] = ()):
+        """Inicializa o índice com pares (chave, texto)"""
+        self.entradas: List[Tuple[str, Any]] = []
+        self.adicionar(itens)
+
+    def adicionar(self, itens: Iterable[Tuple[Any, str]]):
+        """Adiciona pares (chave, texto) ao índice, preservando a ordem"""
+        self.entradas.extend((normalizar_texto(texto), chave) for chave, texto in itens)
+
+    def limpar(self):
+        """Remove todas as entradas do índice"""
+        self.entradas = []
+
+    def buscar(self, termo: str) -> List[Any]:
+        """Retorna as chaves cujo texto contém o termo, na ordem do índice"""
+        termo = normalizar_texto(termo.strip())
+
+        if not termo:
+            return [chave for _, chave in self.entradas]
+
+        return [chave for texto, chave in self.entradas if termo in texto]
+
+    def __len__(self) -> int:
+        return len(self.entradas)
@@ -0,0 +1,453 @@
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+from typing import List, Tuple, Any, Optional, Set
+
+from src.domain.entities import Curso, Modulo, Aula
+
+class ListaVirtualAulas(ttk.Frame):
+    """Lista virtualizada de módulos e aulas para cursos muito grandes
+
+    Apenas as linhas visíveis (mais uma pequena margem) são desenhadas em um
+    Canvas, de modo que o consumo de memória do widget não depende do tamanho
+    do curso. As linhas são mantidas em um índice achatado (nível, objeto)
+    construído a partir da estrutura do curso.
+    """
+
+    ALTURA_LINHA = 22
+    INDENTACAO = 18
+    MARGEM_LINHAS = 3  # Linhas extras desenhadas acima e abaixo da área visível
+    LARGURA_PROGRESSO = 100
+
+    def __init__(self, master=None, **kwargs):
+        """Inicializa a lista virtualizada"""
+        # Extrair callbacks antes de inicializar o Frame
+        self.on_selecionar_item = kwargs.pop('on_selecionar_item', None)
+        self.on_ativar_item = kwargs.pop('on_ativar_item', None)
+        self.on_abrir_item = kwargs.pop('on_abrir_item', None)
+        self.on_menu_contexto = kwargs.pop('on_menu_contexto', None)
+        self.cores = kwargs.pop('cores', {})
+
+        super().__init__(master, **kwargs)
+
+        # Canvas onde as linhas são desenhadas
+        self.canvas = tk.Canvas(
+            self,
+            background="white",
+            highlightthickness=0,
+            takefocus=True
+        )
+
+        self.scrollbar_y = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.fonte = tkfont.nametofont("TkDefaultFont")
+
+        # Estado
+        self.curso = None
+        self.linhas: List[Tuple[int, Any]] = []  # Índice achatado (nível, objeto)
+        self.posicoes = {}  # id(objeto) -> índice em self.linhas
+        self.modulos_abertos: Set[int] = set()
+        self.destacados: Set[int] = set()
+        self.item_selecionado = None
+        self.primeira_linha = 0
+        self._cache_progresso = {}
+
+        # Conjunto fixo de itens do Canvas reutilizados a cada desenho
+        self._pool = []
+
+        # Vincular eventos
+        self.canvas.bind("<Configure>", self._on_redimensionar)
+        self.canvas.bind("<Button-1>", self._on_clique)
+        self.canvas.bind("<Double-1>", self._on_duplo_clique)
+        self.canvas.bind("<Button-3>", self._on_clique_direito)
+        self.canvas.bind("<MouseWheel>", self._on_roda_mouse)
+        self.canvas.bind("<Button-4>", lambda e: self.rolar(-3))
+        self.canvas.bind("<Button-5>", lambda e: self.rolar(3))
+        self.canvas.bind("<Up>", lambda e: self._mover_selecao(-1))
+        self.canvas.bind("<Down>", lambda e: self._mover_selecao(1))
+        self.canvas.bind("<Prior>", lambda e: self._mover_selecao(-self._linhas_visiveis()))
+        self.canvas.bind("<Next>", lambda e: self._mover_selecao(self._linhas_visiveis()))
+        self.canvas.bind("<Home>", lambda e: self._selecionar_indice(0))
+        self.canvas.bind("<End>", lambda e: self._selecionar_indice(len(self.linhas) - 1))
+        self.canvas.bind("<Left>", self._on_tecla_esquerda)
+        self.canvas.bind("<Right>", self._on_tecla_direita)
+        self.canvas.bind("<Return>", self._on_tecla_enter)
+        self.canvas.bind("<space>", self._on_tecla_espaco)
+
+    def carregar_curso(self, curso: Optional[Curso]):
+        """Carrega um curso na lista"""
+        self.curso = curso
+        self.modulos_abertos = set()
+        self.destacados = set()
+        self.item_selecionado = None
+        self.primeira_linha = 0
+
+        if curso:
+            # O nó do curso começa aberto, como na árvore
+            self.modulos_abertos.add(id(curso))
+
+        self._reconstruir_linhas()
+
+    def recarregar(self):
+        """Reconstrói as linhas após aulas ou módulos serem acrescentados ao curso"""
+        self._reconstruir_linhas()
+
+    def atualizar(self):
+        """Redesenha a lista após mudanças no estado das aulas"""
+        self._cache_progresso = {}
+        self._desenhar()
+
+    def destacar(self, objetos):
+        """Define os objetos destacados pela pesquisa"""
+        self.destacados = {id(objeto) for objeto in objetos}
+        self._desenhar()
+
+    def expandir_ate(self, objeto) -> bool:
+        """Abre os módulos que contêm o objeto para torná-lo visível"""
+        caminho = self._caminho_ate(objeto)
+
+        if caminho is None:
+            return False
+
+        alterou = False
+        for ancestral in caminho:
+            if id(ancestral) not in self.modulos_abertos:
+                self.modulos_abertos.add(id(ancestral))
+                alterou = True
+
+        if alterou:
+            self._reconstruir_linhas()
+
+        return True
+
+    def selecionar(self, objeto):
+        """Seleciona um objeto e rola a lista até ele"""
+        if id(objeto) not in self.posicoes and not self.expandir_ate(objeto):
+            return
+
+        self._selecionar_indice(self.posicoes[id(objeto)])
+
+    def ver(self, objeto):
+        """Rola a lista até que o objeto esteja visível"""
+        indice = self.posicoes.get(id(objeto))
+
+        if indice is None:
+            return
+
+        visiveis = self._linhas_visiveis()
+        if indice < self.primeira_linha:
+            self.primeira_linha = indice
+        elif indice >= self.primeira_linha + visiveis:
+            self.primeira_linha = indice - visiveis + 1
+
+        self._limitar_rolagem()
+        self._desenhar()
+
+    def yview(self, *args):
+        """Trata comandos da barra de rolagem"""
+        if not args:
+            return
+
+        if args[0] == "moveto":
+            self.primeira_linha = int(float(args[1]) * len(self.linhas))
+        elif args[0] == "scroll":
+            passos = int(args[1])
+            if args[2] == "pages":
+                passos *= self._linhas_visiveis()
+            self.primeira_linha += passos
+
+        self._limitar_rolagem()
+        self._desenhar()
+
+    def rolar(self, linhas: int):
+        """Rola a lista pelo número de linhas informado"""
+        self.primeira_linha += linhas
+        self._limitar_rolagem()
+        self._desenhar()
+
+    def _reconstruir_linhas(self):
+        """Reconstrói o índice achatado de linhas visíveis na hierarquia"""
+        self.linhas = []
+        self.posicoes = {}
+
+        if self.curso:
+            self._adicionar_linha(0, self.curso)
+
+        self._cache_progresso = {}
+        self._limitar_rolagem()
+        self._desenhar()
+
+    def _adicionar_linha(self, nivel: int, objeto):
+        """Adiciona um objeto e, se aberto, seus filhos ao índice"""
+        self.posicoes[id(objeto)] = len(self.linhas)
+        self.linhas.append((nivel, objeto))
+
+        if isinstance(objeto, Aula) or id(objeto) not in self.modulos_abertos:
+            return
+
+        for filho in self._filhos(objeto):
+            self._adicionar_linha(nivel + 1, filho)
+
+    def _filhos(self, objeto) -> list:
+        """Retorna os filhos de um curso ou módulo, na mesma ordem da árvore"""
+        if isinstance(objeto, Curso):
+            return objeto.modulos
+        if isinstance(objeto, Modulo):
+            return list(objeto.aulas) + list(objeto.submodulos)
+        return []
+
+    def _caminho_ate(self, objeto) -> Optional[list]:
+        """Retorna a lista de ancestrais (curso e módulos) de um objeto"""
+        if not self.curso:
+            return None
+
+        if objeto is self.curso:
+            return []
+
+        pilha = [(self.curso, [self.curso])]
+        while pilha:
+            atual, caminho = pilha.pop()
+            for filho in self._filhos(atual):
+                if filho is objeto:
+                    return caminho
+                if isinstance(filho, Modulo):
+                    pilha.append((filho, caminho + [filho]))
+
+        return None
+
+    def _linhas_visiveis(self) -> int:
+        """Retorna quantas linhas cabem na área visível"""
+        altura = max(self.canvas.winfo_height(), self.ALTURA_LINHA)
+        return max(altura // self.ALTURA_LINHA, 1)
+
+    def _limitar_rolagem(self):
+        """Mantém a primeira linha dentro dos limites do índice"""
+        maximo = max(len(self.linhas) - self._linhas_visiveis(), 0)
+        self.primeira_linha = max(0, min(self.primeira_linha, maximo))
+
+    def _garantir_pool(self, quantidade: int):
+        """Garante que existam itens suficientes no Canvas para as linhas desenhadas"""
+        while len(self._pool) < quantidade:
+            fundo = self.canvas.create_rectangle(0, 0, 0, 0, width=0)
+            texto = self.canvas.create_text(0, 0, anchor=tk.W, font=self.fonte)
+            progresso = self.canvas.create_text(0, 0, anchor=tk.CENTER, font=self.fonte)
+            self._pool.append((fundo, texto, progresso))
+
+        # Remover itens que sobraram após uma redução da janela
+        for itens in self._pool[quantidade:]:
+            self.canvas.delete(*itens)
+        del self._pool[quantidade:]
+
+    def _desenhar(self):
+        """Desenha somente as linhas da área visível mais a margem"""
+        visiveis = self._linhas_visiveis()
+        quantidade = visiveis + 2 * self.MARGEM_LINHAS
+        self._garantir_pool(quantidade)
+
+        largura = max(self.canvas.winfo_width(), 1)
+        coluna_progresso = largura - self.LARGURA_PROGRESSO / 2
+        inicio = self.primeira_linha - self.MARGEM_LINHAS
+
+        for posicao, (fundo, texto, progresso) in enumerate(self._pool):
+            indice = inicio + posicao
+
+            if indice < 0 or indice >= len(self.linhas):
+                self.canvas.itemconfigure(fundo, state=tk.HIDDEN)
+                self.canvas.itemconfigure(texto, state=tk.HIDDEN)
+                self.canvas.itemconfigure(progresso, state=tk.HIDDEN)
+                continue
+
+            nivel, objeto = self.linhas[indice]
+            y = (indice - self.primeira_linha) * self.ALTURA_LINHA
+            cor_fundo, cor_texto = self._cores_linha(objeto)
+
+            self.canvas.coords(fundo, 0, y, largura, y + self.ALTURA_LINHA)
+            self.canvas.itemconfigure(fundo, fill=cor_fundo, state=tk.NORMAL)
+
+            self.canvas.coords(texto, 4 + nivel * self.INDENTACAO, y + self.ALTURA_LINHA / 2)
+            self.canvas.itemconfigure(
+                texto, text=self._texto_linha(objeto), fill=cor_texto, state=tk.NORMAL
+            )
+
+            self.canvas.coords(progresso, coluna_progresso, y + self.ALTURA_LINHA / 2)
+            self.canvas.itemconfigure(
+                progresso, text=self._progresso_linha(objeto), fill=cor_texto, state=tk.NORMAL
+            )
+
+        # Atualizar barra de rolagem
+        total = len(self.linhas)
+        if total:
+            self.scrollbar_y.set(
+                self.primeira_linha / total,
+                min((self.primeira_linha + visiveis) / total, 1.0)
+            )
+        else:
+            self.scrollbar_y.set(0.0, 1.0)
+
+    def _texto_linha(self, objeto) -> str:
+        """Retorna o texto exibido para um objeto"""
+        if isinstance(objeto, Aula):
+            return objeto.titulo_formatado
+
+        marcador = "▼" if id(objeto) in self.modulos_abertos else "▶"
+        return f"{marcador} {objeto.nome}"
+
+    def _progresso_linha(self, objeto) -> str:
+        """Retorna o texto da coluna de progresso, com cache por objeto"""
+        if isinstance(objeto, Aula):
+            return "Concluída" if objeto.concluida else "Pendente"
+
+        chave = id(objeto)
+        if chave not in self._cache_progresso:
+            if isinstance(objeto, Curso):
+                self._cache_progresso[chave] = f"{objeto.progresso}%"
+            else:
+                progresso = "0%"
+                if objeto.total_aulas > 0:
+                    porcentagem = int((objeto.aulas_concluidas / objeto.total_aulas) * 100)
+                    progresso = f"{porcentagem}%"
+                self._cache_progresso[chave] = progresso
+
+        return self._cache_progresso[chave]
+
+    def _cores_linha(self, objeto) -> Tuple[str, str]:
+        """Retorna as cores de fundo e de texto de uma linha"""
+        if objeto is self.item_selecionado:
+            return "#0078D7", "white"
+
+        if id(objeto) in self.destacados:
+            return self.cores.get("destaque_pesquisa", "#FFFFAA"), "black"
+
+        if isinstance(objeto, Aula) and objeto.concluida:
+            return self.cores.get("aula_concluida", "#E0F2E0"), "black"
+
+        if isinstance(objeto, Modulo) and objeto.esta_completo:
+            return self.cores.get("modulo_completo", "#E0E0FF"), "black"
+
+        return "white", "black"
+
+    def _indice_em(self, y: int) -> Optional[int]:
+        """Retorna o índice da linha na coordenada y do Canvas"""
+        indice = self.primeira_linha + int(y // self.ALTURA_LINHA)
+
+        if 0 <= indice < len(self.linhas):
+            return indice
+        return None
+
+    def _selecionar_indice(self, indice: int):
+        """Seleciona a linha de um índice e garante sua visibilidade"""
+        if not self.linhas:
+            return
+
+        indice = max(0, min(indice, len(self.linhas) - 1))
+        self.item_selecionado = self.linhas[indice][1]
+        self.ver(self.item_selecionado)
+
+        if self.on_selecionar_item:
+            self.on_selecionar_item(self.item_selecionado)
+
+    def _mover_selecao(self, deslocamento: int):
+        """Move a seleção pelo número de linhas informado"""
+        atual = self.posicoes.get(id(self.item_selecionado), self.primeira_linha - deslocamento)
+        self._selecionar_indice(atual + deslocamento)
+        return "break"
+
+    def _alternar_modulo(self, objeto):
+        """Abre ou fecha um módulo"""
+        if isinstance(objeto, Aula):
+            return
+
+        if id(objeto) in self.modulos_abertos:
+            self.modulos_abertos.discard(id(objeto))
+        else:
+            self.modulos_abertos.add(id(objeto))
+
+        self._reconstruir_linhas()
+
+    def _on_redimensionar(self, event):
+        """Redesenha a lista quando o Canvas muda de tamanho"""
+        self._limitar_rolagem()
+        self._desenhar()
+
+    def _on_clique(self, event):
+        """Seleciona a linha clicada"""
+        self.canvas.focus_set()
+        indice = self._indice_em(event.y)
+
+        if indice is not None:
+            self._selecionar_indice(indice)
+
+    def _on_duplo_clique(self, event):
+        """Ativa a linha clicada"""
+        indice = self._indice_em(event.y)
+
+        if indice is None:
+            return
+
+        objeto = self.linhas[indice][1]
+        if isinstance(objeto, Aula):
+            if self.on_ativar_item:
+                self.on_ativar_item(objeto)
+        else:
+            self._alternar_modulo(objeto)
+
+    def _on_clique_direito(self, event):
+        """Seleciona a linha clicada e exibe o menu de contexto"""
+        indice = self._indice_em(event.y)
+
+        if indice is None:
+            return
+
+        self._selecionar_indice(indice)
+
+        if self.on_menu_contexto:
+            self.on_menu_contexto(event)
+
+    def _on_roda_mouse(self, event):
+        """Trata a roda do mouse (Windows e macOS)"""
+        self.rolar(int(-1 * (event.delta / 120)) * 3)
+
+    def _on_tecla_esquerda(self, event):
+        """Fecha o módulo selecionado ou sobe para o módulo pai"""
+        objeto = self.item_selecionado
+
+        if objeto is None:
+            return "break"
+
+        if not isinstance(objeto, Aula) and id(objeto) in self.modulos_abertos:
+            self._alternar_modulo(objeto)
+        else:
+            caminho = self._caminho_ate(objeto)
+            if caminho:
+                self.selecionar(caminho[-1])
+        return "break"
+
+    def _on_tecla_direita(self, event):
+        """Abre o módulo selecionado"""
+        objeto = self.item_selecionado
+
+        if objeto is not None and not isinstance(objeto, Aula) and id(objeto) not in self.modulos_abertos:
+            self._alternar_modulo(objeto)
+        return "break"
+
+    def _on_tecla_enter(self, event):
+        """Abre/fecha módulos ou abre o vídeo da aula selecionada"""
+        objeto = self.item_selecionado
+
+        if objeto is None:
+            return "break"
+
+        if isinstance(objeto, Aula):
+            if self.on_abrir_item:
+                self.on_abrir_item(objeto)
+        else:
+            self._alternar_modulo(objeto)
+        return "break"
+
+    def _on_tecla_espaco(self, event):
+        """Marca/desmarca a aula selecionada"""
+        if isinstance(self.item_selecionado, Aula) and self.on_ativar_item:
+            self.on_ativar_item(self.item_selecionado)
+        return "break"
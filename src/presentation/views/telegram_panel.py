@@ -1,9 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import asyncio
 import threading
 from typing import Callable, Dict, Any, List, Optional
 
+from .componentes_ui import ConsultaAdiada, PonteInterface
+from .indice_busca import IndiceBusca
+
 class TelegramPanel(ttk.Frame):
     """Painel para gerenciar a integração com o Telegram e baixar vídeos"""
     
@@ -12,7 +14,20 @@ class TelegramPanel(ttk.Frame):
         # Extrair callbacks
         self.on_configure_api = kwargs.pop('on_configure_api', None)
         self.on_list_channels = kwargs.pop('on_list_channels', None)
-        self.on_download_channel = kwargs.pop('on_download_channel', None)
+        self.on_load_cached_channels = kwargs.pop('on_load_cached_channels', None)
+        
+        # Fila de downloads
+        self.on_enqueue_download = kwargs.pop('on_enqueue_download', None)
+        self.on_list_queue = kwargs.pop('on_list_queue', None)
+        self.on_remove_queue_item = kwargs.pop('on_remove_queue_item', None)
+        self.on_clear_queue = kwargs.pop('on_clear_queue', None)
+        self.on_dedup_report = kwargs.pop('on_dedup_report', None)
+        
+        # Curso virtual: aulas baixadas apenas quando abertas
+        self.on_open_virtual_course = kwargs.pop('on_open_virtual_course', None)
+        
+        # Executa corrotinas no loop do Telegram: run_async(coro_func, *args, callback=...)
+        self.run_async = kwargs.pop('run_async', None)
         
         # Extrair credenciais, se fornecidas
         self.api_id = kwargs.pop('api_id', None)
@@ -23,9 +38,29 @@ class TelegramPanel(ttk.Frame):
         
         # Variáveis
         self.channels = []
+        self.indice_canais = IndiceBusca()
+        self.canais_exibidos = []  # Índices (em self.channels) das linhas exibidas
+        self.iids_canais = []  # Linha da árvore de cada canal, inserida uma única vez
+        self.posicao_canais = {}  # ID do canal -> índice em self.channels
+        self.valores_fila = {}  # iid da fila -> valores exibidos
+        self.finalizados_fila = None  # Itens finalizados no último relatório de economia
         self.selected_channel_id = None
         self.filter_text = tk.StringVar()
-        self.filter_text.trace_add("write", self._filtrar_canais)
+        self.filter_text.trace_add("write", self._on_filtro_alterado)
+        
+        # Filtro executado fora da thread do Tk enquanto o usuário digita
+        self.consulta_filtro = ConsultaAdiada(
+            self,
+            lambda termo: self.indice_canais.buscar(termo),
+            self._filtrar_canais,
+            atraso_ms=150
+        )
+        
+        # Atualizações vindas das threads de trabalho, aplicadas nos quadros da ponte
+        self.ponte = PonteInterface.obter(self)
+        self.ponte.registrar(
+            self.CANAL_CANAIS_PARCIAIS, lambda channels: self._aplicar_canais(channels, completo=False)
+        )
         
         # Configurar interface
         self._configurar_interface()
@@ -39,6 +74,10 @@ class TelegramPanel(ttk.Frame):
         # Se as credenciais já estão configuradas, habilitar a aba de download
         if self.api_id and self.api_hash:
             self.notebook.tab(1, state="normal")
+            self._carregar_canais_do_cache()
+        
+        # Acompanhar a fila de downloads
+        self.ponte.acompanhar(self._atualizar_fila, self.INTERVALO_FILA_MS)
     
     def _configurar_interface(self):
         """Configura a interface do painel"""
@@ -73,7 +112,7 @@ class TelegramPanel(ttk.Frame):
         self._configurar_painel_download()
         
         # Desabilitar aba de download inicialmente se não tiver credenciais ou callbacks
-        if not self.on_list_channels or not self.on_download_channel:
+        if not self.on_list_channels or not self.on_enqueue_download:
             self.notebook.tab(1, state="disabled")
             
         # Solicitar uma altura mínima para a janela principal 
@@ -174,7 +213,8 @@ class TelegramPanel(ttk.Frame):
         # Instruções
         lbl_info = ttk.Label(
             frame_canais, 
-            text="Selecione um canal na lista e clique em 'Baixar Vídeos' para fazer o download de todos os vídeos desse canal.\n"
+            text="Selecione um canal na lista e clique em 'Adicionar Canal à Fila' para baixar todos os vídeos desse canal.\n"
+                 "A fila continua de onde parou na próxima vez que o aplicativo for aberto.\n"
                  "Os vídeos serão salvos na pasta 'Downloads/TelegramVideos' em seu diretório de usuário.\n\n"
                  "Para atualizar a lista de canais, clique em 'Atualizar Lista de Canais'.",
             wraplength=600,
@@ -263,13 +303,53 @@ class TelegramPanel(ttk.Frame):
         # Botão para download
         self.btn_download = ttk.Button(
             frame_download, 
-            text="Baixar Vídeos do Canal Selecionado",
+            text="Adicionar Canal à Fila",
             command=self._iniciar_download,
             state="disabled",
             width=30
         )
         self.btn_download.pack(side=tk.TOP, pady=10)
         
+        # Curso virtual, sem baixar o canal inteiro
+        self.btn_curso_virtual = ttk.Button(
+            frame_download,
+            text="Abrir como Curso (sob demanda)",
+            command=self._abrir_curso_virtual,
+            state="disabled",
+            width=30
+        )
+        self.btn_curso_virtual.pack(side=tk.TOP, pady=(0, 10))
+        
+        # Prioridade e download de uma mensagem avulsa do canal selecionado
+        frame_opcoes = ttk.Frame(frame_download)
+        frame_opcoes.pack(side=tk.TOP, pady=(0, 10))
+        
+        ttk.Label(frame_opcoes, text="Prioridade:").pack(side=tk.LEFT, padx=(0, 5))
+        self.prioridade = tk.IntVar(value=0)
+        ttk.Spinbox(
+            frame_opcoes, from_=-10, to=10, textvariable=self.prioridade, width=5
+        ).pack(side=tk.LEFT, padx=(0, 15))
+        
+        ttk.Label(frame_opcoes, text="Mensagem(ns):").pack(side=tk.LEFT, padx=(0, 5))
+        self.entry_mensagem = ttk.Entry(frame_opcoes, width=12)
+        self.entry_mensagem.pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.btn_mensagem = ttk.Button(
+            frame_opcoes,
+            text="Adicionar Mensagem",
+            command=self._enfileirar_mensagem,
+            state="disabled"
+        )
+        self.btn_mensagem.pack(side=tk.LEFT)
+        
+        # Por padrão só são lidas as mensagens novas desde a última sincronização
+        self.reconciliar = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            frame_download,
+            text="Reconciliação completa (percorrer todo o histórico do canal)",
+            variable=self.reconciliar
+        ).pack(side=tk.TOP, pady=(0, 10))
+        
         # Frame para progresso
         frame_progresso = ttk.Frame(frame_download)
         frame_progresso.pack(fill=tk.X, expand=True, pady=10)
@@ -291,8 +371,12 @@ class TelegramPanel(ttk.Frame):
         self.progresso.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
         # Label de progresso - mostra informações detalhadas sobre o progresso do download
+        self.lbl_fila = ttk.Label(frame_download, text="", wraplength=700)
+        self.lbl_fila.pack(side=tk.TOP, padx=5, pady=(10, 0), fill=tk.X)
+        
+        # Mensagens das ações do painel (erros, curso virtual), que o resumo da fila não sobrescreve
         self.lbl_progresso = ttk.Label(frame_download, text="", wraplength=700)
-        self.lbl_progresso.pack(side=tk.TOP, padx=5, pady=10, fill=tk.X)
+        self.lbl_progresso.pack(side=tk.TOP, padx=5, pady=(0, 10), fill=tk.X)
         
         # Explicação do rótulo de progresso
         ttk.Label(
@@ -303,54 +387,88 @@ class TelegramPanel(ttk.Frame):
             font=("", 8),
             foreground="#555555"
         ).pack(fill=tk.X, pady=(0, 5))
+        
+        # Fila de downloads
+        frame_fila = ttk.LabelFrame(content_frame, text="Fila de Downloads", padding="10")
+        frame_fila.pack(fill=tk.BOTH, expand=True, pady=10, padx=5)
+        
+        frame_lista_fila = ttk.Frame(frame_fila)
+        frame_lista_fila.pack(fill=tk.BOTH, expand=True)
+        
+        colunas_fila = ("item", "prioridade", "estado", "progresso", "velocidade", "restante")
+        self.tree_fila = ttk.Treeview(
+            frame_lista_fila,
+            columns=colunas_fila,
+            show="headings",
+            selectmode="browse",
+            height=6
+        )
+        
+        self.tree_fila.heading("item", text="Item")
+        self.tree_fila.heading("prioridade", text="Prioridade")
+        self.tree_fila.heading("estado", text="Estado")
+        self.tree_fila.heading("progresso", text="Progresso")
+        self.tree_fila.heading("velocidade", text="Velocidade")
+        self.tree_fila.heading("restante", text="Restante")
+        
+        self.tree_fila.column("item", width=260)
+        self.tree_fila.column("prioridade", width=80, anchor=tk.CENTER)
+        self.tree_fila.column("estado", width=100, anchor=tk.CENTER)
+        self.tree_fila.column("progresso", width=180, anchor=tk.CENTER)
+        self.tree_fila.column("velocidade", width=100, anchor=tk.CENTER)
+        self.tree_fila.column("restante", width=80, anchor=tk.CENTER)
+        
+        scrollbar_fila = ttk.Scrollbar(frame_lista_fila, orient="vertical", command=self.tree_fila.yview)
+        self.tree_fila.configure(yscrollcommand=scrollbar_fila.set)
+        
+        self.tree_fila.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar_fila.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        frame_acoes_fila = ttk.Frame(frame_fila)
+        frame_acoes_fila.pack(fill=tk.X, pady=(10, 0))
+        
+        ttk.Button(
+            frame_acoes_fila,
+            text="Remover da Fila",
+            command=self._remover_item_fila
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(
+            frame_acoes_fila,
+            text="Limpar Concluídos",
+            command=self._limpar_fila
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # Economia com arquivos repetidos entre canais
+        self.lbl_economia = ttk.Label(frame_acoes_fila, text="")
+        self.lbl_economia.pack(side=tk.RIGHT, padx=5)
     
-    def _filtrar_canais(self, *args):
-        """Filtra a lista de canais com base no texto digitado"""
+    def _on_filtro_alterado(self, *args):
+        """Agenda a filtragem da lista de canais"""
         if not self.channels:
             return
-            
-        # Obter texto do filtro (converter para minúsculo para comparação insensível a caso)
-        filtro = self.filter_text.get().lower()
         
-        # Limpar lista atual
-        for item in self.tree_canais.get_children():
-            self.tree_canais.delete(item)
-            
-        # Se não houver filtro, mostrar todos os canais
-        if not filtro:
-            for channel in self.channels:
-                self.tree_canais.insert(
-                    "", "end",
-                    values=(
-                        channel['id'],
-                        channel['title'],
-                        channel['type'],
-                        channel['members_count']
-                    )
-                )
+        self.consulta_filtro.agendar(self.filter_text.get().strip())
+    
+    def _filtrar_canais(self, filtro, indices):
+        """Exibe apenas os canais encontrados pelo filtro"""
+        # Ignorar resultados de um filtro que já não está no campo
+        if filtro != self.filter_text.get().strip():
             return
-            
-        # Filtrar e mostrar apenas os canais que correspondem ao filtro
-        canais_filtrados = [
-            channel for channel in self.channels
-            if filtro in channel['title'].lower()
-        ]
-        
-        for channel in canais_filtrados:
-            self.tree_canais.insert(
-                "", "end",
-                values=(
-                    channel['id'],
-                    channel['title'],
-                    channel['type'],
-                    channel['members_count']
-                )
-            )
-            
+        
+        # Reanexar as linhas encontradas (na ordem original) e desanexar as
+        # demais em uma única chamada, sem recriar nenhuma linha
+        if indices != self.canais_exibidos:
+            self.tree_canais.set_children("", *[self.iids_canais[i] for i in indices])
+            self.canais_exibidos = indices
+        
         # Atualizar status com contagem de resultados
-        self.lbl_status_download.config(
-            text=f"{len(canais_filtrados)} canais encontrados para '{filtro}' (de {len(self.channels)} total)"
-        )
+        if filtro:
+            self.lbl_status_download.config(
+                text=f"{len(indices)} canais encontrados para '{filtro}' (de {len(self.channels)} total)"
+            )
+        else:
+            self.lbl_status_download.config(text=f"{len(self.channels)} canais encontrados.")
     
     def _limpar_filtro(self):
         """Limpa o filtro de busca"""
@@ -386,7 +504,7 @@ class TelegramPanel(ttk.Frame):
         resultado = self.on_configure_api(api_id, api_hash)
         
         # Atualizar interface na thread principal
-        self.after(0, lambda: self._atualizar_status_config(resultado))
+        self.ponte.enfileirar(self._atualizar_status_config, resultado)
     
     def _atualizar_status_config(self, sucesso):
         """Atualiza o status da configuração na interface"""
@@ -398,50 +516,39 @@ class TelegramPanel(ttk.Frame):
         
         self.btn_salvar.config(state="normal")
     
-    def _listar_canais(self):
-        """Lista os canais disponíveis no Telegram"""
-        self.lbl_status_download.config(text="Carregando canais...")
-        self.btn_listar.config(state="disabled")
-        self.update_idletasks()
+    def _carregar_canais_do_cache(self):
+        """Exibe os canais do cache e os atualiza em segundo plano se o cache expirou"""
+        if not self.on_load_cached_channels:
+            return
         
-        # Limpar lista atual
-        for item in self.tree_canais.get_children():
-            self.tree_canais.delete(item)
+        channels, expirado = self.on_load_cached_channels()
+        if channels:
+            self._aplicar_canais(channels, completo=True)
+            self.lbl_status_download.config(text=f"{len(self.channels)} canais (lista em cache).")
         
-        # Limpar filtro
-        self.filter_text.set("")
+        if expirado:
+            self._listar_canais()
+    
+    def _listar_canais(self):
+        """Atualiza a lista de canais em segundo plano
         
-        self.channels = []
-        self.selected_channel_id = None
-        self.btn_download.config(state="disabled")
+        A lista atual continua utilizável; as páginas de diálogos lidas são
+        aplicadas à árvore à medida que chegam.
+        """
+        if not self.on_list_channels or not self.run_async:
+            self._mostrar_erro_listagem("Integração com o Telegram não configurada.")
+            return
         
-        if self.on_list_channels:
-            # Iniciar em uma thread separada
-            threading.Thread(
-                target=self._processar_listagem_canais,
-                daemon=True
-            ).start()
-    
-    def _processar_listagem_canais(self):
-        """Processa a listagem de canais em uma thread separada"""
-        try:
-            if hasattr(self.on_list_channels, '__self__') and hasattr(self.on_list_channels.__self__, 'run_async'):
-                # Usar o método run_async se disponível no controlador
-                controller = self.on_list_channels.__self__
-                controller.run_async(
-                    self.on_list_channels,
-                    callback=lambda result, error=None: self.after(0, lambda: self._processar_resultado_listagem(result, error))
-                )
-            else:
-                # Fallback para o método antigo
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                channels = loop.run_until_complete(self.on_list_channels())
-                loop.close()
-                self.after(0, lambda: self._atualizar_lista_canais(channels))
-                
-        except Exception as e:
-            self.after(0, lambda: self._mostrar_erro_listagem(str(e)))
+        self.lbl_status_download.config(text="Atualizando lista de canais...")
+        self.btn_listar.config(state="disabled")
+        
+        # A listagem roda no loop do Telegram, que já mantém a conexão aberta; das
+        # páginas lidas entre dois quadros, apenas a lista mais recente é aplicada
+        self.run_async(
+            self.on_list_channels,
+            lambda channels: self.ponte.publicar(self.CANAL_CANAIS_PARCIAIS, channels),
+            callback=self._processar_resultado_listagem
+        )
     
     def _processar_resultado_listagem(self, channels, error=None):
         """Processa o resultado da listagem de canais"""
@@ -451,35 +558,78 @@ class TelegramPanel(ttk.Frame):
             self._atualizar_lista_canais(channels)
     
     def _atualizar_lista_canais(self, channels):
-        """Atualiza a lista de canais na interface"""
-        self.channels = channels
+        """Aplica a lista completa de canais na interface"""
+        self._aplicar_canais(channels or [], completo=True)
+        self.btn_listar.config(state="normal")
         
-        if not channels:
+        if not self.channels:
             self.lbl_status_download.config(text="Nenhum canal encontrado.")
-            self.btn_listar.config(state="normal")
-            self.entry_filtro.config(state="disabled")
             return
         
-        # Habilitar campo de filtro
-        self.entry_filtro.config(state="normal")
+        self.lbl_status_download.config(text=f"{len(self.channels)} canais encontrados.")
+        
+        # Focar no campo de filtro para facilitar a busca
+        self.entry_filtro.focus()
+    
+    def _aplicar_canais(self, channels, completo=False):
+        """Aplica à árvore apenas as diferenças em relação à lista exibida
+        
+        Canais novos são inseridos e canais alterados são atualizados. Com
+        completo=True, os canais ausentes da lista também são removidos.
+        """
+        alterou = False
         
-        # Preencher treeview
         for channel in channels:
-            self.tree_canais.insert(
-                "", "end",
-                values=(
-                    channel['id'],
-                    channel['title'],
-                    channel['type'],
-                    channel['members_count']
-                )
-            )
+            valores = (channel['id'], channel['title'], channel['type'], channel['members_count'])
+            posicao = self.posicao_canais.get(channel['id'])
+            
+            if posicao is None:
+                self.posicao_canais[channel['id']] = len(self.channels)
+                self.channels.append(channel)
+                self.iids_canais.append(self.tree_canais.insert("", "end", values=valores))
+                alterou = True
+            elif self.channels[posicao] != channel:
+                self.tree_canais.item(self.iids_canais[posicao], values=valores)
+                alterou = alterou or self.channels[posicao]['title'] != channel['title']
+                self.channels[posicao] = channel
+        
+        if completo:
+            ids = {channel['id'] for channel in channels}
+            removidos = [
+                posicao for posicao, channel in enumerate(self.channels) if channel['id'] not in ids
+            ]
+            
+            if removidos:
+                self.tree_canais.delete(*[self.iids_canais[posicao] for posicao in removidos])
+                
+                manter = [posicao for posicao, channel in enumerate(self.channels) if channel['id'] in ids]
+                self.channels = [self.channels[posicao] for posicao in manter]
+                self.iids_canais = [self.iids_canais[posicao] for posicao in manter]
+                self.posicao_canais = {channel['id']: posicao for posicao, channel in enumerate(self.channels)}
+                
+                if self.selected_channel_id not in ids:
+                    self.selected_channel_id = None
+                    self.btn_download.config(state="disabled")
+                    self.btn_mensagem.config(state="disabled")
+                    self.btn_curso_virtual.config(state="disabled")
+                alterou = True
+        
+        if not alterou:
+            return
         
-        self.lbl_status_download.config(text=f"{len(channels)} canais encontrados.")
-        self.btn_listar.config(state="normal")
+        # Reconstruir o índice de busca e reaplicar o filtro atual
+        self.indice_canais = IndiceBusca(
+            (indice, channel['title'] or "") for indice, channel in enumerate(self.channels)
+        )
+        self.canais_exibidos = None
+        self.entry_filtro.config(state="normal" if self.channels else "disabled")
         
-        # Focar no campo de filtro para facilitar a busca
-        self.entry_filtro.focus()
+        filtro = self.filter_text.get().strip()
+        if filtro:
+            self.consulta_filtro.agendar(filtro)
+        else:
+            self.canais_exibidos = list(range(len(self.channels)))
+            self.tree_canais.set_children("", *self.iids_canais)
     
     def _mostrar_erro_listagem(self, erro):
         """Mostra uma mensagem de erro na interface"""
@@ -497,145 +647,261 @@ class TelegramPanel(ttk.Frame):
         
         self.selected_channel_id = channel_id
         self.btn_download.config(state="normal")
+        self.btn_mensagem.config(state="normal")
+        self.btn_curso_virtual.config(state="normal")
+    
+    # Descrição de cada estado dos itens da fila
+    ESTADOS_FILA = {
+        "na_fila": "Na fila",
+        "ativo": "Baixando",
+        "concluido": "Concluído",
+        "erro": "Erro",
+    }
+    
+    # Intervalo de atualização da fila na interface, em milissegundos
+    INTERVALO_FILA_MS = 500
+    
+    # Canal da ponte com as páginas lidas durante a listagem de canais
+    CANAL_CANAIS_PARCIAIS = "telegram.canais_parciais"
+    
+    # Arquivos em download listados abaixo do progresso geral
+    ARQUIVOS_EXIBIDOS = 3
+    
+    def _titulo_canal(self, channel_id):
+        """Retorna o nome do canal com o ID informado"""
+        posicao = self.posicao_canais.get(channel_id)
+        return self.channels[posicao]['title'] if posicao is not None else str(channel_id)
     
     def _iniciar_download(self):
-        """Inicia o download de vídeos do canal selecionado"""
+        """Adiciona o canal selecionado à fila de downloads"""
         if not self.selected_channel_id:
             messagebox.showinfo("Seleção necessária", "Selecione um canal para baixar os vídeos.")
             return
         
-        # Debug para verificar a chamada
-        print(f"Iniciando download para o canal {self.selected_channel_id}")
+        self._enfileirar(self.selected_channel_id)
+    
+    def _abrir_curso_virtual(self):
+        """Cria um curso com as aulas do canal selecionado, baixadas apenas quando abertas"""
+        if not self.selected_channel_id:
+            messagebox.showinfo("Seleção necessária", "Selecione um canal para abrir como curso.")
+            return
         
-        # Desabilitar botão durante o download
-        self.btn_download.config(state="disabled")
-        self.progresso["value"] = 0
-        self.lbl_progresso.config(text="Iniciando download...")
+        if not self.on_open_virtual_course:
+            return
         
-        # Verificar se o label de progresso existe
-        if not hasattr(self, 'lbl_progresso'):
-            print("ERRO: Label lbl_progresso não foi encontrado!")
-            self.btn_download.config(state="normal")
+        self.lbl_progresso.config(text="Lendo as aulas do canal...")
+        self.on_open_virtual_course(self.selected_channel_id)
+    
+    def _enfileirar_mensagem(self):
+        """Adiciona uma mensagem ou um intervalo de mensagens (ex.: 10-50) do canal selecionado à fila"""
+        if not self.selected_channel_id:
+            messagebox.showinfo("Seleção necessária", "Selecione o canal da mensagem.")
             return
         
-        if self.on_download_channel:
-            # Iniciar em uma thread separada
-            threading.Thread(
-                target=self._processar_download,
-                args=(self.selected_channel_id,),
-                daemon=True
-            ).start()
-        else:
-            print("ERRO: Callback on_download_channel não está definido")
-            self.lbl_progresso.config(text="Erro: Configuração de download inválida.")
-            self.btn_download.config(state="normal")
+        try:
+            partes = [int(parte) for parte in self.entry_mensagem.get().strip().split("-", 1)]
+        except ValueError:
+            messagebox.showerror("ID inválido", "Informe o ID da mensagem ou um intervalo, como 10-50.")
+            return
+        
+        message_id = min(partes)
+        message_id_final = max(partes) if len(partes) == 2 and partes[0] != partes[1] else None
+        self._enfileirar(self.selected_channel_id, message_id, message_id_final)
+        self.entry_mensagem.delete(0, tk.END)
     
-    def _processar_download(self, channel_id):
-        """Processa o download em uma thread separada"""
-        # Debug para verificar se a thread está sendo executada
-        print(f"Processando download do canal {channel_id}")
+    def _enfileirar(self, channel_id, message_id=None, message_id_final=None):
+        """Envia um canal, uma mensagem ou um intervalo de mensagens para a fila de downloads"""
+        if not self.on_enqueue_download:
+            self.lbl_progresso.config(text="Erro: Configuração de download inválida.")
+            return
         
         try:
-            # Simplificar o código para usar apenas o método run_async
-            if hasattr(self.on_download_channel, '__self__'):
-                # Debug para verificar se está usando run_async
-                print("Obtendo referência ao controlador")
-                controller = self.on_download_channel.__self__
-                
-                # Usar diretamente o método run_async do controlador em vez de criar um novo loop
-                # Isso garante que usamos o mesmo loop em toda a aplicação
-                print("Usando método run_async do controlador")
-                controller.run_async(
-                    controller.download_channel,
-                    channel_id,
-                    # Criar uma lambda que captura os argumentos e chama _atualizar_progresso
-                    lambda current, total, text: self.after(0, 
-                        # Usar uma lambda aninhada para passar os argumentos
-                        lambda c=current, t=total, txt=text: self._atualizar_progresso(c, t, txt)
-                    ),
-                    # Função de callback que será chamada quando o download terminar
-                    callback=lambda resultado, erro=None: self.after(0, 
-                        lambda r=resultado, e=erro: self._processar_resultado_download(r, e)
-                    )
-                )
-            else:
-                # Fallback para o método antigo em casos onde o controlador não está disponível
-                print("Usando método direto (fallback)")
-                
-                def progress_callback(current, total, text):
-                    # Capturar os argumentos em um escopo local
-                    c, t, txt = current, total, text
-                    self.after(0, lambda: self._atualizar_progresso(c, t, txt))
-                
-                # Iniciar nova thread para executar o download de forma assíncrona
-                threading.Thread(
-                    target=self._executar_download_direto,
-                    args=(channel_id, progress_callback),
-                    daemon=True
-                ).start()
-        except Exception as e:
-            # Capturar a exceção em uma variável local
-            error_msg = str(e)
-            print(f"Erro no _processar_download: {error_msg}")
-            # Usar a variável local no lambda para evitar problemas de escopo
-            self.after(0, lambda msg=error_msg: self._mostrar_erro_download(msg))
-    
-    def _executar_download_direto(self, channel_id, progress_callback):
-        """Executa o download diretamente, sem passar pelo controlador"""
+            prioridade = int(self.prioridade.get())
+        except (tk.TclError, ValueError):
+            prioridade = 0
+        
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            try:
-                resultado = loop.run_until_complete(
-                    self.on_download_channel(channel_id, progress_callback)
-                )
-                # Guardar o resultado em uma variável local
-                final_result = resultado
-                self.after(0, lambda r=final_result: self._finalizar_download(r))
-            except Exception as e:
-                # Capturar a exceção em uma variável local
-                error_msg = str(e)
-                print(f"Erro durante download direto: {error_msg}")
-                # Usar a variável local no lambda
-                self.after(0, lambda msg=error_msg: self._mostrar_erro_download(msg))
-            finally:
-                loop.close()
+            self.on_enqueue_download(
+                channel_id,
+                self._titulo_canal(channel_id),
+                prioridade,
+                self.reconciliar.get(),
+                message_id,
+                message_id_final
+            )
         except Exception as e:
-            # Capturar a exceção em uma variável local
-            error_msg = str(e)
-            print(f"Erro no _executar_download_direto: {error_msg}")
-            # Usar a variável local no lambda
-            self.after(0, lambda msg=error_msg: self._mostrar_erro_download(msg))
+            print(f"Erro ao adicionar à fila: {e}")
+            self.lbl_progresso.config(text=f"Erro: {e}")
+            return
+        
+        self._atualizar_fila()
+    
+    def _remover_item_fila(self):
+        """Remove da fila o item selecionado, se ele não estiver em andamento"""
+        selecao = self.tree_fila.selection()
+        if not selecao or not self.on_remove_queue_item:
+            return
+        
+        if not self.on_remove_queue_item(int(selecao[0])):
+            messagebox.showinfo("Fila de downloads", "Itens em andamento não podem ser removidos.")
+        
+        self._atualizar_fila()
+    
+    def _limpar_fila(self):
+        """Remove da fila os itens concluídos"""
+        if self.on_clear_queue:
+            self.on_clear_queue()
+            self._atualizar_fila()
+    
+    def _formatar_bytes(self, quantidade):
+        """Formata uma quantidade de bytes em KB, MB ou GB"""
+        for unidade in ("B", "KB", "MB"):
+            if quantidade < 1024:
+                return f"{quantidade:.1f} {unidade}"
+            quantidade /= 1024
+        return f"{quantidade:.1f} GB"
+    
+    def _formatar_tempo(self, segundos):
+        """Formata um tempo restante em segundos, minutos ou horas; vazio se desconhecido"""
+        if segundos is None:
+            return ""
+        segundos = int(segundos)
+        if segundos < 60:
+            return f"{segundos}s"
+        if segundos < 3600:
+            return f"{segundos // 60}m{segundos % 60:02d}s"
+        return f"{segundos // 3600}h{segundos % 3600 // 60:02d}m"
+    
+    def _valores_item_fila(self, item):
+        """Valores exibidos na linha de um item da fila"""
+        descricao = item["titulo"] or str(item["channel_id"])
+        if item.get("message_id_final"):
+            descricao = f"{descricao} (mensagens {item['message_id']}-{item['message_id_final']})"
+        elif item["message_id"]:
+            descricao = f"{descricao} (mensagem {item['message_id']})"
+        
+        progresso = ""
+        if item["estado"] != "na_fila":
+            progresso = f"{item['baixados'] + item['ignorados']}/{item['total']}"
+            if item["erros"]:
+                progresso += f" ({item['erros']} erros)"
+        
+        velocidade = ""
+        restante = ""
+        if item["estado"] == "ativo":
+            restante = self._formatar_tempo(item.get("eta"))
+            if item.get("espera"):
+                velocidade = f"Aguardando {item['espera']:.0f}s"
+            else:
+                velocidade = f"{self._formatar_bytes(item.get('velocidade', 0))}/s"
+        elif item["bytes"]:
+            velocidade = self._formatar_bytes(item["bytes"])
+        
+        return (
+            descricao,
+            item["prioridade"],
+            self.ESTADOS_FILA.get(item["estado"], item["estado"]),
+            progresso,
+            velocidade,
+            restante
+        )
+    
+    def _atualizar_fila(self):
+        """Atualiza a lista da fila e o progresso geral, aplicando apenas as diferenças"""
+        if not self.on_list_queue:
+            return
+        
+        itens = self.on_list_queue()
+        iids = set()
+        
+        for posicao, item in enumerate(itens):
+            iid = str(item["id"])
+            iids.add(iid)
+            valores = self._valores_item_fila(item)
             
-    def _processar_resultado_download(self, resultado, erro=None):
-        """Processa o resultado do download assíncrono"""
-        if erro:
-            print(f"Erro de download reportado: {erro}")
-            self._mostrar_erro_download(erro)
-        else:
-            print(f"Download finalizado com sucesso: {resultado}")
-            self._finalizar_download(resultado)
-    
-    def _atualizar_progresso(self, current, total, text):
-        """Atualiza o progresso do download na interface"""
-        print(f"Atualizando progresso: {current}/{total} - {text}")
-        self.progresso["value"] = current
-        self.progresso["maximum"] = total
-        self.lbl_progresso.config(text=text)
-    
-    def _finalizar_download(self, resultado):
-        """Finaliza o download na interface"""
-        print(f"Finalizando download: {resultado}")
-        if resultado:
-            self.lbl_progresso.config(text="Download concluído com sucesso!")
+            if iid not in self.valores_fila:
+                self.tree_fila.insert("", posicao, iid=iid, values=valores)
+            elif self.valores_fila[iid] != valores:
+                self.tree_fila.item(iid, values=valores)
+            
+            if self.tree_fila.index(iid) != posicao:
+                self.tree_fila.move(iid, "", posicao)
+            self.valores_fila[iid] = valores
+        
+        removidos = [iid for iid in self.valores_fila if iid not in iids]
+        if removidos:
+            self.tree_fila.delete(*removidos)
+            for iid in removidos:
+                del self.valores_fila[iid]
+        
+        # Progresso geral dos itens em andamento
+        ativos = [item for item in itens if item["estado"] == "ativo"]
+        na_fila = sum(1 for item in itens if item["estado"] == "na_fila")
+        
+        if ativos:
+            total = sum(item["total"] for item in ativos)
+            feitos = sum(item["baixados"] + item["ignorados"] for item in ativos)
+            velocidade = sum(item.get("velocidade", 0) for item in ativos)
+            
+            # Os itens são baixados em paralelo: termina quando o mais demorado terminar
+            etas = [item.get("eta") for item in ativos]
+            restante = self._formatar_tempo(max(etas)) if None not in etas else ""
+            
+            texto = (
+                f"{len(ativos)} em andamento, {na_fila} na fila - "
+                f"{feitos}/{total} arquivos - {self._formatar_bytes(velocidade)}/s"
+            )
+            if restante:
+                texto += f" - {restante} restantes"
+            
+            # Arquivos em download, com a porcentagem e o tempo restante de cada um
+            arquivos = [arquivo for item in ativos for arquivo in item.get("arquivos_em_andamento", [])]
+            for arquivo in arquivos[:self.ARQUIVOS_EXIBIDOS]:
+                porcentagem = arquivo["baixados"] * 100 // max(arquivo["tamanho"], 1)
+                texto += f"\n{arquivo['nome']}: {porcentagem}%"
+                if arquivo["eta"] is not None:
+                    texto += f" ({self._formatar_tempo(arquivo['eta'])})"
+            
+            self.progresso["maximum"] = max(total, 1)
+            self.progresso["value"] = feitos
+        elif na_fila:
+            texto = f"{na_fila} itens na fila."
+        elif itens:
+            self.progresso["value"] = 0
+            texto = "Nenhum download em andamento."
         else:
-            self.lbl_progresso.config(text="Erro ao concluir o download.")
+            texto = ""
         
-        self.btn_download.config(state="normal")
+        if texto != self.lbl_fila.cget("text"):
+            self.lbl_fila.config(text=texto)
+        
+        # O relatório só muda quando algum item termina
+        finalizados = len(itens) - len(ativos) - na_fila
+        if finalizados != self.finalizados_fila:
+            self.finalizados_fila = finalizados
+            self._atualizar_economia()
     
-    def _mostrar_erro_download(self, erro):
-        """Mostra uma mensagem de erro na interface"""
-        print(f"Erro de download: {erro}")
-        self.lbl_progresso.config(text=f"Erro: {erro}")
-        self.btn_download.config(state="normal") 
\ No newline at end of file
+    def _atualizar_economia(self):
+        """Consulta, fora da thread do Tk, quantos arquivos repetidos deixaram de ser baixados"""
+        if not self.on_dedup_report:
+            return
+        
+        def consultar():
+            try:
+                relatorio = self.on_dedup_report()
+            except Exception as e:
+                print(f"Erro ao obter relatório de economia: {e}")
+                return
+            self.ponte.enfileirar(self._exibir_economia, relatorio)
+        
+        threading.Thread(target=consultar, daemon=True).start()
+    
+    def _exibir_economia(self, relatorio):
+        """Exibe o relatório de arquivos repetidos não baixados"""
+        if relatorio["arquivos"]:
+            self.lbl_economia.config(
+                text=f"Repetidos não baixados: {relatorio['arquivos']} "
+                     f"({self._formatar_bytes(relatorio['bytes'])} economizados)"
+            )
+        else:
+            self.lbl_economia.config(text="")
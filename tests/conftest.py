@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# Adicionar a raiz do projeto ao path do Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.application.services import TelegramService
+from src.infrastructure.telegram import ClienteTelegramFalso
+
+@pytest.fixture
+def cliente():
+    """Cliente do Telegram simulado, sem latência nem limite de banda"""
+    return ClienteTelegramFalso()
+
+@pytest.fixture
+def servico(cliente, tmp_path, monkeypatch):
+    """Serviço do Telegram com o cliente falso, banco e downloads em uma pasta temporária"""
+    # A pasta padrão de downloads é relativa ao diretório atual
+    monkeypatch.chdir(tmp_path)
+
+    servico = TelegramService(
+        cliente=cliente,
+        db_path=str(tmp_path / "dados.db"),
+        pasta_downloads=str(tmp_path / "downloads")
+    )
+    servico.pos_processar = False
+    yield servico
+    servico.fechar()
+
+@pytest.fixture
+def executar(servico):
+    """Executa uma corrotina no loop do Telegram e retorna o resultado"""
+    return servico.loop_telegram.executar_e_aguardar
@@ -0,0 +1,39 @@
+import sqlite3
+
+from src.infrastructure.repositories import CursoRepository
+
+def video(caminho: str) -> dict:
+    """Vídeo no formato de escanear_curso"""
+    return {"caminho_video": caminho, "numero": "", "titulo": caminho, "duracao": "00:00:00"}
+
+def aulas(repositorio: CursoRepository) -> list:
+    """(curso_id, caminho_video, concluida) de todas as aulas, pela ordem de cadastro"""
+    repositorio.cursor.execute('SELECT curso_id, caminho_video, concluida FROM aulas ORDER BY id')
+    return [tuple(row) for row in repositorio.cursor.fetchall()]
+
+
+def test_migracao_remove_aulas_repetidas_mantendo_a_concluida(tmp_path):
+    caminho_banco = str(tmp_path / "dados.db")
+    conexao = sqlite3.connect(caminho_banco)
+    conexao.execute('CREATE TABLE aulas (id INTEGER PRIMARY KEY, curso_id INTEGER NOT NULL, '
+                    'caminho_video TEXT NOT NULL, titulo TEXT NOT NULL, duracao TEXT, concluida INTEGER DEFAULT 0)')
+    conexao.executemany(
+        'INSERT INTO aulas (curso_id, caminho_video, titulo, concluida) VALUES (?, ?, ?, ?)',
+        [(1, "a.mp4", "a", 0), (1, "a.mp4", "a", 1), (1, "b.mp4", "b", 0), (1, "b.mp4", "b", 0), (2, "a.mp4", "a", 0)]
+    )
+    conexao.commit()
+    conexao.close()
+
+    repositorio = CursoRepository(caminho_banco)
+
+    assert aulas(repositorio) == [(1, "a.mp4", 1), (1, "b.mp4", 0), (2, "a.mp4", 0)]
+
+
+def test_insercao_em_lote_ignora_videos_ja_cadastrados(tmp_path):
+    repositorio = CursoRepository(str(tmp_path / "dados.db"))
+    id_curso = repositorio.obter_ou_criar_curso("tg://-1001", "Canal")
+
+    repositorio.inserir_aulas_em_lote(id_curso, [video("a.mp4"), video("b.mp4"), video("b.mp4")])
+    repositorio.inserir_aulas_em_lote(id_curso, [video("a.mp4"), video("c.mp4")])
+
+    assert [caminho for _, caminho, _ in aulas(repositorio)] == ["a.mp4", "b.mp4", "c.mp4"]
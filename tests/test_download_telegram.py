@@ -0,0 +1,183 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+from src.application.services import FilaDownloads
+from src.application.services.limitador_requisicoes import FloodWait, LimitadorRequisicoes
+from src.application.services.manifesto_downloads import ManifestoDownloads
+from src.application.services.reserva_nomes import ReservaNomes
+from src.infrastructure.repositories import TelegramRepository
+
+MB = 1024 * 1024
+ID_CANAL = -1001
+ID_OUTRO_CANAL = -1002
+
+def ler(caminho: str) -> bytes:
+    """Conteúdo de um arquivo"""
+    with open(caminho, "rb") as arquivo:
+        return arquivo.read()
+
+def arquivos_da_pasta(pasta: str) -> list:
+    """Arquivos de uma pasta, em ordem alfabética"""
+    return sorted(entrada for entrada in os.listdir(pasta) if os.path.isfile(os.path.join(pasta, entrada)))
+
+
+def test_retoma_download_a_partir_do_arquivo_part(servico, cliente, executar):
+    cliente.adicionar_canal(ID_CANAL, "Canal")
+    tamanho = 12 * MB
+    video = cliente.adicionar_video(ID_CANAL, tamanho, legenda="Aula").video
+
+    # A primeira tentativa é interrompida depois de 10 partes
+    stream_media = cliente.stream_media
+
+    async def interromper(message, limit=0, offset=0):
+        async for parte in stream_media(message, limit=limit, offset=offset):
+            if cliente.estatisticas["requisicoes"]["stream_media"] > 10:
+                raise ConnectionError("conexão perdida")
+            yield parte
+
+    cliente.stream_media = interromper
+    status = executar(servico.download_channel_videos(ID_CANAL))
+    assert status["erros"] == 1
+
+    parciais = servico.repository.obter_arquivos_parciais()
+    assert parciais[video.file_unique_id][1] == servico.PARTES_POR_REGISTRO * MB
+
+    # A segunda tentativa pede apenas as partes que faltam
+    cliente.stream_media = stream_media
+    cliente.zerar_estatisticas()
+    status = executar(servico.download_channel_videos(ID_CANAL))
+
+    assert status["erros"] == 0 and status["baixados"] == 1
+    assert cliente.estatisticas["requisicoes"]["stream_media"] == 12 - servico.PARTES_POR_REGISTRO
+    assert ler(status["arquivos"][0]) == cliente.conteudo(video.file_unique_id, 0, tamanho)
+    assert not os.path.exists(status["arquivos"][0] + ".part")
+
+
+def test_midia_repetida_em_outro_canal_vira_vista_do_armazenamento(servico, cliente, executar):
+    cliente.adicionar_canal(ID_CANAL, "Canal A")
+    cliente.adicionar_canal(ID_OUTRO_CANAL, "Canal B")
+    cliente.adicionar_video(ID_CANAL, 2 * MB, file_unique_id="mesma")
+    cliente.adicionar_video(ID_OUTRO_CANAL, 2 * MB, file_unique_id="mesma")
+
+    primeiro = executar(servico.download_channel_videos(ID_CANAL))
+    segundo = executar(servico.download_channel_videos(ID_OUTRO_CANAL))
+
+    assert primeiro["baixados"] == 1
+    assert segundo["baixados"] == 0 and segundo["bytes_economizados"] == 2 * MB
+    assert cliente.estatisticas["requisicoes"]["download_media"] == 1
+
+    vista_a = primeiro["arquivos"][0]
+    vista_b = os.path.join(os.path.dirname(os.path.dirname(vista_a)), "Canal B", os.path.basename(vista_a))
+    assert os.path.samefile(vista_a, vista_b)
+    assert servico.relatorio_deduplicacao() == {"arquivos": 1, "bytes": 2 * MB}
+
+
+def test_flood_wait_reduz_a_taxa_e_repete_a_chamada():
+    limitador = LimitadorRequisicoes(taxa=20.0, variacao=0.0)
+    chamadas = []
+
+    async def chamada():
+        chamadas.append(time.monotonic())
+        if len(chamadas) == 1:
+            raise FloodWait(value=1)
+        return "ok"
+
+    assert asyncio.run(limitador.executar(chamada)) == "ok"
+    assert limitador.total_flood_waits == 1
+    assert chamadas[1] - chamadas[0] >= 1
+    assert limitador.taxa < limitador.taxa_maxima
+
+
+def test_downloads_concluem_sob_flood_wait(servico, cliente, executar):
+    cliente.flood_wait_a_cada = 4
+    cliente.espera_flood_wait = 0
+    cliente.gerar_canal(ID_CANAL, "Canal", 6, 64 * 1024)
+
+    status = executar(servico.download_channel_videos(ID_CANAL))
+
+    assert status["erros"] == 0 and status["baixados"] == 6
+    assert cliente.estatisticas["flood_waits"] > 0
+    assert servico.limitador.total_flood_waits == cliente.estatisticas["flood_waits"]
+    assert servico.historico_downloads()[0]["flood_waits"] == cliente.estatisticas["flood_waits"]
+
+
+def test_fila_retoma_itens_interrompidos(servico, cliente, tmp_path):
+    cliente.gerar_canal(ID_CANAL, "Canal", 5, 64 * 1024)
+
+    # Item que estava em andamento quando o aplicativo foi fechado
+    repositorio = TelegramRepository(str(tmp_path / "dados.db"))
+    id_item = repositorio.adicionar_item_fila(
+        FilaDownloads.TIPO_INTERVALO, ID_CANAL, "Canal", message_id=2, message_id_final=4
+    )
+    repositorio.atualizar_item_fila(id_item, estado=FilaDownloads.ESTADO_ATIVO)
+    repositorio.fechar()
+
+    fila = FilaDownloads(servico)
+    fila.iniciar()
+
+    limite = time.monotonic() + 10
+    while fila.obter_itens()[0]["estado"] not in (FilaDownloads.ESTADO_CONCLUIDO, FilaDownloads.ESTADO_ERRO):
+        assert time.monotonic() < limite
+        time.sleep(0.05)
+
+    item = servico.repository.listar_fila()[0]
+    assert item["estado"] == FilaDownloads.ESTADO_CONCLUIDO
+    assert item["baixados"] == 3
+    assert len(arquivos_da_pasta(str(tmp_path / "downloads" / "Canal"))) == 3
+
+
+def test_downloads_simultaneos_da_mesma_midia_gravam_uma_vez(servico, cliente, executar, tmp_path):
+    cliente.adicionar_canal(ID_CANAL, "Canal")
+    mensagens = [cliente.adicionar_video(ID_CANAL, 3 * MB, file_unique_id="mesma") for _ in range(2)]
+    pastas = [str(tmp_path / "a"), str(tmp_path / "b")]
+
+    async def baixar():
+        manifesto = ManifestoDownloads(servico.repository)
+        nomes = ReservaNomes()
+        resultados = await asyncio.gather(*(
+            servico._download_media(cliente, mensagem, pasta, manifesto, nomes)
+            for mensagem, pasta in zip(mensagens, pastas)
+        ))
+        manifesto.gravar()
+        return resultados
+
+    assert executar(baixar()) == [True, True]
+    assert cliente.estatisticas["requisicoes"]["download_media"] == 1
+
+    vista_a, vista_b = (os.path.join(pasta, arquivos_da_pasta(pasta)[0]) for pasta in pastas)
+    assert os.path.samefile(vista_a, vista_b)
+    assert ler(vista_a) == cliente.conteudo("mesma", 0, 3 * MB)
+
+
+def test_legendas_repetidas_nao_criam_vistas_duplicadas(servico, cliente, executar, tmp_path):
+    cliente.adicionar_canal(ID_CANAL, "Canal")
+    mensagens = [cliente.adicionar_video(ID_CANAL, 1000 + i, legenda="Aula") for i in range(3)]
+    pasta = str(tmp_path / "Canal")
+    os.makedirs(pasta)
+
+    async def baixar():
+        manifesto = ManifestoDownloads(servico.repository)
+        nomes = ReservaNomes()
+        for mensagem in mensagens:
+            assert await servico._download_media(cliente, mensagem, pasta, manifesto, nomes)
+        manifesto.gravar()
+
+    for _ in range(3):
+        executar(baixar())
+        assert len(arquivos_da_pasta(pasta)) == 3
+
+
+def test_intervalo_conta_midias_nao_suportadas_como_ignoradas(servico, cliente, executar):
+    cliente.adicionar_canal(ID_CANAL, "Canal")
+    cliente.adicionar_video(ID_CANAL, 1000, legenda="Aula")
+
+    # Documento sem nome de arquivo: não há extensão para salvá-lo
+    documento = cliente.adicionar_texto(ID_CANAL, "Anexo")
+    documento.media = "document"
+    documento.document = SimpleNamespace(file_unique_id="doc", file_size=10, file_name=None)
+
+    status = executar(servico.download_messages_range(ID_CANAL, 1, 2))
+
+    assert (status["baixados"], status["ignorados"], status["erros"]) == (1, 1, 0)
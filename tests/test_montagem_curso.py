@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.application.services.montagem_curso import MontagemCurso
+from src.infrastructure.repositories import CursoRepository
+
+INICIO = datetime(2024, 1, 1, 12, 0)
+
+def mensagem(message_id: int, minutos: int, legenda: str = None, grupo: int = None) -> SimpleNamespace:
+    """Mensagem de vídeo no formato do Pyrogram"""
+    return SimpleNamespace(
+        id=message_id, caption=legenda, date=INICIO + timedelta(minutes=minutos),
+        media_group_id=grupo, video=SimpleNamespace(duration=60)
+    )
+
+def montar(caminho_banco: str, mensagens: list):
+    """Monta o curso com as mensagens, como uma sincronização do canal"""
+    montagem = MontagemCurso("tg://-1001", "Canal", db_path=caminho_banco)
+
+    async def executar():
+        for message in mensagens:
+            montagem.planejar(message)
+            montagem.adicionar(message.id, f"aula_{message.id}.mp4")
+        await montagem.finalizar()
+
+    asyncio.run(executar())
+    return montagem.id_curso
+
+def modulos(caminho_banco: str, id_curso: int) -> dict:
+    """caminho_video -> modulo das aulas do curso"""
+    repositorio = CursoRepository(caminho_banco)
+    try:
+        return {caminho: modulo for caminho, (modulo, _) in repositorio.obter_modulos_aulas(id_curso).items()}
+    finally:
+        repositorio.fechar()
+
+
+def test_sincronizacao_continua_o_ultimo_modulo(tmp_path):
+    caminho_banco = str(tmp_path / "dados.db")
+    id_curso = montar(caminho_banco, [mensagem(1, 0, "Módulo 1 - Introdução"), mensagem(2, 10), mensagem(3, 20)])
+
+    # Uma aula postada logo depois, vista numa nova sincronização
+    montar(caminho_banco, [mensagem(4, 30)])
+
+    assert set(modulos(caminho_banco, id_curso).values()) == {"Módulo 1 - Introdução"}
+
+
+def test_sincronizacao_abre_modulo_depois_de_uma_pausa_longa(tmp_path):
+    caminho_banco = str(tmp_path / "dados.db")
+    id_curso = montar(caminho_banco, [mensagem(1, 0), mensagem(2, 10)])
+
+    montar(caminho_banco, [mensagem(3, 10 + 60 * 24 * 7)])
+
+    assert modulos(caminho_banco, id_curso) == {
+        "aula_1.mp4": "Módulo 01", "aula_2.mp4": "Módulo 01", "aula_3.mp4": "Módulo 02"
+    }